@@ -0,0 +1,128 @@
+import math
+import re
+from typing import Dict, List, Optional, Tuple
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOP_WORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "but", "by", "for", "from", "has", "have", "i", "in", "is", "it",
+    "its", "of", "on", "or", "our", "that", "the", "their", "this", "to", "we", "were", "will", "with", "you",
+}
+
+# Vocabulary describing what each built-in role cares about
+ROLE_KEYWORDS = {
+    "project analyst": (
+        "project scope requirement feature user goal timeline milestone deadline deliverable stakeholder "
+        "plan phase launch priority roadmap team schedule risk"
+    ),
+    "technical expert": (
+        "technical architecture stack backend frontend database api infrastructure server cloud scalability "
+        "performance security framework code deployment integration react native python firebase mobile "
+        "latency data model"
+    ),
+    "business consultant": (
+        "business budget cost revenue market pricing price customer competitor monetization roi profit growth "
+        "marketing sale subscription funding investor strategy acquisition"
+    ),
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stop words, with crude plural folding"""
+    return [
+        word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word
+        for word in TOKEN_PATTERN.findall(text.lower())
+        if word not in STOP_WORDS
+    ]
+
+
+class AgentRouter:
+    """Pick the agents relevant to an input with a local TF-IDF classifier
+
+    Each agent is described by a profile: its role plus the keywords known for
+    that role. Profiles and the input are turned into TF-IDF vectors and scored
+    by cosine similarity. No LLM call is made. Agents are selected by
+    ``top_k`` and/or ``threshold``; if no agent scores above zero, all agents
+    are selected so an input is never silently dropped.
+    """
+
+    def __init__(self, top_k: Optional[int] = None, threshold: Optional[float] = None,
+                 keywords: Optional[Dict[str, str]] = None):
+        """Initialize the router
+
+        Args:
+            top_k: Invoke at most this many of the best-scoring agents
+            threshold: Invoke only agents scoring at least this similarity
+            keywords: Extra keywords per role, merged with ROLE_KEYWORDS
+        """
+        self.top_k = top_k
+        self.threshold = threshold
+        self.keywords = dict(ROLE_KEYWORDS)
+        self.keywords.update(keywords or {})
+
+    def _profile(self, role: str) -> List[str]:
+        return tokenize(f"{role} {self.keywords.get(role, '')}")
+
+    def score(self, agent_roles: Dict[str, str], user_input: str) -> Dict[str, float]:
+        """Cosine similarity between the input and each agent's role profile
+
+        Args:
+            agent_roles: Role description keyed by agent name
+            user_input: The user's input text
+
+        Returns:
+            A score in [0, 1] per agent name
+        """
+        profiles = {name: self._profile(role) for name, role in agent_roles.items()}
+        # Inverse document frequency over the agent profiles: words shared by
+        # every role carry no routing signal
+        document_frequency: Dict[str, int] = {}
+        for tokens in profiles.values():
+            for token in set(tokens):
+                document_frequency[token] = document_frequency.get(token, 0) + 1
+        count = len(profiles)
+        idf = {token: math.log((1 + count) / (1 + df)) + 1 for token, df in document_frequency.items()}
+
+        def vectorize(tokens):
+            vector: Dict[str, float] = {}
+            for token in tokens:
+                if token in idf:
+                    vector[token] = vector.get(token, 0.0) + idf[token]
+            return vector
+
+        query = vectorize(tokenize(user_input))
+        query_norm = math.sqrt(sum(v * v for v in query.values()))
+        scores = {}
+        for name, tokens in profiles.items():
+            vector = vectorize(tokens)
+            norm = math.sqrt(sum(v * v for v in vector.values()))
+            dot = sum(weight * vector.get(token, 0.0) for token, weight in query.items())
+            scores[name] = dot / (norm * query_norm) if norm and query_norm else 0.0
+        return scores
+
+    def select(self, agent_roles: Dict[str, str], user_input: str) -> Tuple[List[str], Dict[str, str]]:
+        """Choose which agents to invoke for an input
+
+        Returns:
+            A tuple of (selected agent names, best first; reason per skipped agent name)
+        """
+        scores = self.score(agent_roles, user_input)
+        ranked = sorted(scores, key=lambda name: scores[name], reverse=True)
+        if not ranked or scores[ranked[0]] == 0.0:
+            return list(agent_roles), {}
+
+        selected, skipped = [], {}
+        for rank, name in enumerate(ranked):
+            if scores[name] == 0.0:
+                skipped[name] = "no overlap with the input (score 0.00)"
+            elif self.threshold is not None and scores[name] < self.threshold:
+                skipped[name] = f"score {scores[name]:.2f} below threshold {self.threshold:.2f}"
+            elif self.top_k is not None and rank >= self.top_k:
+                skipped[name] = f"score {scores[name]:.2f} ranked {rank + 1}, outside top {self.top_k}"
+            else:
+                selected.append(name)
+        if not selected:
+            # Keep the best match rather than invoking nobody
+            selected.append(ranked[0])
+            skipped.pop(ranked[0])
+        return selected, skipped
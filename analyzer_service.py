@@ -0,0 +1,412 @@
+import argparse
+import asyncio
+import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import web
+from dotenv import load_dotenv
+
+from backend_pool import get_default_pool
+from langchain_analyzer import LangChainAnalyzer, MultiAgentAnalyzer, create_llm
+from message_store import json_default
+from scheduler import SchedulerFull, get_default_scheduler
+
+# Load environment variables
+load_dotenv()
+
+
+class ServiceOverloaded(Exception):
+    """Raised when the request queue is full"""
+
+
+class BadRequest(Exception):
+    """Raised when a request names something that does not exist (answered with 400)"""
+
+
+class Session:
+    """Per-session conversation state; the LLM client is shared by all sessions"""
+
+    def __init__(self, llm, document_index=None):
+        self.llm = llm
+        self.document_index = document_index
+        self.lock = threading.Lock()
+        self.analyzer = LangChainAnalyzer(llm=llm, document_index=document_index)
+        self._multi_agent = None
+
+    @property
+    def multi_agent(self):
+        """The session's multi-agent analyzer, created on first use"""
+        if self._multi_agent is None:
+            self._multi_agent = MultiAgentAnalyzer(llm=self.llm, document_index=self.document_index)
+        return self._multi_agent
+
+
+class MicroBatcher:
+    """Bounded request queue that dispatches work in small batches
+
+    Requests wait in a bounded queue; a full queue rejects new work right away
+    (the service answers 503) instead of letting latency grow without limit.
+    The dispatcher collects up to ``max_batch`` requests, waiting at most
+    ``max_wait`` seconds for a batch to fill, and runs each batch on a shared
+    thread pool. Requests for the same session run in order; different sessions
+    run concurrently. At most ``max_batches`` session groups (the requests of
+    one session within a batch) run at a time; each frees its slot as soon as
+    it finishes, so one slow session does not hold back the next batch.
+    """
+
+    def __init__(self, executor, max_queue=100, max_batch=8, max_wait=0.005, max_batches=4):
+        """Initialize the batcher
+
+        Args:
+            executor: Thread pool running the (blocking) analyzer calls
+            max_queue: Maximum number of queued requests before rejecting
+            max_batch: Maximum number of requests per batch
+            max_wait: Seconds to wait for a batch to fill
+            max_batches: Maximum number of session groups running at once
+        """
+        self.executor = executor
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self._slots = asyncio.Semaphore(max_batches)
+        self._dispatcher = None
+        # Running batch tasks; the event loop only keeps weak references
+        self._tasks = set()
+        self.batches = 0
+        self.rejected = 0
+
+    def start(self):
+        self._dispatcher = asyncio.create_task(self._dispatch())
+
+    async def stop(self):
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            try:
+                await self._dispatcher
+            except asyncio.CancelledError:
+                pass
+
+    async def submit(self, session, fn):
+        """Queue fn(session) and wait for its result
+
+        Raises:
+            ServiceOverloaded: If the queue is full
+        """
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((session, fn, future))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise ServiceOverloaded("Request queue is full")
+        return await future
+
+    async def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            self.batches += 1
+            groups = OrderedDict()
+            for session, fn, future in batch:
+                groups.setdefault(id(session), (session, []))[1].append((fn, future))
+            for session, items in groups.values():
+                # Wait for a free slot; meanwhile the queue absorbs (or rejects) new work
+                await self._slots.acquire()
+                task = asyncio.create_task(self._run_group_async(session, items))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+    async def _run_group_async(self, session, items):
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(self.executor, self._run_group, session, items, loop)
+        finally:
+            self._slots.release()
+
+    @staticmethod
+    def _run_group(session, items, loop):
+        """Run one session's requests in order (in a worker thread)"""
+        with session.lock:
+            for fn, future in items:
+                try:
+                    result = fn(session)
+                except Exception as e:
+                    loop.call_soon_threadsafe(_set_exception, future, e)
+                else:
+                    loop.call_soon_threadsafe(_set_result, future, result)
+
+
+def _set_result(future, result):
+    if not future.done():
+        future.set_result(result)
+
+
+def _set_exception(future, error):
+    if not future.done():
+        future.set_exception(error)
+
+
+class AnalyzerService:
+    """Shared analyzer resources behind an asyncio HTTP API
+
+    One chat model (and so one HTTP connection pool and backend pool) serves
+    every session. Sessions hold only conversation memory and are evicted
+    least-recently-used beyond ``max_sessions``.
+    """
+
+    def __init__(self, model_name="gpt-3.5-turbo", temperature=0.7, llm=None, backend_pool=None,
+                 document_index=None, max_sessions=1000, max_queue=100, max_batch=8, max_wait=0.005,
+                 max_batches=4, workers=16, scheduler=None):
+        """Initialize the service
+
+        Args:
+            model_name: The OpenAI model to use
+            temperature: The temperature for generation
+            llm: Optional chat model to use instead of creating a ChatOpenAI
+            backend_pool: Optional BackendPool (defaults to the shared pool from OPENAI_API_BASES, if any)
+            document_index: Optional DocumentIndex shared by all sessions
+            max_sessions: Maximum number of sessions kept in memory
+            max_queue: Maximum queued requests before answering 503
+            max_batch: Maximum requests dispatched per batch
+            max_wait: Seconds to wait for a batch to fill
+            max_batches: Maximum session groups running at once
+            workers: Threads running analyzer calls
+            scheduler: Optional RequestScheduler shared with other analyzers in the
+                process (defaults to the one from LLM_MAX_CONCURRENCY, if any)
+        """
+        backend_pool = backend_pool if backend_pool is not None else get_default_pool()
+        self.scheduler = scheduler if scheduler is not None else get_default_scheduler()
+        self.llm = llm if llm is not None else create_llm(model_name, temperature, backend_pool=backend_pool,
+                                                          scheduler=self.scheduler)
+        self.document_index = document_index
+        self.max_sessions = max_sessions
+        self.sessions = OrderedDict()
+        self._sessions_lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="analyzer")
+        self.batcher_options = dict(max_queue=max_queue, max_batch=max_batch, max_wait=max_wait, max_batches=max_batches)
+        self.batcher = None
+
+    def get_session(self, session_id):
+        """Get or create a session, evicting the least recently used one if needed"""
+        with self._sessions_lock:
+            session = self.sessions.get(session_id)
+            if session is None:
+                session = Session(self.llm, self.document_index)
+                self.sessions[session_id] = session
+                while len(self.sessions) > self.max_sessions:
+                    self.sessions.popitem(last=False)
+            else:
+                self.sessions.move_to_end(session_id)
+            return session
+
+    def find_session(self, session_id):
+        """An existing session, or None (never creates, evicts or reorders sessions)"""
+        with self._sessions_lock:
+            return self.sessions.get(session_id)
+
+    async def start(self):
+        self.batcher = MicroBatcher(self.executor, **self.batcher_options)
+        self.batcher.start()
+
+    async def stop(self):
+        if self.batcher is not None:
+            await self.batcher.stop()
+        self.executor.shutdown(wait=False)
+
+    async def run(self, session_id, fn):
+        """Run fn(session) through the micro-batcher"""
+        return await self.batcher.submit(self.get_session(session_id), fn)
+
+    def stats(self):
+        stats = {
+            "sessions": len(self.sessions),
+            "queue_depth": self.batcher.queue.qsize() if self.batcher else 0,
+            "batches": self.batcher.batches if self.batcher else 0,
+            "rejected": self.batcher.rejected if self.batcher else 0
+        }
+        if self.scheduler is not None:
+            stats["scheduler"] = self.scheduler.stats()
+        return stats
+
+
+def _json_response(data):
+    # Results may hold MessageViews (e.g. a ResponseAnalyzer's chat_history)
+    return web.json_response(data, dumps=lambda obj: json.dumps(obj, default=json_default))
+
+
+def _serialize_messages(messages):
+    return [{"role": message.type, "content": message.content} for message in messages]
+
+
+async def _read_json(request):
+    try:
+        body = await request.json()
+    except ValueError:
+        raise web.HTTPBadRequest(text="Request body must be JSON")
+    if not isinstance(body, dict):
+        raise web.HTTPBadRequest(text="Request body must be a JSON object")
+    return body
+
+
+def _require_input(body):
+    user_input = body.get("input")
+    if not isinstance(user_input, str) or not user_input.strip():
+        raise web.HTTPBadRequest(text="'input' must be a non-empty string")
+    return user_input
+
+
+def _rejection(error):
+    """The SchedulerFull behind an error, if any (LLM clients wrap it, e.g. in APIConnectionError)"""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        if isinstance(error, SchedulerFull):
+            return error
+        seen.add(id(error))
+        error = error.__cause__ or error.__context__
+    return None
+
+
+def _agent_call(agent, call):
+    """fn(session) running call(multi_agent) if the session's panel has the agent"""
+    def fn(session):
+        multi_agent = session.multi_agent
+        if agent not in multi_agent.agents:
+            raise BadRequest(f"Agent '{agent}' not found. Available agents: {list(multi_agent.agents)}")
+        return call(multi_agent)
+    return fn
+
+
+@web.middleware
+async def _overload_middleware(request, handler):
+    try:
+        return await handler(request)
+    except ServiceOverloaded as e:
+        return web.json_response({"error": str(e)}, status=503, headers={"Retry-After": "1"})
+    except BadRequest as e:
+        return web.json_response({"error": str(e)}, status=400)
+    except Exception as e:
+        rejection = _rejection(e)
+        if rejection is None:
+            raise
+        # The scheduler shed the LLM call; the client should retry later
+        return web.json_response({"error": str(rejection)}, status=503, headers={"Retry-After": "1"})
+
+
+def create_app(service):
+    """Create the aiohttp application for an AnalyzerService
+
+    Endpoints:
+        POST /analyze              {"session_id", "input", "is_final_summary"?}
+        POST /multi-agent/analyze  {"session_id", "input", "agent"?, "is_final_summary"?}
+        POST /summary              {"session_id", "input"?, "agent"?}
+        GET  /history?session_id=...
+        POST /reset                {"session_id"}
+        GET  /health               (includes per-class scheduler metrics if a scheduler is set)
+    """
+    routes = web.RouteTableDef()
+
+    @routes.post("/analyze")
+    async def analyze(request):
+        body = await _read_json(request)
+        user_input = _require_input(body)
+        is_final_summary = bool(body.get("is_final_summary", False))
+        result = await service.run(
+            body.get("session_id", "default"),
+            lambda session: session.analyzer.analyze_response(user_input, is_final_summary)
+        )
+        return _json_response(result)
+
+    @routes.post("/multi-agent/analyze")
+    async def multi_agent_analyze(request):
+        body = await _read_json(request)
+        user_input = _require_input(body)
+        agent = body.get("agent")
+        is_final_summary = bool(body.get("is_final_summary", False))
+        if agent:
+            fn = _agent_call(agent, lambda multi_agent: {
+                agent: multi_agent.analyze_with_agent(agent, user_input, is_final_summary)
+            })
+        else:
+            fn = lambda session: session.multi_agent.analyze_with_all_agents(user_input, is_final_summary)
+        result = await service.run(body.get("session_id", "default"), fn)
+        return _json_response(result)
+
+    @routes.post("/summary")
+    async def summary(request):
+        body = await _read_json(request)
+        user_input = body.get("input") or "Please summarize the conversation so far."
+        agent = body.get("agent")
+        if agent:
+            fn = _agent_call(agent, lambda multi_agent: multi_agent.analyze_with_agent(agent, user_input,
+                                                                                      is_final_summary=True))
+        else:
+            fn = lambda session: session.analyzer.analyze_response(user_input, is_final_summary=True)
+        result = await service.run(body.get("session_id", "default"), fn)
+        return _json_response(result)
+
+    @routes.get("/history")
+    async def history(request):
+        session_id = request.query.get("session_id", "default")
+        session = service.find_session(session_id)
+        if session is None:
+            return web.json_response({"session_id": session_id, "analyzer": [], "multi_agent": []})
+        multi_agent = session._multi_agent
+        return web.json_response({
+            "session_id": session_id,
+            "analyzer": _serialize_messages(session.analyzer.get_conversation_history()),
+            "multi_agent": _serialize_messages(multi_agent.get_conversation_history()) if multi_agent else []
+        })
+
+    @routes.post("/reset")
+    async def reset(request):
+        body = await _read_json(request)
+        session_id = body.get("session_id", "default")
+        with service._sessions_lock:
+            service.sessions.pop(session_id, None)
+        return web.json_response({"session_id": session_id, "reset": True})
+
+    @routes.get("/health")
+    async def health(request):
+        return web.json_response({"status": "ok", **service.stats()})
+
+    app = web.Application(middlewares=[_overload_middleware])
+    app.add_routes(routes)
+
+    async def on_startup(app):
+        await service.start()
+
+    async def on_cleanup(app):
+        await service.stop()
+
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the analyzers over HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--model", default="gpt-3.5-turbo")
+    parser.add_argument("--max-queue", type=int, default=100)
+    parser.add_argument("--max-batch", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=16)
+    args = parser.parse_args()
+
+    service = AnalyzerService(model_name=args.model, max_queue=args.max_queue, max_batch=args.max_batch,
+                              workers=args.workers)
+    web.run_app(create_app(service), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+import os
+import random
+import threading
+import time
+from typing import Callable, List, Optional
+
+import httpx
+
+# Circuit breaker states
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Load balancing strategies
+LEAST_OUTSTANDING = "least_outstanding"
+EWMA_LATENCY = "ewma_latency"
+
+
+class NoHealthyBackendError(RuntimeError):
+    """Raised when every backend in a pool is unavailable"""
+
+
+class Backend:
+    """A single OpenAI-compatible endpoint tracked by a BackendPool"""
+
+    def __init__(self, base_url: str, api_key: Optional[str] = None, name: Optional[str] = None):
+        """Initialize the backend
+
+        Args:
+            base_url: The OpenAI-style base URL, e.g. "https://api.openai.com/v1"
+            api_key: Optional API key for this backend (falls back to the caller's key)
+            name: Optional display name (defaults to the base URL)
+        """
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.name = name or self.base_url
+
+        # Load and latency statistics
+        self.outstanding = 0
+        self.ewma_latency = 0.0
+        self.total_requests = 0
+        self.total_failures = 0
+
+        # Passive health / circuit breaker state
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+
+    @property
+    def chat_completions_url(self) -> str:
+        """The chat completions endpoint of this backend"""
+        return f"{self.base_url}/chat/completions"
+
+    def headers(self, default_api_key: Optional[str] = None) -> dict:
+        """Request headers for this backend, preferring its own API key"""
+        return {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.api_key or default_api_key}"
+        }
+
+    def stats(self) -> dict:
+        """A snapshot of this backend's balancing and health statistics"""
+        return {
+            "name": self.name,
+            "state": self.state,
+            "outstanding": self.outstanding,
+            "ewma_latency": self.ewma_latency,
+            "total_requests": self.total_requests,
+            "total_failures": self.total_failures
+        }
+
+    def __repr__(self):
+        return f"Backend({self.name!r}, state={self.state})"
+
+
+class BackendPool:
+    """Load balancing, passive health checks and failover across backends
+
+    Requests are routed with either a least-outstanding-requests or an
+    EWMA-latency strategy. Each backend has a circuit breaker that opens after
+    ``failure_threshold`` consecutive failures and lets a single trial request
+    through once ``recovery_timeout`` has elapsed. A failed request is retried
+    on the next best backend until ``max_attempts`` backends have been tried.
+    Failures (including timeouts) enter the latency average as at least
+    ``failure_penalty`` seconds, so a failing backend loses its EWMA preference
+    before its circuit opens.
+    """
+
+    def __init__(self, backends: List[Backend], strategy: str = LEAST_OUTSTANDING,
+                 failure_threshold: int = 3, recovery_timeout: float = 30.0,
+                 ewma_alpha: float = 0.3, max_attempts: Optional[int] = None,
+                 failure_penalty: float = 10.0):
+        """Initialize the pool
+
+        Args:
+            backends: The backends to balance across
+            strategy: "least_outstanding" or "ewma_latency"
+            failure_threshold: Consecutive failures before a backend's circuit opens
+            recovery_timeout: Seconds before an open circuit allows a trial request
+            ewma_alpha: Smoothing factor for the latency moving average
+            max_attempts: Maximum backends tried per request (defaults to all of them)
+            failure_penalty: Minimum latency in seconds recorded for a failed request
+        """
+        if not backends:
+            raise ValueError("BackendPool requires at least one backend")
+        if strategy not in (LEAST_OUTSTANDING, EWMA_LATENCY):
+            raise ValueError(f"Unknown strategy '{strategy}'. Use '{LEAST_OUTSTANDING}' or '{EWMA_LATENCY}'")
+
+        self.backends = list(backends)
+        self.strategy = strategy
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.ewma_alpha = ewma_alpha
+        self.max_attempts = max_attempts or len(self.backends)
+        self.failure_penalty = failure_penalty
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_urls(cls, urls: List[str], api_key: Optional[str] = None, **kwargs) -> "BackendPool":
+        """Create a pool from a list of base URLs sharing one API key"""
+        return cls([Backend(url, api_key=api_key) for url in urls], **kwargs)
+
+    @classmethod
+    def from_env(cls) -> Optional["BackendPool"]:
+        """Create a pool from OPENAI_API_BASES (comma-separated), or None if unset
+
+        OPENAI_POOL_STRATEGY optionally selects the balancing strategy.
+        """
+        bases = [url.strip() for url in os.getenv("OPENAI_API_BASES", "").split(",") if url.strip()]
+        if not bases:
+            return None
+        strategy = os.getenv("OPENAI_POOL_STRATEGY", LEAST_OUTSTANDING)
+        return cls.from_urls(bases, api_key=os.getenv("OPENAI_API_KEY"), strategy=strategy)
+
+    def _is_available(self, backend: Backend, now: float) -> bool:
+        """Check (and advance) a backend's circuit breaker. Must hold the lock."""
+        if backend.state == OPEN and now - backend.opened_at >= self.recovery_timeout:
+            # Allow one trial request through
+            backend.state = HALF_OPEN
+            return True
+        if backend.state == HALF_OPEN:
+            # Only one trial request at a time
+            return backend.outstanding == 0
+        return backend.state == CLOSED
+
+    def _score(self, backend: Backend) -> float:
+        """Lower is better"""
+        if self.strategy == EWMA_LATENCY:
+            # Peak-EWMA: expected latency scaled by the work already queued on the backend
+            return backend.ewma_latency * (backend.outstanding + 1)
+        return backend.outstanding
+
+    def acquire(self, exclude=()) -> Backend:
+        """Pick the best available backend and mark a request outstanding on it
+
+        Args:
+            exclude: Backends that must not be picked (e.g. ones that already failed)
+
+        Returns:
+            The selected backend. Callers must pass it to release() afterwards.
+        """
+        with self._lock:
+            now = time.monotonic()
+            candidates = [b for b in self.backends if b not in exclude and self._is_available(b, now)]
+            if not candidates:
+                raise NoHealthyBackendError("No healthy backend available in the pool")
+            best = min(self._score(b) for b in candidates)
+            # Break ties randomly so equal backends share the load
+            backend = random.choice([b for b in candidates if self._score(b) == best])
+            backend.outstanding += 1
+            backend.total_requests += 1
+            return backend
+
+    def release(self, backend: Backend, latency: float, success: bool):
+        """Record the outcome of a request started with acquire()"""
+        with self._lock:
+            backend.outstanding -= 1
+            if not success:
+                latency = max(latency, self.failure_penalty)
+            if backend.ewma_latency == 0.0:
+                backend.ewma_latency = latency
+            else:
+                backend.ewma_latency += self.ewma_alpha * (latency - backend.ewma_latency)
+            if success:
+                backend.consecutive_failures = 0
+                backend.state = CLOSED
+            else:
+                backend.total_failures += 1
+                backend.consecutive_failures += 1
+                if backend.state == HALF_OPEN or backend.consecutive_failures >= self.failure_threshold:
+                    backend.state = OPEN
+                    backend.opened_at = time.monotonic()
+
+    @staticmethod
+    def _is_failure(result) -> bool:
+        """Treat server errors and rate limiting as backend failures"""
+        status = getattr(result, "status_code", 200)
+        return status >= 500 or status == 429
+
+    def execute(self, request_fn: Callable[[Backend], object]):
+        """Run a request against the pool with automatic failover
+
+        Args:
+            request_fn: Called with the selected Backend; performs the request and
+                returns a response object (anything with a ``status_code``). It
+                should set a timeout: an exception (e.g. a timeout) counts as a
+                failure of the backend, but a request that never returns does not
+
+        Returns:
+            The first successful response, or the last failed response if every
+            attempt failed with an HTTP error
+
+        Raises:
+            NoHealthyBackendError: If no backend could be tried at all
+            Exception: The last transport error if every attempt raised
+        """
+        tried = []
+        last_result = None
+        last_error = None
+        for _ in range(self.max_attempts):
+            try:
+                backend = self.acquire(exclude=tried)
+            except NoHealthyBackendError:
+                break
+            tried.append(backend)
+
+            start = time.monotonic()
+            try:
+                result = request_fn(backend)
+            except Exception as e:
+                self.release(backend, time.monotonic() - start, success=False)
+                last_error = e
+                continue
+
+            failed = self._is_failure(result)
+            self.release(backend, time.monotonic() - start, success=not failed)
+            if not failed:
+                return result
+            last_result = result
+
+        if last_result is not None:
+            return last_result
+        if last_error is not None:
+            raise last_error
+        raise NoHealthyBackendError("No healthy backend available in the pool")
+
+    def httpx_transport(self, nominal_base_url: str, inner: Optional[httpx.BaseTransport] = None) -> "PoolTransport":
+        """Create an httpx transport that routes requests through this pool"""
+        return PoolTransport(self, nominal_base_url, inner)
+
+    def stats(self) -> List[dict]:
+        """Statistics for every backend in the pool"""
+        with self._lock:
+            return [b.stats() for b in self.backends]
+
+
+class PoolTransport(httpx.BaseTransport):
+    """httpx transport that rewrites requests onto the backends of a pool
+
+    Used as the ``http_client`` transport of ``ChatOpenAI`` so LangChain traffic
+    shares balancing, health state and failover with the raw ``requests`` path.
+    Requests are addressed to ``nominal_base_url`` and re-targeted per attempt.
+    """
+
+    def __init__(self, pool: BackendPool, nominal_base_url: str, inner: Optional[httpx.BaseTransport] = None):
+        self.pool = pool
+        self.nominal_base_url = nominal_base_url.rstrip("/")
+        self.inner = inner or httpx.HTTPTransport()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        url = str(request.url)
+        suffix = url[len(self.nominal_base_url):] if url.startswith(self.nominal_base_url) else request.url.raw_path.decode("ascii")
+        body = request.read()
+
+        def send(backend: Backend) -> httpx.Response:
+            headers = dict(request.headers)
+            if backend.api_key:
+                headers["authorization"] = f"Bearer {backend.api_key}"
+            headers.pop("host", None)
+            routed = httpx.Request(request.method, backend.base_url + suffix, headers=headers, content=body)
+            response = self.inner.handle_request(routed)
+            # Buffer the body so the connection is released before failover decisions
+            response.read()
+            return response
+
+        return self.pool.execute(send)
+
+    def close(self):
+        self.inner.close()
+
+
+_default_pool = None
+_default_pool_loaded = False
+_default_pool_lock = threading.Lock()
+
+
+def get_default_pool() -> Optional[BackendPool]:
+    """The process-wide pool shared by all analyzers (configured from the environment)"""
+    global _default_pool, _default_pool_loaded
+    with _default_pool_lock:
+        if not _default_pool_loaded:
+            _default_pool = BackendPool.from_env()
+            _default_pool_loaded = True
+        return _default_pool
+
+
+def set_default_pool(pool: Optional[BackendPool]):
+    """Replace the process-wide pool shared by all analyzers"""
+    global _default_pool, _default_pool_loaded
+    with _default_pool_lock:
+        _default_pool = pool
+        _default_pool_loaded = True
@@ -0,0 +1,85 @@
+import os
+from langchain.memory import ConversationBufferMemory
+from langchain_core.messages import get_buffer_string
+from retrieval_memory import RetrievalConversationMemory
+from token_utils import estimate_tokens
+
+TOPICS = {
+    "budget": "The budget is ${n},000 for the first release, with {n}% reserved for contingency.",
+    "stack": "The backend uses Python {n}.x with PostgreSQL, and the frontend is React Native.",
+    "timeline": "We plan to launch in {n} months, with a beta for internal testers at month {m}.",
+    "team": "The team has {n} engineers and {m} designers, and we are hiring a product manager.",
+    "marketing": "Marketing will focus on fitness influencers, targeting {n} thousand signups.",
+    "security": "User data is encrypted at rest, and we run penetration tests every {n} weeks.",
+    "analytics": "We track retention cohorts weekly and aim for {n}% day-30 retention.",
+    "integrations": "Wearable integrations include Garmin and Fitbit, with Apple Health in phase {m}.",
+}
+
+
+def synthetic_session(turns=200):
+    """Yield (user input, assistant reply, topic) for a long synthetic interview"""
+    names = list(TOPICS)
+    for i in range(turns):
+        topic = names[(i * 3) % len(names)]
+        user_input = f"Update on {topic}: " + TOPICS[topic].format(n=i % 50 + 2, m=i % 7 + 1)
+        reply = (
+            f"Noted the {topic} details from turn {i}. The key information is captured, "
+            f"but it is unclear how this {topic} decision affects the rest of the plan. "
+            f"Follow-up question: What constraints apply to the {topic} going forward?"
+        )
+        yield user_input, reply, topic
+
+
+def run_benchmark(turns=200, recent_k=4, relevant_m=3):
+    """Compare prompt tokens of the full buffer and retrieval memory over a synthetic session
+
+    Returns:
+        A dictionary with total prompt tokens for each memory, the reduction, and
+        how often retrieval pulled an older turn on the same topic into the prompt
+    """
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    from langchain_analyzer import LangChainAnalyzer
+
+    buffer_memory = ConversationBufferMemory(memory_key="history", return_messages=True)
+    retrieval_memory = RetrievalConversationMemory(recent_k=recent_k, relevant_m=relevant_m)
+    # Only the prompt template is used; no LLM calls are made
+    prompt = LangChainAnalyzer(memory=buffer_memory).analysis_prompt
+
+    buffer_tokens = retrieval_tokens = 0
+    topic_hits = topic_queries = 0
+    for i, (user_input, reply, topic) in enumerate(synthetic_session(turns)):
+        for memory in (buffer_memory, retrieval_memory):
+            history = memory.load_memory_variables({"input": user_input})["history"]
+            tokens = estimate_tokens(get_buffer_string(prompt.format_messages(history=history, input=user_input)))
+            if memory is buffer_memory:
+                buffer_tokens += tokens
+            else:
+                retrieval_tokens += tokens
+                older = history[:-2 * recent_k] if i > recent_k else []
+                if older:
+                    topic_queries += 1
+                    topic_hits += any(f"on {topic}:" in str(m.content) for m in older)
+            memory.save_context({"input": user_input}, {"text": reply})
+
+    return {
+        "turns": turns,
+        "buffer_tokens": buffer_tokens,
+        "retrieval_tokens": retrieval_tokens,
+        "reduction": 1 - retrieval_tokens / buffer_tokens,
+        "relevant_topic_hit_rate": topic_hits / topic_queries if topic_queries else 0.0,
+    }
+
+
+def main():
+    result = run_benchmark()
+    print(f"{'='*50}")
+    print(f"Prompt tokens over a {result['turns']}-turn synthetic session")
+    print(f"{'='*50}")
+    print(f"ConversationBufferMemory:    {result['buffer_tokens']:>10,}")
+    print(f"RetrievalConversationMemory: {result['retrieval_tokens']:>10,}")
+    print(f"Reduction:                   {result['reduction']:>10.1%}")
+    print(f"Same-topic turn retrieved:   {result['relevant_topic_hit_rate']:>10.1%}")
+
+
+if __name__ == "__main__":
+    main()
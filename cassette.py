@@ -0,0 +1,364 @@
+import atexit
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Union
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+# Cassette modes
+RECORD = "record"        # always call the backend and store the exchange
+REPLAY = "replay"        # only replay; a request not on the cassette is an error
+ONCE = "once"            # replay if recorded, otherwise call the backend and record
+MODES = (RECORD, REPLAY, ONCE)
+
+# Replay latency: sleep for the latency measured when recording
+RECORDED = "recorded"
+
+# Request body fields that do not change the answer
+VOLATILE_FIELDS = ("user", "stream_options")
+
+# Response headers worth keeping (never the request's Authorization header)
+KEPT_HEADERS = ("content-type",)
+
+
+class CassetteMiss(LookupError):
+    """Raised in replay mode when a request was never recorded"""
+
+
+def request_key(method: str, url: str, body: Optional[bytes]) -> str:
+    """Hash identifying a request independently of host, key order and whitespace
+
+    Only the method, the URL path (so requests routed to different backends of
+    a pool match) and the JSON body with sorted keys are hashed.
+    """
+    path = urlsplit(url).path.rstrip("/")
+    # Drop the API version prefix: ".../v1/chat/completions" -> "chat/completions"
+    for prefix in ("/v1/", "/openai/"):
+        if prefix in path:
+            path = path.split(prefix, 1)[1]
+    payload = body or b""
+    try:
+        data = json.loads(payload)
+    except ValueError:
+        normalized = payload.decode("utf-8", errors="replace")
+    else:
+        if isinstance(data, dict):
+            data = {key: value for key, value in data.items() if key not in VOLATILE_FIELDS}
+        normalized = json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    digest = hashlib.sha256(f"{method.upper()} {path}\n{normalized}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class Cassette:
+    """Recorded LLM request/response pairs, replayed by request hash
+
+    A cassette plugs into both HTTP paths of the analyzers: ``requests_call``
+    around the backend pool of ``ResponseAnalyzer`` and an ``httpx``
+    transport for ``ChatOpenAI``. It sits outside the pool, so a replay miss
+    is never mistaken for a backend failure. Identical requests recorded
+    several times are replayed in recording order (the last one repeats).
+    Replays can sleep for the latency measured while recording, or for a
+    fixed simulated latency, so a cassette doubles as realistic benchmark
+    input.
+
+    New recordings are kept in memory and written when the cassette is
+    closed (use it as a context manager or call ``close()``); cassettes with
+    unsaved recordings are also saved when the interpreter exits.
+    """
+
+    def __init__(self, path: Optional[str] = None, mode: str = ONCE,
+                 latency: Union[None, str, float] = None):
+        """Initialize the cassette
+
+        Args:
+            path: JSON file the interactions are loaded from and saved to (None keeps them in memory)
+            mode: RECORD, REPLAY or ONCE
+            latency: Replay delay: None for none, RECORDED for the recorded latency,
+                or a number of seconds
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown cassette mode '{mode}', expected one of {MODES}")
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self.interactions: Dict[str, List[dict]] = {}
+        self._replayed: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        # Recorded since the last save
+        self._dirty = False
+
+        # Statistics
+        self.hits = 0
+        self.recorded = 0
+
+        if path and os.path.exists(path) and mode != RECORD:
+            self.load(path)
+
+    @classmethod
+    def from_env(cls) -> Optional["Cassette"]:
+        """Create a cassette from LLM_CASSETTE / LLM_CASSETTE_MODE / LLM_CASSETTE_LATENCY
+
+        Returns:
+            A Cassette, or None if LLM_CASSETTE is not set
+        """
+        path = os.getenv("LLM_CASSETTE", "").strip()
+        if not path:
+            return None
+        latency = os.getenv("LLM_CASSETTE_LATENCY", "").strip() or None
+        if latency and latency != RECORDED:
+            latency = float(latency)
+        return cls(path, mode=os.getenv("LLM_CASSETTE_MODE", ONCE).strip(), latency=latency)
+
+    def __len__(self):
+        return sum(len(entries) for entries in self.interactions.values())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Save the cassette if anything was recorded since the last save"""
+        if self._dirty:
+            self.save()
+
+    def load(self, path: str):
+        """Load the interactions stored in a cassette file"""
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        with self._lock:
+            self.interactions = {}
+            for interaction in data.get("interactions", []):
+                self.interactions.setdefault(interaction["key"], []).append(interaction)
+            self._replayed = {}
+
+    def save(self, path: Optional[str] = None):
+        """Write the interactions to disk (atomically)"""
+        path = path or self.path
+        if not path:
+            return
+        with self._lock:
+            interactions = [entry for entries in self.interactions.values() for entry in entries]
+            if path == self.path:
+                self._dirty = False
+                _unsaved.discard(self)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary = f"{path}.tmp"
+        with self._save_lock:
+            with open(temporary, "w", encoding="utf-8") as f:
+                json.dump({"version": 1, "interactions": interactions}, f, indent=2, ensure_ascii=False)
+            os.replace(temporary, path)
+
+    def lookup(self, key: str) -> Optional[dict]:
+        """The next recorded interaction for a request key, if any"""
+        with self._lock:
+            entries = self.interactions.get(key)
+            if not entries:
+                return None
+            index = self._replayed.get(key, 0)
+            self._replayed[key] = index + 1
+            self.hits += 1
+            return entries[min(index, len(entries) - 1)]
+
+    def record(self, key: str, method: str, url: str, body: Optional[bytes], status: int,
+               headers: Dict[str, str], content: bytes, latency: float):
+        """Store one exchange (written to disk on close)"""
+        if status >= 500 or status == 429:
+            # Transient backend failures are not part of the conversation
+            return
+        try:
+            request_body = json.loads(body or b"null")
+        except ValueError:
+            request_body = (body or b"").decode("utf-8", errors="replace")
+        interaction = {
+            "key": key,
+            "request": {"method": method, "path": urlsplit(url).path, "body": request_body},
+            "response": {
+                "status": status,
+                "headers": {name: value for name, value in headers.items() if name.lower() in KEPT_HEADERS},
+                "body": content.decode("utf-8", errors="replace")
+            },
+            "latency": round(latency, 4)
+        }
+        with self._lock:
+            self.interactions.setdefault(key, []).append(interaction)
+            self.recorded += 1
+            if self.path:
+                self._dirty = True
+                _unsaved.add(self)
+
+    def replay(self, method: str, url: str, body: Optional[bytes]) -> Optional[dict]:
+        """Find the recorded response for a request, sleeping for the replay latency
+
+        Returns:
+            The recorded interaction, or None if the request should go to the backend
+
+        Raises:
+            CassetteMiss: In replay mode, if the request was never recorded
+        """
+        if self.mode == RECORD:
+            return None
+        interaction = self.lookup(request_key(method, url, body))
+        if interaction is None:
+            if self.mode == REPLAY:
+                raise CassetteMiss(f"No recorded response for {method} {urlsplit(url).path} in {self.path or 'cassette'}")
+            return None
+        delay = interaction.get("latency", 0.0) if self.latency == RECORDED else self.latency
+        if delay:
+            time.sleep(delay)
+        return interaction
+
+    def requests_call(self, method: str, url: str, data, send: Callable[[], requests.Response]) -> requests.Response:
+        """Replay a JSON request, or make it with send() and record the response
+
+        Args:
+            method: HTTP method
+            url: Nominal URL of the request (only its path is matched)
+            data: The JSON body send() posts
+            send: Makes the live request (e.g. through a backend pool)
+
+        Raises:
+            CassetteMiss: In replay mode, if the request was never recorded
+        """
+        body = json.dumps(data).encode("utf-8")
+        interaction = self.replay(method, url, body)
+        if interaction is not None:
+            return _requests_response(interaction, url)
+        start = time.monotonic()
+        response = send()
+        self.record(request_key(method, url, body), method, url, body, response.status_code,
+                    dict(response.headers), response.content, time.monotonic() - start)
+        return response
+
+    def requests_adapter(self, inner: Optional[HTTPAdapter] = None) -> "CassetteAdapter":
+        """A requests transport adapter backed by this cassette"""
+        return CassetteAdapter(self, inner)
+
+    def requests_session(self) -> requests.Session:
+        """A requests session whose HTTP(S) traffic goes through this cassette"""
+        session = requests.Session()
+        adapter = self.requests_adapter()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def httpx_transport(self, inner: Optional[httpx.BaseTransport] = None) -> "CassetteTransport":
+        """An httpx transport backed by this cassette, wrapping inner for live calls"""
+        return CassetteTransport(self, inner)
+
+    def httpx_client(self, inner: Optional[httpx.BaseTransport] = None) -> httpx.Client:
+        """An httpx client (e.g. for ChatOpenAI or OpenAI) going through this cassette"""
+        return httpx.Client(transport=self.httpx_transport(inner))
+
+    def stats(self) -> dict:
+        return {"mode": self.mode, "interactions": len(self), "hits": self.hits, "recorded": self.recorded}
+
+
+def _requests_response(interaction: dict, url: str, request=None) -> requests.Response:
+    """A requests Response rebuilt from a recorded interaction"""
+    recorded = interaction["response"]
+    response = requests.Response()
+    response.status_code = recorded["status"]
+    response.headers = CaseInsensitiveDict(recorded["headers"])
+    response._content = recorded["body"].encode("utf-8")
+    response.encoding = "utf-8"
+    response.url = url
+    response.request = request
+    response.reason = "Replayed"
+    return response
+
+
+class CassetteAdapter(HTTPAdapter):
+    """requests adapter that replays recorded responses and records new ones"""
+
+    def __init__(self, cassette: Cassette, inner: Optional[HTTPAdapter] = None):
+        super().__init__()
+        self.cassette = cassette
+        self.inner = inner or HTTPAdapter()
+
+    def send(self, request, **kwargs):
+        body = request.body.encode("utf-8") if isinstance(request.body, str) else request.body
+        interaction = self.cassette.replay(request.method, request.url, body)
+        if interaction is not None:
+            return _requests_response(interaction, request.url, request)
+
+        start = time.monotonic()
+        response = self.inner.send(request, **kwargs)
+        content = response.content
+        self.cassette.record(request_key(request.method, request.url, body), request.method, request.url, body,
+                             response.status_code, dict(response.headers), content, time.monotonic() - start)
+        return response
+
+    def close(self):
+        self.inner.close()
+
+
+class CassetteTransport(httpx.BaseTransport):
+    """httpx transport that replays recorded responses and records new ones"""
+
+    def __init__(self, cassette: Cassette, inner: Optional[httpx.BaseTransport] = None):
+        self.cassette = cassette
+        self.inner = inner or httpx.HTTPTransport()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        body = request.read()
+        url = str(request.url)
+        interaction = self.cassette.replay(request.method, url, body)
+        if interaction is not None:
+            recorded = interaction["response"]
+            return httpx.Response(recorded["status"], headers=recorded["headers"],
+                                  content=recorded["body"].encode("utf-8"), request=request)
+
+        start = time.monotonic()
+        response = self.inner.handle_request(request)
+        content = response.read()
+        self.cassette.record(request_key(request.method, url, body), request.method, url, body,
+                             response.status_code, dict(response.headers), content, time.monotonic() - start)
+        return response
+
+    def close(self):
+        self.inner.close()
+
+
+# Cassettes holding recordings not yet written to disk
+_unsaved = set()
+
+
+@atexit.register
+def _save_unsaved():
+    for cassette in list(_unsaved):
+        cassette.close()
+
+
+_default_cassette = None
+_default_cassette_loaded = False
+_default_cassette_lock = threading.Lock()
+
+
+def get_default_cassette() -> Optional[Cassette]:
+    """The process-wide cassette used by all analyzers (configured from the environment)"""
+    global _default_cassette, _default_cassette_loaded
+    with _default_cassette_lock:
+        if not _default_cassette_loaded:
+            _default_cassette = Cassette.from_env()
+            _default_cassette_loaded = True
+        return _default_cassette
+
+
+def set_default_cassette(cassette: Optional[Cassette]):
+    """Replace the process-wide cassette used by all analyzers"""
+    global _default_cassette, _default_cassette_loaded
+    with _default_cassette_lock:
+        _default_cassette = cassette
+        _default_cassette_loaded = True
@@ -0,0 +1,216 @@
+import re
+import zlib
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+from token_utils import estimate_tokens
+
+WORD_PATTERN = re.compile(r"\w+")
+
+# Multipliers of the splitmix64 finalizer (a bijective 64-bit mixer)
+_MIX1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX2 = np.uint64(0x94D049BB133111EB)
+
+
+def _mix64(x: np.ndarray) -> np.ndarray:
+    """Scramble every bit of x into every bit of the result (uint64 arithmetic wraps)"""
+    x = (x ^ (x >> np.uint64(30))) * _MIX1
+    x = (x ^ (x >> np.uint64(27))) * _MIX2
+    return x ^ (x >> np.uint64(31))
+
+
+class DedupReport:
+    """What a deduplication pass removed from one document"""
+
+    def __init__(self, total_chunks: int = 0, kept_chunks: int = 0, tokens_before: int = 0, tokens_after: int = 0,
+                 duplicates: Optional[Dict[int, int]] = None):
+        self.total_chunks = total_chunks
+        self.kept_chunks = kept_chunks
+        self.tokens_before = tokens_before
+        self.tokens_after = tokens_after
+        # Index of each dropped chunk -> index of the kept chunk it duplicates
+        self.duplicates = duplicates or {}
+
+    @property
+    def dropped_chunks(self) -> int:
+        return self.total_chunks - self.kept_chunks
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+    def __repr__(self):
+        return (f"DedupReport(kept={self.kept_chunks}/{self.total_chunks}, "
+                f"tokens_saved={self.tokens_saved} of {self.tokens_before})")
+
+
+class MinHashDeduplicator:
+    """Near-duplicate chunk elimination with MinHash signatures and LSH banding
+
+    Each chunk is reduced to a set of word shingles and a MinHash signature
+    that estimates Jaccard similarity. Locality-sensitive hashing over bands of
+    the signature finds candidate pairs without comparing every chunk to every
+    other one; candidates whose estimated similarity reaches ``threshold`` are
+    treated as duplicates of the earliest such chunk and dropped.
+
+    Neighbouring chunks from the text splitter share only their 200-character
+    overlap, which is well below typical thresholds, so ordinary documents are
+    left intact while repeated passages (log lines, pasted specs, quoted email
+    replies) are removed.
+
+    Only the ``window`` most recently kept chunks are remembered (about 5 KB
+    each), so memory stays constant on inputs of any size; a chunk repeating
+    one from further back is kept.
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 128, shingle_size: int = 5, seed: int = 1,
+                 window: Optional[int] = 2048):
+        """Initialize the deduplicator
+
+        Args:
+            threshold: Estimated Jaccard similarity at or above which chunks are duplicates
+            num_perm: Number of hash functions in each signature
+            shingle_size: Words per shingle
+            seed: Seed for the hash functions
+            window: Kept chunks remembered for comparison (None for all of them)
+        """
+        if not 0 < threshold <= 1:
+            raise ValueError("threshold must be in (0, 1]")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.window = window
+        self.bands, self.rows = self._choose_bands(num_perm, threshold)
+
+        rng = np.random.default_rng(seed)
+        # One random 64-bit key per hash function; h_i(x) = mix64(x ^ key_i)
+        self._keys = rng.integers(0, np.iinfo(np.uint64).max, size=num_perm, dtype=np.uint64, endpoint=True)
+
+    @staticmethod
+    def _choose_bands(num_perm: int, threshold: float):
+        """Pick bands x rows whose LSH S-curve crosses 50% closest to the threshold"""
+        best = (num_perm, 1)
+        best_error = float("inf")
+        for rows in range(1, num_perm + 1):
+            bands = num_perm // rows
+            if bands == 0:
+                break
+            # Similarity at which a pair becomes a candidate with probability ~1/2
+            crossover = (1 / bands) ** (1 / rows)
+            # Err on the low side so true duplicates are not missed
+            error = abs(crossover - threshold) + (0.5 if crossover > threshold else 0)
+            if error < best_error:
+                best, best_error = (bands, rows), error
+        return best
+
+    def _shingles(self, text: str) -> np.ndarray:
+        words = WORD_PATTERN.findall(text.lower())
+        if len(words) < self.shingle_size:
+            grams = [" ".join(words)] if words else []
+        else:
+            grams = [" ".join(words[i:i + self.shingle_size]) for i in range(len(words) - self.shingle_size + 1)]
+        return np.array(sorted({zlib.crc32(g.encode("utf-8")) for g in grams}), dtype=np.uint64)
+
+    def signature(self, text: str) -> np.ndarray:
+        """The MinHash signature of a text"""
+        shingles = self._shingles(text)
+        if len(shingles) == 0:
+            return np.full(self.num_perm, np.iinfo(np.uint64).max, dtype=np.uint64)
+        # Every hash function applied to every shingle at once
+        return _mix64(shingles[:, None] ^ self._keys).min(axis=0)
+
+    @staticmethod
+    def similarity(first: np.ndarray, second: np.ndarray) -> float:
+        """Estimated Jaccard similarity of two signatures"""
+        return float(np.mean(first == second))
+
+    def iter_unique(self, chunks: Iterable[str], report: Optional[DedupReport] = None) -> Iterator[str]:
+        """Yield chunks that are not near-duplicates of an earlier chunk
+
+        Works on a stream at constant memory: only the signatures of the last
+        ``window`` kept chunks are retained.
+
+        Args:
+            chunks: Chunks in document order
+            report: Optional DedupReport updated as chunks are consumed
+        """
+        report = report if report is not None else DedupReport()
+        signatures: Dict[int, np.ndarray] = {}
+        buckets: Dict[tuple, List[int]] = {}
+        # (index, band keys) of the remembered chunks, oldest first
+        remembered = deque()
+
+        for i, chunk in enumerate(chunks):
+            tokens = estimate_tokens(chunk)
+            report.total_chunks += 1
+            report.tokens_before += tokens
+
+            signature = self.signature(chunk)
+            band_keys = [
+                (band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+                for band in range(self.bands)
+            ]
+            candidates = sorted({j for key in band_keys for j in buckets.get(key, [])})
+            original = next((j for j in candidates if self.similarity(signature, signatures[j]) >= self.threshold), None)
+            if original is not None:
+                report.duplicates[i] = original
+                continue
+
+            # Only kept chunks are indexed, so each duplicate maps to a chunk that survives
+            signatures[i] = signature
+            for key in band_keys:
+                buckets.setdefault(key, []).append(i)
+            remembered.append((i, band_keys))
+            if self.window is not None and len(remembered) > self.window:
+                oldest, oldest_keys = remembered.popleft()
+                del signatures[oldest]
+                for key in oldest_keys:
+                    # Buckets are filled in order, so the oldest index comes first
+                    bucket = buckets[key]
+                    bucket.pop(0)
+                    if not bucket:
+                        del buckets[key]
+            report.kept_chunks += 1
+            report.tokens_after += tokens
+            yield chunk
+
+    def deduplicate(self, chunks: List[str]):
+        """Drop chunks that are near-duplicates of an earlier chunk
+
+        Args:
+            chunks: Chunks in document order
+
+        Returns:
+            A tuple of (kept chunks in order, DedupReport)
+        """
+        report = DedupReport()
+        kept_chunks = list(self.iter_unique(chunks, report))
+        return kept_chunks, report
+
+
+def merge_chunks(text: str, chunks: List[str], dropped: Iterable[int]) -> str:
+    """Rebuild a text from its splitter chunks, leaving out the dropped ones
+
+    Chunks are contiguous substrings of the text, so kept chunks are located
+    and their spans merged; the overlap between neighbours is not repeated.
+    """
+    dropped = set(dropped)
+    spans = []
+    position = 0
+    for i, chunk in enumerate(chunks):
+        start = text.find(chunk, position)
+        if start < 0:
+            start = position
+        end = start + len(chunk)
+        # The next chunk starts inside this one's overlap, at the earliest
+        position = start + 1
+        if i in dropped:
+            continue
+        # Merge with the previous span if they overlap or only whitespace separates them
+        if spans and (start <= spans[-1][1] or not text[spans[-1][1]:start].strip()):
+            spans[-1][1] = max(spans[-1][1], end)
+        else:
+            spans.append([start, end])
+    return "\n\n".join(text[start:end] for start, end in spans)
@@ -0,0 +1,93 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, Optional
+
+import numpy as np
+
+
+def chunk_hash(text: str) -> str:
+    """Content address of a chunk"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class IngestReport:
+    """How much work an ingestion could reuse from the chunk store"""
+
+    def __init__(self, reused: int = 0, recomputed: int = 0, removed: int = 0, unchanged_documents: int = 0):
+        self.reused = reused
+        self.recomputed = recomputed
+        self.removed = removed
+        self.unchanged_documents = unchanged_documents
+
+    @property
+    def total(self) -> int:
+        return self.reused + self.recomputed
+
+    def __repr__(self):
+        return (f"IngestReport(reused={self.reused}, recomputed={self.recomputed}, "
+                f"removed={self.removed}, unchanged_documents={self.unchanged_documents})")
+
+
+class ChunkStore:
+    """Content-addressed cache of per-chunk embeddings and summaries
+
+    Chunks are keyed by the SHA-256 of their text, so an edited document only
+    needs work for the chunks whose content actually changed. The store can be
+    saved to and loaded from a single ``.npz`` file.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """Initialize the store
+
+        Args:
+            path: Optional file to load from (if it exists) and save() to
+        """
+        self.path = path
+        self.embeddings: Dict[str, np.ndarray] = {}
+        self.summaries: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            self.load(path)
+
+    def get_embedding(self, key: str, dim: Optional[int] = None) -> Optional[np.ndarray]:
+        """The cached embedding for a chunk hash (ignoring ones of a different dimension)"""
+        vector = self.embeddings.get(key)
+        if vector is None or (dim is not None and len(vector) != dim):
+            return None
+        return vector
+
+    def put_embedding(self, key: str, vector: np.ndarray):
+        with self._lock:
+            self.embeddings[key] = np.asarray(vector, dtype=np.float32)
+
+    def get_summary(self, key: str) -> Optional[str]:
+        """The cached summary for a chunk hash"""
+        return self.summaries.get(key)
+
+    def put_summary(self, key: str, summary: str):
+        with self._lock:
+            self.summaries[key] = summary
+
+    def save(self, path: Optional[str] = None):
+        """Write the store to an .npz file"""
+        path = path or self.path
+        if not path:
+            raise ValueError("No path given to save the chunk store to")
+        with self._lock:
+            keys = list(self.embeddings)
+            vectors = np.vstack([self.embeddings[k] for k in keys]) if keys else np.zeros((0, 0), dtype=np.float32)
+            summaries = json.dumps(self.summaries)
+        with open(path, "wb") as f:
+            np.savez(f, keys=np.array(keys, dtype=str), vectors=vectors, summaries=np.array(summaries))
+
+    def load(self, path: str):
+        """Merge the contents of an .npz file into the store"""
+        with np.load(path) as data:
+            keys = [str(k) for k in data["keys"]]
+            vectors = data["vectors"]
+            summaries = json.loads(str(data["summaries"]))
+        with self._lock:
+            self.embeddings.update(zip(keys, vectors))
+            self.summaries.update(summaries)
@@ -1,7 +1,7 @@
 import os
 from dotenv import load_dotenv
 from langchain_analyzer import LangChainAnalyzer, MultiAgentAnalyzer
-from langchain.memory import ConversationBufferMemory
+from message_log import USER, MessageLog, MessageLogMemory
 
 # Load environment variables
 load_dotenv()
@@ -9,45 +9,43 @@ load_dotenv()
 def create_custom_multi_agent():
     """Create a custom multi-agent system with specialized roles"""
     
-    # Create a shared memory for all agents
-    shared_memory = ConversationBufferMemory(
-        memory_key="history",
-        return_messages=True
-    )
+    # Create a shared message log; each agent reads it through its own view
+    # (user turns, its own outputs and a digest of the other agents)
+    message_log = MessageLog()
     
     # Define custom agent roles and their specialized prompts
     custom_agents = {
         "ui_ux_expert": LangChainAnalyzer(
             model_name="gpt-3.5-turbo",
             temperature=0.7,
-            memory=shared_memory,
+            memory=MessageLogMemory(log=message_log, agent_name="ui_ux_expert"),
             agent_role="UI/UX expert"
         ),
         "backend_architect": LangChainAnalyzer(
             model_name="gpt-3.5-turbo",
             temperature=0.7,
-            memory=shared_memory,
+            memory=MessageLogMemory(log=message_log, agent_name="backend_architect"),
             agent_role="backend architect"
         ),
         "security_specialist": LangChainAnalyzer(
             model_name="gpt-3.5-turbo",
             temperature=0.7,
-            memory=shared_memory,
+            memory=MessageLogMemory(log=message_log, agent_name="security_specialist"),
             agent_role="security specialist"
         ),
         "data_scientist": LangChainAnalyzer(
             model_name="gpt-3.5-turbo",
             temperature=0.7,
-            memory=shared_memory,
+            memory=MessageLogMemory(log=message_log, agent_name="data_scientist"),
             agent_role="data scientist"
         )
     }
     
-    return custom_agents, shared_memory
+    return custom_agents, message_log
 
 def main():
-    # Create custom agents with shared memory
-    custom_agents, shared_memory = create_custom_multi_agent()
+    # Create custom agents sharing a message log
+    custom_agents, message_log = create_custom_multi_agent()
     
     # Example project description
     project_description = """
@@ -60,10 +58,13 @@ def main():
     print(project_description)
     print("\n=== Getting questions from specialized agents ===")
     
-    # Get questions from each specialized agent
+    # Get questions from each specialized agent (the user turn is recorded once for all of them)
+    turn = message_log.append(USER, project_description).version
     for agent_name, agent in custom_agents.items():
         print(f"\n--- {agent_name.replace('_', ' ').title()} ---")
+        agent.memory.current_turn = turn
         result = agent.analyze_response(project_description)
+        agent.memory.current_turn = None
         print(f"Analysis: {result['analysis']}")
         print(f"Question: {result['follow_up_questions']}")
     
@@ -79,25 +80,31 @@ def main():
     print("\n=== Getting follow-up questions from specialized agents ===")
     
     # Get follow-up questions from each specialized agent
+    turn = message_log.append(USER, user_response).version
     for agent_name, agent in custom_agents.items():
         print(f"\n--- {agent_name.replace('_', ' ').title()} ---")
+        agent.memory.current_turn = turn
         result = agent.analyze_response(user_response)
+        agent.memory.current_turn = None
         print(f"Analysis: {result['analysis']}")
         print(f"Question: {result['follow_up_questions']}")
     
     # Get a final summary from each agent
     print("\n=== Final Summaries from Each Agent ===")
+    turn = message_log.append(USER, user_response).version
     for agent_name, agent in custom_agents.items():
         print(f"\n--- {agent_name.replace('_', ' ').title()} Summary ---")
+        agent.memory.current_turn = turn
         result = agent.analyze_response(user_response, is_final_summary=True)
+        agent.memory.current_turn = None
         print(result['analysis'])
     
-    # Example of creating a new agent that inherits the shared memory
+    # Example of creating a new agent that reads the shared message log
     print("\n=== Adding a New Agent Mid-Conversation ===")
     new_agent = LangChainAnalyzer(
         model_name="gpt-3.5-turbo",
         temperature=0.7,
-        memory=shared_memory,  # Use the same shared memory
+        memory=MessageLogMemory(log=message_log, agent_name="project_manager"),  # Same log, own view
         agent_role="project manager"
     )
     
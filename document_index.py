@@ -0,0 +1,431 @@
+import os
+import re
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain.docstore.document import Document
+
+from chunk_store import ChunkStore, IngestReport, chunk_hash
+from stream_ingest import Source, iter_chunks
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+class HashingEmbedder:
+    """Local text embeddings using signed feature hashing
+
+    Word unigrams and bigrams are hashed into a fixed number of dimensions with
+    a stable hash (so vectors are identical across processes) and weighted by
+    sublinear term frequency. No model download or API call is needed.
+    """
+
+    def __init__(self, dim: int = 1024):
+        """Initialize the embedder
+
+        Args:
+            dim: Dimensionality of the embedding vectors
+        """
+        self.dim = dim
+
+    def _features(self, text: str) -> List[str]:
+        # Crude plural folding so "reviews" matches "review"
+        words = [w[:-1] if len(w) > 3 and w.endswith("s") and not w.endswith("ss") else w
+                 for w in TOKEN_PATTERN.findall(text.lower())]
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+    def embed_query(self, text: str) -> np.ndarray:
+        """Embed a single text into an L2-normalized float32 vector"""
+        vector = np.zeros(self.dim, dtype=np.float32)
+        counts: Dict[str, int] = {}
+        for feature in self._features(text):
+            counts[feature] = counts.get(feature, 0) + 1
+        for feature, count in counts.items():
+            h = zlib.crc32(feature.encode("utf-8"))
+            # The top bit picks the sign so collisions tend to cancel out
+            sign = 1.0 if h & 0x80000000 else -1.0
+            vector[h % self.dim] += sign * (1.0 + np.log(count))
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def embed_documents(self, texts: List[str]) -> np.ndarray:
+        """Embed several texts into an (n, dim) matrix"""
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.vstack([self.embed_query(text) for text in texts])
+
+
+class FlatIndex:
+    """Exact inner-product search over a NumPy matrix of vectors"""
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self._vectors = np.zeros((0, dim), dtype=np.float32)
+        self._pending: List[np.ndarray] = []
+
+    def __len__(self):
+        return len(self._vectors) + sum(len(v) for v in self._pending)
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """All vectors as one matrix (batches are concatenated lazily)"""
+        if self._pending:
+            self._vectors = np.vstack([self._vectors] + self._pending)
+            self._pending = []
+        return self._vectors
+
+    def add(self, vectors: np.ndarray):
+        """Append vectors; their ids are their insertion positions"""
+        # Defer concatenation so streaming many small batches stays linear
+        self._pending.append(vectors.astype(np.float32))
+
+    def keep(self, mask: np.ndarray):
+        """Drop the vectors where mask is False; remaining ids are renumbered in order"""
+        self._vectors = self.vectors[mask]
+
+    def search(self, query: np.ndarray, k: int):
+        """Return (scores, ids) of the k most similar vectors, best first"""
+        if len(self.vectors) == 0 or k <= 0:
+            return np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.int64)
+        scores = self.vectors @ query
+        return _top_k(scores, np.arange(len(scores)), k)
+
+
+class IVFIndex:
+    """Inverted-file index: k-means coarse clusters, probing only the nearest ones
+
+    Until ``nlist * train_factor`` vectors have been added the index searches
+    exhaustively; after that it trains its centroids once and assigns every
+    vector to an inverted list. Searches then score only the vectors in the
+    ``nprobe`` clusters closest to the query. Vectors and assignments live in
+    buffers that grow geometrically, so streaming many small batches stays
+    linear.
+    """
+
+    def __init__(self, dim: int, nlist: int = 64, nprobe: int = 8, train_factor: int = 4, seed: int = 0):
+        """Initialize the index
+
+        Args:
+            dim: Dimensionality of the vectors
+            nlist: Number of k-means clusters
+            nprobe: Number of clusters scanned per query
+            train_factor: Vectors needed per cluster before training
+            seed: Random seed for centroid initialization
+        """
+        self.dim = dim
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.train_factor = train_factor
+        self.seed = seed
+        self.centroids: Optional[np.ndarray] = None
+        # Rows [0, _size) of the buffers are in use
+        self._vectors = np.zeros((0, dim), dtype=np.float32)
+        self._assignments = np.zeros(0, dtype=np.int64)
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._vectors[:self._size]
+
+    @property
+    def assignments(self) -> np.ndarray:
+        return self._assignments[:self._size]
+
+    def _reserve(self, size: int):
+        """Make room for size vectors, at least doubling the capacity when growing"""
+        if size <= len(self._vectors):
+            return
+        capacity = max(size, 2 * len(self._vectors), 64)
+        vectors = np.zeros((capacity, self.dim), dtype=np.float32)
+        vectors[:self._size] = self.vectors
+        assignments = np.zeros(capacity, dtype=np.int64)
+        assignments[:self._size] = self.assignments
+        self._vectors, self._assignments = vectors, assignments
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def _train(self, iterations: int = 10):
+        """Spherical k-means over the vectors added so far"""
+        rng = np.random.default_rng(self.seed)
+        centroids = self.vectors[rng.choice(len(self.vectors), self.nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assignments = np.argmax(self.vectors @ centroids.T, axis=1)
+            for c in range(self.nlist):
+                members = self.vectors[assignments == c]
+                if len(members):
+                    centroid = members.sum(axis=0)
+                    norm = np.linalg.norm(centroid)
+                    centroids[c] = centroid / norm if norm > 0 else centroid
+        self.centroids = centroids
+        self._assignments[:self._size] = np.argmax(self.vectors @ centroids.T, axis=1)
+
+    def add(self, vectors: np.ndarray):
+        """Append vectors; their ids are their insertion positions"""
+        start, end = self._size, self._size + len(vectors)
+        self._reserve(end)
+        self._vectors[start:end] = vectors
+        self._size = end
+        if self.is_trained:
+            self._assignments[start:end] = np.argmax(self._vectors[start:end] @ self.centroids.T, axis=1)
+        elif end >= self.nlist * self.train_factor:
+            self._train()
+
+    def keep(self, mask: np.ndarray):
+        """Drop the vectors where mask is False; remaining ids are renumbered in order"""
+        self._vectors = self.vectors[mask]
+        self._assignments = self.assignments[mask]
+        self._size = len(self._vectors)
+
+    def search(self, query: np.ndarray, k: int):
+        """Return (scores, ids) of the (approximately) k most similar vectors, best first"""
+        if len(self.vectors) == 0 or k <= 0:
+            return np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.int64)
+        if not self.is_trained:
+            return _top_k(self.vectors @ query, np.arange(len(self.vectors)), k)
+        probe = np.argsort(-(self.centroids @ query))[:self.nprobe]
+        candidates = np.flatnonzero(np.isin(self.assignments, probe))
+        return _top_k(self.vectors[candidates] @ query, candidates, k)
+
+
+def _top_k(scores: np.ndarray, ids: np.ndarray, k: int):
+    """Select the k best (score, id) pairs, sorted by descending score"""
+    if k < len(scores):
+        part = np.argpartition(-scores, k)[:k]
+        scores, ids = scores[part], ids[part]
+    order = np.argsort(-scores, kind="stable")
+    return scores[order], ids[order]
+
+
+def _split_texts(chunk_size: int, chunk_overlap: int, texts: List[str]) -> List[List[str]]:
+    """Split several texts (runs in a worker process)"""
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap, length_function=len)
+    return [splitter.split_text(text) for text in texts]
+
+
+def _embed_texts(embedder: HashingEmbedder, texts: List[str]) -> np.ndarray:
+    """Embed several texts (runs in a worker process)"""
+    return embedder.embed_documents(texts)
+
+
+def _batches(items: List, count: int) -> List[List]:
+    """Split items into at most count contiguous, roughly equal batches"""
+    size = max(1, -(-len(items) // max(1, count)))
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+class DocumentIndex:
+    """Local document store with chunking, embeddings and top-k retrieval
+
+    Documents are split with the same RecursiveCharacterTextSplitter settings
+    as ``ResponseAnalyzer``, embedded locally and stored in a flat or IVF index.
+    Analyzers given an index receive only the top-k chunks relevant to each
+    input, so prompt size stays constant as the corpus grows.
+    """
+
+    def __init__(self, embedder: Optional[HashingEmbedder] = None, index_type: str = "flat",
+                 chunk_size: int = 1000, chunk_overlap: int = 200, nlist: int = 64, nprobe: int = 8,
+                 chunk_store: Optional[ChunkStore] = None):
+        """Initialize the document index
+
+        Args:
+            embedder: The embedder to use (defaults to a HashingEmbedder)
+            index_type: "flat" for exact search or "ivf" for clustered search
+            chunk_size: Maximum characters per chunk
+            chunk_overlap: Characters shared between consecutive chunks
+            nlist: Number of clusters for the IVF index
+            nprobe: Number of clusters scanned per query for the IVF index
+            chunk_store: Content-addressed cache of chunk embeddings used by ingest()
+        """
+        self.embedder = embedder or HashingEmbedder()
+        self.chunk_store = chunk_store or ChunkStore()
+        self.text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            length_function=len
+        )
+        if index_type == "flat":
+            self.index = FlatIndex(self.embedder.dim)
+        elif index_type == "ivf":
+            self.index = IVFIndex(self.embedder.dim, nlist=nlist, nprobe=nprobe)
+        else:
+            raise ValueError(f"Unknown index type '{index_type}'. Use 'flat' or 'ivf'")
+        self.chunks: List[Document] = []
+        # Chunk hashes of each document added through ingest()
+        self.document_hashes: Dict[str, List[str]] = {}
+
+    def __len__(self):
+        return len(self.chunks)
+
+    def add_documents(self, docs: List[Document], vectors: Optional[np.ndarray] = None) -> List[Document]:
+        """Index already-chunked documents, embedding them unless vectors are given"""
+        if docs:
+            if vectors is None:
+                vectors = self.embedder.embed_documents([doc.page_content for doc in docs])
+            self.index.add(vectors)
+            self.chunks.extend(docs)
+        return docs
+
+    def add_document(self, text: str, metadata: Optional[Dict] = None) -> List[Document]:
+        """Split a document into chunks and index them
+
+        Args:
+            text: The document text
+            metadata: Optional metadata copied onto every chunk (e.g. {"source": "spec.md"})
+
+        Returns:
+            The indexed chunks
+        """
+        metadata = metadata or {}
+        docs = [
+            Document(page_content=chunk, metadata={**metadata, "chunk": i})
+            for i, chunk in enumerate(self.text_splitter.split_text(text))
+        ]
+        return self.add_documents(docs)
+
+    def add_file(self, source: Source, metadata: Optional[Dict] = None, batch_size: int = 256) -> int:
+        """Stream a file or file object into the index at constant memory
+
+        Args:
+            source: A file path, or a text or binary file object
+            metadata: Optional metadata copied onto every chunk
+            batch_size: Number of chunks embedded at a time
+
+        Returns:
+            The number of chunks indexed
+        """
+        metadata = metadata or {}
+        if "source" not in metadata and isinstance(source, (str, os.PathLike)):
+            metadata["source"] = os.fspath(source)
+        batch: List[Document] = []
+        count = 0
+        for chunk in iter_chunks(source, self.text_splitter):
+            batch.append(Document(page_content=chunk, metadata={**metadata, "chunk": count}))
+            count += 1
+            if len(batch) >= batch_size:
+                self.add_documents(batch)
+                batch = []
+        self.add_documents(batch)
+        return count
+
+    def remove_document(self, doc_id: str) -> int:
+        """Remove every chunk of a document added through ingest()
+
+        Returns:
+            The number of chunks removed
+        """
+        mask = np.array([doc.metadata.get("doc_id") != doc_id for doc in self.chunks], dtype=bool)
+        removed = int(len(mask) - mask.sum())
+        if removed:
+            self.index.keep(mask)
+            self.chunks = [doc for doc, keep in zip(self.chunks, mask) if keep]
+        self.document_hashes.pop(doc_id, None)
+        return removed
+
+    def ingest(self, documents: Dict[str, str], metadata: Optional[Dict[str, Dict]] = None,
+               workers: Optional[int] = None, parallel_threshold: int = 1 << 20) -> IngestReport:
+        """Add or re-index documents, recomputing only chunks whose content changed
+
+        Chunks are content-addressed: embeddings of chunks already in the chunk
+        store are reused, and documents whose chunks are all unchanged are left
+        in place. For large corpora, splitting and embedding run in a process pool.
+
+        Args:
+            documents: Document texts keyed by a stable document id
+            metadata: Optional metadata per document id, copied onto its chunks
+            workers: Worker processes to use (defaults to the CPU count for
+                corpora over parallel_threshold characters; 1 disables the pool)
+            parallel_threshold: Corpus size in characters above which the pool is used
+
+        Returns:
+            An IngestReport with reused and recomputed chunk counts
+        """
+        metadata = metadata or {}
+        doc_ids = list(documents)
+        texts = [documents[doc_id] for doc_id in doc_ids]
+        if workers is None:
+            workers = (os.cpu_count() or 1) if sum(len(text) for text in texts) > parallel_threshold else 1
+
+        report = IngestReport()
+        changed = {}
+        missing: Dict[str, str] = {}
+        with ProcessPoolExecutor(max_workers=workers) if workers > 1 else _InlineExecutor() as executor:
+            # Split every document (CPU-bound)
+            text_batches = _batches(texts, workers)
+            split: List[List[str]] = []
+            for batch in executor.map(_split_texts,
+                                      [self.text_splitter._chunk_size] * len(text_batches),
+                                      [self.text_splitter._chunk_overlap] * len(text_batches),
+                                      text_batches):
+                split.extend(batch)
+
+            for doc_id, chunks in zip(doc_ids, split):
+                hashes = [chunk_hash(chunk) for chunk in chunks]
+                if self.document_hashes.get(doc_id) == hashes:
+                    report.unchanged_documents += 1
+                    report.reused += len(hashes)
+                else:
+                    changed[doc_id] = (chunks, hashes)
+
+            # Embed only chunk contents the store has never seen (CPU-bound)
+            for chunks, hashes in changed.values():
+                for chunk, key in zip(chunks, hashes):
+                    if key not in missing and self.chunk_store.get_embedding(key, self.embedder.dim) is None:
+                        missing[key] = chunk
+            key_batches = _batches(list(missing), workers)
+            for keys, vectors in zip(key_batches, executor.map(_embed_texts,
+                                                               [self.embedder] * len(key_batches),
+                                                               [[missing[key] for key in keys] for keys in key_batches])):
+                for key, vector in zip(keys, vectors):
+                    self.chunk_store.put_embedding(key, vector)
+
+        for doc_id, (chunks, hashes) in changed.items():
+            report.removed += self.remove_document(doc_id)
+            report.recomputed += sum(1 for key in hashes if key in missing)
+            report.reused += sum(1 for key in hashes if key not in missing)
+            docs = [
+                Document(page_content=chunk, metadata={**metadata.get(doc_id, {}), "doc_id": doc_id, "chunk": i, "hash": key})
+                for i, (chunk, key) in enumerate(zip(chunks, hashes))
+            ]
+            vectors = np.vstack([self.chunk_store.get_embedding(key) for key in hashes]) if hashes else None
+            self.add_documents(docs, vectors)
+            self.document_hashes[doc_id] = hashes
+        return report
+
+    def search(self, query: str, k: int = 4) -> List[Document]:
+        """Return the k chunks most relevant to the query, best first
+
+        Each returned Document carries its similarity in ``metadata["score"]``.
+        """
+        scores, ids = self.index.search(self.embedder.embed_query(query), k)
+        return [
+            Document(page_content=self.chunks[i].page_content, metadata={**self.chunks[i].metadata, "score": float(s)})
+            for s, i in zip(scores, ids)
+        ]
+
+    def format_context(self, query: str, k: int = 4) -> str:
+        """The top-k chunks for a query, formatted for inclusion in a prompt"""
+        docs = self.search(query, k)
+        return "\n\n".join(
+            f"[{doc.metadata.get('source', 'document')} #{doc.metadata.get('chunk', 0)}]\n{doc.page_content}"
+            for doc in docs
+        )
+
+
+class _InlineExecutor:
+    """Executor stand-in that runs map() in the calling process"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def map(self, fn, *iterables):
+        return map(fn, *iterables)
@@ -0,0 +1,255 @@
+import json
+import re
+from typing import Any, Dict, List, Optional, Union
+
+from langchain.memory.chat_memory import BaseChatMemory
+from langchain_core.messages import HumanMessage, SystemMessage, get_buffer_string
+from langchain_core.pydantic_v1 import PrivateAttr
+
+from agent_router import tokenize
+from scheduler import current_priority, priority
+
+# Vocabulary deciding which fact a sentence belongs to
+FACT_KEYWORDS = {
+    "budget": "budget cost costs spend funding funded investment invest money dollar euro contingency",
+    "timeline": "timeline launch deadline month week quarter year release beta milestone date schedule phase",
+    "stack": (
+        "stack python react native javascript typescript backend frontend database postgresql mysql mongodb "
+        "firebase cloud aws azure gcp server framework tensorflow kubernetes hosting"
+    ),
+    "team": "team engineer developer designer hire hiring manager staff freelancer contractor",
+    "users": "user customer audience target segment persona market business student small",
+    "pricing": "pricing price subscription monetization revenue free tier premium ads commission",
+    "security": "security gdpr compliance compliant encryption encrypted privacy anonymization authentication",
+    "integrations": "integration integrate integrates wearable garmin fitbit sync health payment stripe",
+}
+
+# Facts that match no keyword
+GENERAL = "project"
+
+SENTENCE_SPLIT = re.compile(r"(?<=[.!])\s+|\n+")
+# "Initial summary: ...", "A: ..." style labels in front of a statement
+LABEL = re.compile(r"^[A-Za-z][A-Za-z ]{0,30}:\s*")
+# Instructions the analyzer scripts append to user messages (not information about the project)
+BOILERPLATE = re.compile(
+    r"^(?:important: generate exactly one focused follow-up question\b.*"
+    r"|do not include any numbering or multiple questions\.?"
+    r"|please provide a comprehensive updated summary incorporating all the information above\.?)$",
+    re.IGNORECASE
+)
+# Clauses of one sentence that may be about different facts
+CLAUSE_SPLIT = re.compile(r",?\s+(?:and|but|while|whereas)\s+|;\s*")
+# Amounts of money count as a budget keyword
+MONEY = re.compile(r"[$€£]\s?\d|\b\d[\d,.]*\s?(?:k|usd|eur|dollars?|euros?)\b", re.IGNORECASE)
+
+
+class RuleBasedFactExtractor:
+    """Extract facts from a user message locally, without an LLM call
+
+    The message is split into sentences. Questions and the instructions the
+    analyzer scripts append (``BOILERPLATE``) are dropped; every other
+    sentence is filed under the fact whose keywords it shares most words with
+    (``GENERAL`` if none). A sentence whose clauses are each about a different
+    fact ("The budget is $50k and we launch in May") is filed clause by
+    clause.
+    """
+
+    def __init__(self, keywords: Optional[Dict[str, str]] = None):
+        """Initialize the extractor
+
+        Args:
+            keywords: Keywords per fact name (defaults to FACT_KEYWORDS)
+        """
+        self.keywords = {name: set(tokenize(words)) for name, words in (keywords or FACT_KEYWORDS).items()}
+
+    def classify(self, sentence: str) -> str:
+        """The fact name a sentence belongs to"""
+        tokens = set(tokenize(sentence))
+        best, best_overlap = GENERAL, 0
+        for name, keywords in self.keywords.items():
+            overlap = len(tokens & keywords)
+            if name == "budget" and MONEY.search(sentence):
+                overlap += 1
+            if overlap > best_overlap:
+                best, best_overlap = name, overlap
+        return best
+
+    def extract(self, text: str, known_facts: Optional[Dict[str, List[str]]] = None) -> Dict[str, List[str]]:
+        """Statements per fact name found in one new message"""
+        delta: Dict[str, List[str]] = {}
+        for sentence in SENTENCE_SPLIT.split(text):
+            sentence = sentence.strip()
+            if BOILERPLATE.match(" ".join(sentence.split())):
+                continue
+            sentence = LABEL.sub("", sentence).strip()
+            if not sentence or sentence.endswith("?"):
+                continue
+            clauses = [(self.classify(clause), clause) for clause in CLAUSE_SPLIT.split(sentence) if clause.strip()]
+            names = {name for name, _ in clauses}
+            if len(clauses) > 1 and GENERAL not in names and len(names) == len(clauses):
+                for name, clause in clauses:
+                    delta.setdefault(name, []).append(clause.strip())
+            else:
+                delta.setdefault(self.classify(sentence), []).append(sentence)
+        return delta
+
+
+class LLMFactExtractor:
+    """Extract facts with a chat model, sending only the known facts and the new message"""
+
+    PROMPT = (
+        "You maintain a compact fact sheet about a project as a JSON object mapping short fact names "
+        "(e.g. budget, timeline, stack, team, users) to short statements.\n"
+        "Known facts:\n{facts}\n\nNew message:\n{text}\n\n"
+        "Reply with a JSON object containing only facts that are new or changed by the new message. "
+        "Reply with {{}} if there are none."
+    )
+
+    def __init__(self, llm, priority_class: Optional[str] = None):
+        """Initialize the extractor
+
+        Args:
+            llm: The chat model used for extraction
+            priority_class: Scheduler class of the extraction call. None (the
+                default) keeps the caller's class: FactMemory extracts inside
+                the turn's save_context, so a lower class would make the
+                user's turn wait behind batch work. Use BACKGROUND only when
+                extracting off the request path.
+        """
+        self.llm = llm
+        self.priority_class = priority_class
+
+    def extract(self, text: str, known_facts: Optional[Dict[str, List[str]]] = None) -> Dict[str, List[str]]:
+        facts = json.dumps({name: "; ".join(values) for name, values in (known_facts or {}).items()})
+        with priority(self.priority_class or current_priority()):
+            reply = self.llm.invoke([HumanMessage(content=self.PROMPT.format(facts=facts, text=text))])
+        content = str(getattr(reply, "content", reply))
+        # Tolerate prose or code fences around the JSON object
+        match = re.search(r"\{.*\}", content, re.DOTALL)
+        try:
+            data = json.loads(match.group(0)) if match else {}
+        except ValueError:
+            return {}
+        if not isinstance(data, dict):
+            return {}
+        return {str(name): [str(value)] for name, value in data.items() if value}
+
+
+class FactStore:
+    """Compact key/value facts about one session
+
+    Each fact keeps at most ``max_statements`` distinct statements, newest
+    last, so the store's size is bounded by the number of facts rather than by
+    how often they are repeated. ``GENERAL`` collects every statement that
+    matches no fact, so it gets its own, larger cap
+    (``max_general_statements``); older general statements beyond it are
+    dropped from the fact sheet (the transcript keeps them).
+    """
+
+    def __init__(self, max_statements: int = 3, max_general_statements: int = 10):
+        """Initialize the store
+
+        Args:
+            max_statements: Statements kept per fact
+            max_general_statements: Statements kept for GENERAL
+        """
+        self.max_statements = max_statements
+        self.max_general_statements = max_general_statements
+        self.facts: Dict[str, List[str]] = {}
+        # Incremented whenever a fact changes
+        self.version = 0
+
+    def __len__(self):
+        return len(self.facts)
+
+    def update(self, delta: Dict[str, Union[str, List[str]]]) -> List[str]:
+        """Merge new statements into the store
+
+        Returns:
+            The names of the facts that changed
+        """
+        changed = []
+        for name, statements in delta.items():
+            if isinstance(statements, str):
+                statements = [statements]
+            values = self.facts.setdefault(name, [])
+            before = list(values)
+            for statement in statements:
+                normalized = " ".join(statement.lower().split())
+                # A repeated statement moves to the end instead of being stored twice
+                values[:] = [v for v in values if " ".join(v.lower().split()) != normalized]
+                values.append(statement)
+            del values[:-(self.max_general_statements if name == GENERAL else self.max_statements)]
+            if values != before:
+                changed.append(name)
+        if changed:
+            self.version += 1
+        return changed
+
+    def format(self) -> str:
+        """The facts as a short bulleted list"""
+        lines = [f"- {name}: {' '.join(values)}" for name, values in self.facts.items()]
+        return "Known facts:\n" + "\n".join(lines) if lines else ""
+
+    def clear(self):
+        self.facts = {}
+        self.version += 1
+
+
+class FactMemory(BaseChatMemory):
+    """Conversation memory that feeds prompts with extracted facts plus recent turns
+
+    After each turn, only the new user message is passed to the extractor and
+    the resulting delta is merged into a per-session FactStore. Prompts get
+    the fact sheet and the ``recent_k`` most recent turns instead of the whole
+    transcript, so the verbose replies that restate the same facts are not
+    replayed and prompt size is bounded by the number of facts. The full
+    transcript is still kept in ``chat_memory``.
+    """
+
+    memory_key: str = "history"
+    input_key: Optional[str] = "input"
+    return_messages: bool = True
+    human_prefix: str = "Human"
+    ai_prefix: str = "AI"
+    recent_k: int = 2
+    max_statements: int = 3
+    max_general_statements: int = 10
+    extractor: Any = None
+
+    _store: Any = PrivateAttr(default=None)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        if self.extractor is None:
+            self.extractor = RuleBasedFactExtractor()
+        self._store = FactStore(self.max_statements, self.max_general_statements)
+
+    @property
+    def facts(self) -> FactStore:
+        """The session's fact store"""
+        return self._store
+
+    @property
+    def memory_variables(self) -> List[str]:
+        """:meta private:"""
+        return [self.memory_key]
+
+    def load_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        """Return the fact sheet and the most recent turns"""
+        messages = self.chat_memory.messages[-2 * self.recent_k:] if self.recent_k > 0 else []
+        if len(self._store):
+            messages = [SystemMessage(content=self._store.format())] + list(messages)
+        if self.return_messages:
+            return {self.memory_key: messages}
+        return {self.memory_key: get_buffer_string(messages, human_prefix=self.human_prefix, ai_prefix=self.ai_prefix)}
+
+    def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
+        """Save the turn and merge the facts found in the new user message"""
+        input_str, _ = self._get_input_output(inputs, outputs)
+        super().save_context(inputs, outputs)
+        self._store.update(self.extractor.extract(str(input_str), self._store.facts))
+
+    def clear(self) -> None:
+        super().clear()
+        self._store.clear()
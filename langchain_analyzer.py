@@ -1,15 +1,64 @@
 import os
+import logging
+import httpx
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate
 from langchain.memory import ConversationBufferMemory
 from langchain.chains import LLMChain
+from backend_pool import get_default_pool
+from cassette import REPLAY, get_default_cassette
+from scheduler import MULTI_AGENT, get_default_scheduler, priority
+from agent_router import AgentRouter
+from message_log import DEFAULT_VIEWS, USER, VIEW_FULL, MessageLog, MessageLogMemory
+from message_store import CompactChatMessageHistory, ListView
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+
+def create_llm(model_name="gpt-3.5-turbo", temperature=0.7, api_key=None, backend_pool=None, cassette=None,
+               scheduler=None):
+    """Create a ChatOpenAI model, routed through a BackendPool if one is given
+    
+    A single model (and its HTTP connection pool) can be shared by any number
+    of analyzers via their ``llm`` argument. With a Cassette (by default the
+    one configured by LLM_CASSETTE), calls are recorded or replayed. With a
+    RequestScheduler (by default the one configured by LLM_MAX_CONCURRENCY),
+    every call waits for a slot of its priority class.
+    """
+    cassette = cassette if cassette is not None else get_default_cassette()
+    scheduler = scheduler if scheduler is not None else get_default_scheduler()
+    client_kwargs = {}
+    transport = None
+    if backend_pool is not None:
+        nominal_base_url = backend_pool.backends[0].base_url
+        transport = backend_pool.httpx_transport(nominal_base_url)
+        client_kwargs["openai_api_base"] = nominal_base_url
+        # Failover happens in the pool, so don't retry on top of it
+        client_kwargs["max_retries"] = 0
+    if cassette is not None:
+        transport = cassette.httpx_transport(inner=transport)
+        if cassette.mode == REPLAY:
+            # A request missing from the cassette won't appear on retry
+            client_kwargs["max_retries"] = 0
+    if scheduler is not None:
+        transport = scheduler.httpx_transport(inner=transport)
+    if transport is not None:
+        client_kwargs["http_client"] = httpx.Client(transport=transport)
+    return ChatOpenAI(
+        model_name=model_name,
+        temperature=temperature,
+        openai_api_key=api_key or os.getenv("OPENAI_API_KEY"),
+        **client_kwargs
+    )
+
+
 class LangChainAnalyzer:
-    def __init__(self, model_name="gpt-3.5-turbo", temperature=0.7, memory=None, agent_role="project analyst"):
+    def __init__(self, model_name="gpt-3.5-turbo", temperature=0.7, memory=None, agent_role="project analyst",
+                 backend_pool=None, document_index=None, top_k=4, llm=None, cassette=None, scheduler=None):
         """Initialize the LangChain-based response analyzer
         
         Args:
@@ -17,16 +66,29 @@ class LangChainAnalyzer:
             temperature: The temperature for generation
             memory: Optional shared memory to use (if None, creates a new one)
             agent_role: The role of this agent (e.g., "project analyst", "technical expert")
+            backend_pool: Optional BackendPool to balance across (defaults to the
+                shared pool from OPENAI_API_BASES, if any)
+            document_index: Optional DocumentIndex to retrieve relevant chunks from
+            top_k: Number of document chunks included with each prompt
+            llm: Optional chat model to share between analyzers (if None, creates a
+                ChatOpenAI with its own client)
+            cassette: Optional Cassette to record or replay LLM calls (defaults to
+                the shared cassette from LLM_CASSETTE, if any)
+            scheduler: Optional RequestScheduler the LLM calls wait for (defaults to
+                the shared scheduler from LLM_MAX_CONCURRENCY, if any)
         """
         self.api_key = os.getenv("OPENAI_API_KEY")
-        if not self.api_key:
+        if llm is None and not self.api_key:
             raise ValueError("OPENAI_API_KEY not found in environment variables")
         
+        self.agent_role = agent_role
+        
+        # Route requests through the backend pool if one is configured
+        self.backend_pool = backend_pool if backend_pool is not None else get_default_pool()
+        
         # Initialize the language model
-        self.llm = ChatOpenAI(
-            model_name=model_name,
-            temperature=temperature,
-            openai_api_key=self.api_key
+        self.llm = llm if llm is not None else create_llm(
+            model_name, temperature, self.api_key, self.backend_pool, cassette, scheduler
         )
         
         # Initialize conversation memory (use shared memory if provided)
@@ -35,6 +97,20 @@ class LangChainAnalyzer:
             return_messages=True
         )
         
+        # Document retrieval: only the top-k relevant chunks are added to each prompt
+        self.document_index = document_index
+        self.top_k = top_k
+        context_block = ""
+        if document_index is not None:
+            context_block = """
+            Relevant document excerpts:
+            {context}
+            """
+            # The retrieved context is an extra prompt input, so tell the memory
+            # which key holds the user's message
+            if self.memory.input_key is None:
+                self.memory.input_key = "input"
+        
         # Define the analysis prompt template
         self.analysis_prompt = ChatPromptTemplate.from_messages([
             ("system", f"""You are an expert {agent_role} and interviewer. Your task is to analyze user responses 
@@ -46,7 +122,7 @@ class LangChainAnalyzer:
             
             Current conversation context:
             {{history}}
-            """),
+            {context_block}"""),
             ("human", "{input}")
         ])
         
@@ -61,7 +137,7 @@ class LangChainAnalyzer:
             
             Current conversation context:
             {{history}}
-            """),
+            {context_block}"""),
             ("human", "Please provide a comprehensive updated summary incorporating all the information above.")
         ])
         
@@ -81,18 +157,25 @@ class LangChainAnalyzer:
             verbose=True
         )
     
+    def _chain_inputs(self, user_input):
+        """Build the chain inputs, adding retrieved document context if available"""
+        inputs = {"input": user_input}
+        if self.document_index is not None:
+            inputs["context"] = self.document_index.format_context(user_input, self.top_k)
+        return inputs
+    
     def analyze_response(self, user_input, is_final_summary=False):
         """Analyze the user's response and generate appropriate follow-up or summary"""
         if is_final_summary:
             # Generate a comprehensive summary
-            response = self.summary_chain.invoke({"input": user_input})
+            response = self.summary_chain.invoke(self._chain_inputs(user_input))
             return {
                 "analysis": response["text"],
                 "follow_up_questions": ""
             }
         else:
             # Generate a follow-up question
-            response = self.analysis_chain.invoke({"input": user_input})
+            response = self.analysis_chain.invoke(self._chain_inputs(user_input))
             
             # Extract the question from the response
             content = response["text"]
@@ -109,47 +192,114 @@ class LangChainAnalyzer:
         self.memory.clear()
     
     def get_conversation_history(self):
-        """Get the conversation history"""
-        return self.memory.chat_memory.messages
+        """Get a read-only view of the conversation history"""
+        chat_memory = self.memory.chat_memory
+        if isinstance(chat_memory, CompactChatMessageHistory):
+            return chat_memory.view()
+        return ListView(chat_memory.messages)
 
 
 class MultiAgentAnalyzer:
     """A class to manage multiple specialized agents with shared memory"""
     
-    def __init__(self, model_name="gpt-3.5-turbo", temperature=0.7):
+    def __init__(self, model_name="gpt-3.5-turbo", temperature=0.7, backend_pool=None, document_index=None,
+                 memory=None, llm=None, routing_top_k=None, routing_threshold=None, memory_views=DEFAULT_VIEWS,
+                 cassette=None, scheduler=None):
         """Initialize the multi-agent analyzer
         
         Args:
             model_name: The OpenAI model to use
             temperature: The temperature for generation
+            backend_pool: Optional BackendPool shared by all agents
+            document_index: Optional DocumentIndex shared by all agents
+            memory: Optional memory shared as-is by all agents (e.g. a
+                RetrievalConversationMemory); if None, agents share a MessageLog
+                and each reads it through its own MessageLogMemory view
+            llm: Optional chat model shared by all agents (if None, each agent
+                creates its own)
+            routing_top_k: If set, analyze_with_all_agents only invokes this many
+                of the agents whose roles best match the input
+            routing_threshold: If set, analyze_with_all_agents only invokes agents
+                whose role matches the input with at least this TF-IDF similarity
+            memory_views: Views each agent reads the message log through (see
+                message_log); ignored when memory is given
+            cassette: Optional Cassette recording or replaying the agents' LLM calls
+            scheduler: Optional RequestScheduler the agents' LLM calls wait for
         """
-        # Create a shared memory for all agents
-        self.shared_memory = ConversationBufferMemory(
-            memory_key="history",
-            return_messages=True
-        )
+        # Append-only log of the conversation; the full view is kept as
+        # shared_memory for history and reset
+        self.message_log = MessageLog()
+        self.memory_views = tuple(memory_views)
+        self.custom_memory = memory
+        self.shared_memory = memory if memory else MessageLogMemory(log=self.message_log, views=(VIEW_FULL,))
         
         # Initialize specialized agents with different roles
         self.agents = {
             "project_analyst": LangChainAnalyzer(
                 model_name=model_name, 
                 temperature=temperature, 
-                memory=self.shared_memory,
+                memory=self.memory_for("project_analyst"),
+                backend_pool=backend_pool,
+                document_index=document_index,
+                llm=llm,
+                cassette=cassette,
+                scheduler=scheduler,
                 agent_role="project analyst"
             ),
             "technical_expert": LangChainAnalyzer(
                 model_name=model_name, 
                 temperature=temperature, 
-                memory=self.shared_memory,
+                memory=self.memory_for("technical_expert"),
+                backend_pool=backend_pool,
+                document_index=document_index,
+                llm=llm,
+                cassette=cassette,
+                scheduler=scheduler,
                 agent_role="technical expert"
             ),
             "business_consultant": LangChainAnalyzer(
                 model_name=model_name, 
                 temperature=temperature, 
-                memory=self.shared_memory,
+                memory=self.memory_for("business_consultant"),
+                backend_pool=backend_pool,
+                document_index=document_index,
+                llm=llm,
+                cassette=cassette,
+                scheduler=scheduler,
                 agent_role="business consultant"
             )
         }
+        
+        # Optional relevance-based routing for analyze_with_all_agents
+        self.router = AgentRouter(top_k=routing_top_k, threshold=routing_threshold)
+        self.routing_enabled = routing_top_k is not None or routing_threshold is not None
+        self.last_skipped_agents = {}
+    
+    def memory_for(self, agent_name):
+        """Create an agent's view of the shared conversation
+        
+        Args:
+            agent_name: The name the agent's outputs are recorded under
+            
+        Returns:
+            A MessageLogMemory over the panel's message log, or the custom
+            memory if one was given
+        """
+        if self.custom_memory:
+            return self.custom_memory
+        return MessageLogMemory(log=self.message_log, agent_name=agent_name, views=self.memory_views)
+    
+    def add_agent(self, agent_name, agent, keywords=None):
+        """Add a custom agent to the panel
+        
+        Args:
+            agent_name: The name used to address the agent
+            agent: A LangChainAnalyzer (usually created with memory=self.memory_for(agent_name))
+            keywords: Optional words describing the agent's area, used for routing
+        """
+        self.agents[agent_name] = agent
+        if keywords:
+            self.router.keywords[agent.agent_role] = keywords
     
     def analyze_with_agent(self, agent_name, user_input, is_final_summary=False):
         """Analyze user input with a specific agent
@@ -175,11 +325,32 @@ class MultiAgentAnalyzer:
             is_final_summary: Whether to generate a final summary
             
         Returns:
-            A dictionary with results from each agent
+            A dictionary with results from each agent (only the selected agents
+            when routing is enabled)
         """
+        agent_names = list(self.agents)
+        if self.routing_enabled:
+            roles = {name: agent.agent_role for name, agent in self.agents.items()}
+            agent_names, skipped = self.router.select(roles, user_input)
+            for agent_name, reason in skipped.items():
+                logger.info("Skipping agent '%s': %s", agent_name, reason)
+            self.last_skipped_agents = skipped
+        
+        # Record the user turn once; each agent's output is filed under it
+        turn = None if self.custom_memory else self.message_log.append(USER, user_input).version
         results = {}
-        for agent_name, agent in self.agents.items():
-            results[agent_name] = agent.analyze_response(user_input, is_final_summary)
+        # Panel calls yield to interactive calls in the scheduler
+        with priority(MULTI_AGENT):
+            for agent_name in agent_names:
+                memory = self.agents[agent_name].memory
+                uses_log = turn is not None and isinstance(memory, MessageLogMemory) and memory.log is self.message_log
+                if uses_log:
+                    memory.current_turn = turn
+                try:
+                    results[agent_name] = self.agents[agent_name].analyze_response(user_input, is_final_summary)
+                finally:
+                    if uses_log:
+                        memory.current_turn = None
         return results
     
     def reset_conversation(self):
@@ -187,44 +358,40 @@ class MultiAgentAnalyzer:
         self.shared_memory.clear()
     
     def get_conversation_history(self):
-        """Get the shared conversation history"""
-        return self.shared_memory.chat_memory.messages 
+        """Get a read-only view of the shared conversation history"""
+        return ListView(self.shared_memory.chat_memory.messages)
 
-# Create a multi-agent system
-multi_agent = MultiAgentAnalyzer() 
+if __name__ == "__main__":
+    # Create a multi-agent system
+    multi_agent = MultiAgentAnalyzer() 
 
-# Get a question from the technical expert
-tech_result = multi_agent.analyze_with_agent("technical_expert", "Your project description")
-print(tech_result["follow_up_questions"])
+    # Get a question from the technical expert
+    tech_result = multi_agent.analyze_with_agent("technical_expert", "Your project description")
+    print(tech_result["follow_up_questions"])
 
-# Get a question from the business consultant
-business_result = multi_agent.analyze_with_agent("business_consultant", "Your project description")
-print(business_result["follow_up_questions"])
-
-# Get questions from all agents
-all_results = multi_agent.analyze_with_all_agents("Your project description")
-for agent_name, result in all_results.items():
-    print(f"{agent_name}: {result['follow_up_questions']}")
-
-from langchain_analyzer import LangChainAnalyzer
-from langchain.memory import ConversationBufferMemory
+    # Get a question from the business consultant
+    business_result = multi_agent.analyze_with_agent("business_consultant", "Your project description")
+    print(business_result["follow_up_questions"])
 
-# Create a shared memory
-shared_memory = ConversationBufferMemory(memory_key="history", return_messages=True)
+    # Get questions from all agents
+    all_results = multi_agent.analyze_with_all_agents("Your project description")
+    for agent_name, result in all_results.items():
+        print(f"{agent_name}: {result['follow_up_questions']}")
 
-# Create custom agents
-security_expert = LangChainAnalyzer(
-    memory=shared_memory,
-    agent_role="security specialist"
-)
+    # Create custom agents that read the shared message log through their own views
+    security_expert = LangChainAnalyzer(
+        memory=multi_agent.memory_for("security_expert"),
+        agent_role="security specialist"
+    )
 
-data_scientist = LangChainAnalyzer(
-    memory=shared_memory,
-    agent_role="data scientist"
-)
+    data_scientist = LangChainAnalyzer(
+        memory=multi_agent.memory_for("data_scientist"),
+        agent_role="data scientist"
+    )
 
-# Add a new agent that can see the entire conversation history
-new_agent = LangChainAnalyzer(
-    memory=shared_memory,  # Use the same shared memory
-    agent_role="project manager"
-) 
\ No newline at end of file
+    # Add a new agent that sees the user's turns and a digest of the other agents
+    new_agent = LangChainAnalyzer(
+        memory=multi_agent.memory_for("project_manager"),
+        agent_role="project manager"
+    )
+    multi_agent.add_agent("project_manager", new_agent)
@@ -0,0 +1,287 @@
+import argparse
+import itertools
+import math
+import os
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+from backend_pool import BackendPool
+from mock_llm import MockLLMServer
+
+# Scripted flows: ResponseAnalyzer as in interactive_test.py, LangChainAnalyzer
+# as in langchain_interactive_test.py
+RESPONSE_ANALYZER = "response_analyzer"
+LANGCHAIN = "langchain"
+FLOWS = (RESPONSE_ANALYZER, LANGCHAIN)
+
+# Turns per session: initial summary, three follow-ups, final summary
+TURNS_PER_SESSION = 5
+
+PROJECTS = [
+    "A fitness app that builds personalised workout plans and syncs with wearables.",
+    "A marketplace connecting local farmers with restaurants for next-day delivery.",
+    "An internal tool that summarises customer support tickets for product managers.",
+    "A budgeting app for students that splits shared household expenses.",
+]
+
+ANSWERS = [
+    "The budget is about $50,000 and we want to launch within six months.",
+    "We plan to use React Native with a Python backend on PostgreSQL.",
+    "Our first users are small businesses in the Netherlands, so GDPR matters.",
+    "The team is three engineers and a part-time designer.",
+    "We will charge a monthly subscription with a free tier.",
+]
+
+TOPICS = ["budget", "timeline", "target users", "tech stack", "team", "pricing", "security", "integrations"]
+
+_replies = itertools.count()
+
+
+def mock_reply(messages) -> str:
+    """A plausible analysis with one follow-up question, sized like a real answer"""
+    topic = TOPICS[next(_replies) % len(TOPICS)]
+    analysis = (
+        "Key information: the project goal and first features are clear. "
+        f"The {topic} is only partly described, which affects scope and planning. "
+        "- Goal: defined\n- Users: partly defined\n- Constraints: missing details\n"
+    ) * 2
+    return f"{analysis}\nFollow-up question: What is the {topic} for the first release?"
+
+
+def _collected_context(initial_summary: str, collected_info: Dict[str, str]) -> str:
+    lines = "\n".join(f"Q: {question}\nA: {answer}" for question, answer in collected_info.items())
+    return f"\nInitial summary: {initial_summary}\nCollected information:\n{lines}\n"
+
+
+def response_analyzer_session(analyzer, summary: str, answers: List[str], timed: Callable):
+    """One pass of the interactive_test.py flow"""
+    result = timed(analyzer.analyze_response, f"Initial summary: {summary}\nIMPORTANT: Generate exactly ONE "
+                                              "focused follow-up question. Do not include any numbering or multiple questions.")
+    collected_info = {}
+    for i, answer in enumerate(answers, 1):
+        question = result["follow_up_questions"].strip().split("\n")[0].strip()
+        if question.startswith(("1.", "2.", "3.", "1)", "2)", "3)")):
+            question = question[2:].strip()
+        collected_info[question or f"Question {i}"] = answer
+        result = timed(analyzer.analyze_response, _collected_context(summary, collected_info) +
+                       "\nIMPORTANT: Generate exactly ONE focused follow-up question based on this context. "
+                       "Do not include any numbering or multiple questions.\n")
+    timed(analyzer.analyze_response, _collected_context(summary, collected_info) +
+          "\nPlease provide a comprehensive updated summary incorporating all the information above.\n")
+
+
+def langchain_session(analyzer, summary: str, answers: List[str], timed: Callable):
+    """One pass of the langchain_interactive_test.py flow"""
+    result = timed(analyzer.analyze_response, f"Initial summary: {summary}")
+    collected_info = {}
+    for i, answer in enumerate(answers, 1):
+        collected_info[result["follow_up_questions"].strip() or f"Question {i}"] = answer
+        result = timed(analyzer.analyze_response, _collected_context(summary, collected_info))
+    timed(analyzer.analyze_response, _collected_context(summary, collected_info), is_final_summary=True)
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile (q in [0, 100]) of a list of values"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def _slope(points: List[tuple]) -> float:
+    """Least-squares slope of (x, y) points"""
+    if len(points) < 2:
+        return 0.0
+    n = len(points)
+    mean_x = sum(x for x, _ in points) / n
+    mean_y = sum(y for _, y in points) / n
+    variance = sum((x - mean_x) ** 2 for x, _ in points)
+    if not variance:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / variance
+
+
+def _top_allocations(baseline, limit=5) -> List[str]:
+    """The source lines that allocated the most memory since the baseline snapshot"""
+    ignored = (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"))
+    snapshot = tracemalloc.take_snapshot().filter_traces(ignored)
+    lines = []
+    for stat in snapshot.compare_to(baseline.filter_traces(ignored), "lineno")[:limit]:
+        frame = stat.traceback[0]
+        lines.append(f"{os.path.basename(frame.filename)}:{frame.lineno} {stat.size_diff / 1024:+.1f} KiB")
+    return lines
+
+
+def run_load(users: int = 20, sessions: int = 50, flow: str = RESPONSE_ANALYZER, latency: float = 0.0,
+             reset_between_sessions: bool = False, trace_memory: bool = True) -> Dict:
+    """Replay the interactive flows for concurrent virtual users against a local mock LLM
+
+    Each virtual user runs in its own thread and keeps one analyzer for all of
+    its sessions, like the interactive scripts do until 'reset'. Memory is
+    sampled with tracemalloc after every finished session; the growth per
+    session is the slope of traced memory over completed sessions, so the
+    one-off cost of creating analyzers does not count as growth.
+
+    Args:
+        users: Number of concurrent virtual users
+        sessions: Sessions per user (each is TURNS_PER_SESSION analyzer calls)
+        flow: RESPONSE_ANALYZER or LANGCHAIN
+        latency: Seconds the mock LLM waits before answering
+        reset_between_sessions: Reset the analyzer's conversation after each session
+        trace_memory: Track memory with tracemalloc (slows the run down)
+
+    Returns:
+        A dictionary with throughput, latency percentiles and memory growth
+    """
+    if flow not in FLOWS:
+        raise ValueError(f"Unknown flow '{flow}', expected one of {FLOWS}")
+
+    server = MockLLMServer(reply=mock_reply, latency=latency, keep_requests=False).start()
+    pool = BackendPool.from_urls([server.base_url])
+    if flow == LANGCHAIN:
+        from langchain_analyzer import LangChainAnalyzer, create_llm
+        # One chat model (and connection pool) shared by every session, as in the HTTP service
+        llm = create_llm(api_key="load-test", backend_pool=pool)
+
+        def make_analyzer():
+            analyzer = LangChainAnalyzer(llm=llm)
+            # Don't print every prompt
+            analyzer.analysis_chain.verbose = analyzer.summary_chain.verbose = False
+            return analyzer
+        run_session = langchain_session
+    else:
+        from response_analyzer import ResponseAnalyzer
+        make_analyzer = lambda: ResponseAnalyzer(backend_pool=pool)
+        run_session = response_analyzer_session
+
+    latencies: List[float] = []
+    samples: List[tuple] = []
+    errors = [0]
+    completed = [0]
+    lock = threading.Lock()
+
+    def timed(fn, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            result = {"analysis": "", "follow_up_questions": ""}
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            # ResponseAnalyzer reports API failures as an empty analysis
+            if not result["analysis"]:
+                errors[0] += 1
+        return result
+
+    def virtual_user(user_id):
+        analyzer = make_analyzer()
+        for session in range(sessions):
+            summary = PROJECTS[(user_id + session) % len(PROJECTS)]
+            answers = [ANSWERS[(user_id + session + i) % len(ANSWERS)] for i in range(TURNS_PER_SESSION - 2)]
+            run_session(analyzer, summary, answers, timed)
+            if reset_between_sessions:
+                analyzer.reset_conversation()
+            with lock:
+                completed[0] += 1
+                if trace_memory:
+                    samples.append((completed[0], tracemalloc.get_traced_memory()[0]))
+        return len(analyzer.get_conversation_history())
+
+    started_tracing = False
+    try:
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            started_tracing = True
+        # Warm up imports, connection pools and lazy initialization outside the measurement
+        run_session(make_analyzer(), PROJECTS[0], ANSWERS[:TURNS_PER_SESSION - 2], lambda fn, *a, **k: fn(*a, **k))
+        requests_before = server.request_count
+        if trace_memory:
+            baseline_snapshot = tracemalloc.take_snapshot()
+            baseline = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=users, thread_name_prefix="virtual-user") as executor:
+            history_lengths = list(executor.map(virtual_user, range(users)))
+        duration = time.perf_counter() - start
+
+        memory = {}
+        if trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            memory = {
+                "baseline_bytes": baseline,
+                "final_bytes": current,
+                "peak_bytes": peak,
+                "growth_bytes": current - baseline,
+                "growth_per_session_bytes": _slope(samples),
+                "top_allocations": _top_allocations(baseline_snapshot)
+            }
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
+        server.stop()
+
+    turns = len(latencies)
+    return {
+        "flow": flow,
+        "users": users,
+        "sessions": users * sessions,
+        "turns": turns,
+        "errors": errors[0],
+        "llm_requests": server.request_count - requests_before,
+        "duration_s": duration,
+        "turns_per_s": turns / duration if duration else 0.0,
+        "sessions_per_s": users * sessions / duration if duration else 0.0,
+        "latency_ms": {
+            name: percentile(latencies, q) * 1000
+            for name, q in (("p50", 50), ("p90", 90), ("p95", 95), ("p99", 99), ("max", 100))
+        },
+        "history_messages_per_user": sum(history_lengths) / users if users else 0.0,
+        "memory": memory,
+    }
+
+
+def print_report(report: Dict):
+    print(f"{'='*50}")
+    print(f"{report['flow']}: {report['users']} users, {report['sessions']:,} sessions, {report['turns']:,} turns")
+    print(f"{'='*50}")
+    print(f"Duration:            {report['duration_s']:>12.2f} s")
+    print(f"Throughput:          {report['turns_per_s']:>12.1f} turns/s ({report['sessions_per_s']:.1f} sessions/s)")
+    print(f"LLM requests:        {report['llm_requests']:>12,}")
+    print(f"Errors:              {report['errors']:>12,}")
+    latency = report["latency_ms"]
+    print(f"Latency (ms):        p50 {latency['p50']:.1f}  p90 {latency['p90']:.1f}  p95 {latency['p95']:.1f}  "
+          f"p99 {latency['p99']:.1f}  max {latency['max']:.1f}")
+    print(f"History per user:    {report['history_messages_per_user']:>12,.0f} messages")
+    memory = report["memory"]
+    if memory:
+        print(f"Memory growth:       {memory['growth_bytes'] / 1024:>12,.1f} KiB (peak {memory['peak_bytes'] / 1024:,.1f} KiB)")
+        print(f"Growth per session:  {memory['growth_per_session_bytes'] / 1024:>12,.2f} KiB")
+        print("Top allocations:")
+        for line in memory["top_allocations"]:
+            print(f"  {line}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load and soak test the analyzers against a local mock LLM")
+    parser.add_argument("--users", type=int, default=20, help="concurrent virtual users")
+    parser.add_argument("--sessions", type=int, default=50, help="sessions per user")
+    parser.add_argument("--flow", choices=FLOWS + ("both",), default="both")
+    parser.add_argument("--latency", type=float, default=0.0, help="mock LLM latency in seconds")
+    parser.add_argument("--reset", action="store_true", help="reset the conversation after each session")
+    parser.add_argument("--no-tracemalloc", action="store_true", help="skip memory tracking")
+    args = parser.parse_args()
+
+    for flow in FLOWS if args.flow == "both" else (args.flow,):
+        report = run_load(users=args.users, sessions=args.sessions, flow=flow, latency=args.latency,
+                          reset_between_sessions=args.reset, trace_memory=not args.no_tracemalloc)
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+import itertools
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from langchain.memory.chat_memory import BaseChatMemory
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, get_buffer_string
+from langchain_core.pydantic_v1 import Field
+
+# Roles of log entries
+USER = "user"
+AGENT = "agent"
+
+# Views an agent can read the log through
+VIEW_USER = "user"        # the user's turns
+VIEW_OWN = "own"          # the agent's own outputs
+VIEW_DIGEST = "digest"    # a short digest of the other agents' outputs per turn
+VIEW_FULL = "full"        # every entry, as the old shared buffer did
+DEFAULT_VIEWS = (VIEW_USER, VIEW_OWN, VIEW_DIGEST)
+
+SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+
+class LogEntry:
+    """One immutable message in a MessageLog"""
+
+    __slots__ = ("version", "role", "author", "content", "turn")
+
+    def __init__(self, version: int, role: str, content: str, author: Optional[str] = None, turn: Optional[int] = None):
+        self.version = version
+        self.role = role
+        self.content = content
+        # Agent name for agent entries
+        self.author = author
+        # Version of the user entry this entry answers (its own version for user entries)
+        self.turn = version if turn is None else turn
+
+    def __repr__(self):
+        return f"LogEntry(version={self.version}, role={self.role!r}, author={self.author!r})"
+
+
+class MessageLog:
+    """Append-only, versioned message log shared by a panel of agents
+
+    Every entry gets a monotonically increasing version. Appends take no lock:
+    drawing a version from ``itertools.count`` and ``list.append`` are each
+    atomic in CPython, so concurrent writers never lose entries. Writers may
+    land in the list slightly out of version order; readers sort a snapshot
+    when that happens. Clearing swaps in a new list, so readers holding a
+    snapshot are unaffected.
+    """
+
+    def __init__(self):
+        self._entries: List[LogEntry] = []
+        self._versions = itertools.count(1)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def append(self, role: str, content: str, author: Optional[str] = None, turn: Optional[int] = None) -> LogEntry:
+        """Append an entry and return it"""
+        entry = LogEntry(next(self._versions), role, content, author, turn)
+        self._entries.append(entry)
+        return entry
+
+    def latest(self, role: Optional[str] = None) -> Optional[LogEntry]:
+        """The most recently appended entry, optionally of a given role"""
+        for entry in reversed(self._entries):
+            if role is None or entry.role == role:
+                return entry
+        return None
+
+    def snapshot(self, since: int = 0) -> List[LogEntry]:
+        """A consistent, version-ordered copy of the entries newer than since"""
+        entries = list(self._entries)
+        if any(a.version > b.version for a, b in zip(entries, entries[1:])):
+            entries.sort(key=lambda entry: entry.version)
+        if since:
+            entries = [entry for entry in entries if entry.version > since]
+        return entries
+
+    def clear(self):
+        """Drop every entry (versions keep increasing)"""
+        self._entries = []
+
+
+def digest(text: str, max_chars: int = 200) -> str:
+    """First sentence of a text, truncated to max_chars"""
+    text = " ".join(text.split())
+    first = SENTENCE_END.split(text, maxsplit=1)[0]
+    return first if len(first) <= max_chars else first[:max_chars - 3].rstrip() + "..."
+
+
+class MessageLogHistory(BaseChatMessageHistory):
+    """Chat message history backed by a MessageLog
+
+    ``messages`` renders the whole log (user turns as human messages, agent
+    outputs as AI messages), so code reading ``memory.chat_memory.messages``
+    keeps working.
+    """
+
+    def __init__(self, log: MessageLog, agent_name: Optional[str] = None):
+        self.log = log
+        self.agent_name = agent_name
+
+    @property
+    def messages(self) -> List[BaseMessage]:
+        return [
+            HumanMessage(content=entry.content) if entry.role == USER else AIMessage(content=entry.content)
+            for entry in self.log.snapshot()
+        ]
+
+    def add_message(self, message: BaseMessage) -> None:
+        if isinstance(message, HumanMessage):
+            self.log.append(USER, str(message.content))
+        else:
+            latest = self.log.latest(USER)
+            self.log.append(AGENT, str(message.content), author=self.agent_name,
+                            turn=latest.version if latest else None)
+
+    def clear(self) -> None:
+        self.log.clear()
+
+
+class MessageLogMemory(BaseChatMemory):
+    """One agent's view of a shared MessageLog
+
+    Instead of replaying every agent's full output to every other agent, each
+    agent reads the log through configurable views: the user's turns, its own
+    outputs, and a one-line digest of what the other agents said per turn.
+    Prompt size then grows with the number of user turns rather than with
+    turns times agents.
+
+    A panel records each user input once, before asking its agents, and sets
+    ``current_turn`` to that entry's version on every agent's memory; the
+    agent's output is then filed under that turn. Without ``current_turn``,
+    each saved turn appends its own user entry.
+    """
+
+    log: Any
+    agent_name: Optional[str] = None
+    views: Tuple[str, ...] = DEFAULT_VIEWS
+    digest_chars: int = 200
+    memory_key: str = "history"
+    input_key: Optional[str] = "input"
+    return_messages: bool = True
+    human_prefix: str = "Human"
+    ai_prefix: str = "AI"
+    chat_memory: BaseChatMessageHistory = Field(default=None)
+    current_turn: Optional[int] = None
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        if self.chat_memory is None:
+            self.chat_memory = MessageLogHistory(self.log, self.agent_name)
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    @property
+    def memory_variables(self) -> List[str]:
+        """:meta private:"""
+        return [self.memory_key]
+
+    def _render(self, entries: Sequence[LogEntry]) -> List[BaseMessage]:
+        if VIEW_FULL in self.views:
+            return [
+                HumanMessage(content=e.content) if e.role == USER else AIMessage(content=e.content) for e in entries
+            ]
+
+        # Group agent outputs under the user turn they answer
+        turns: Dict[int, List[LogEntry]] = {}
+        order: List[int] = []
+        for entry in entries:
+            if entry.turn not in turns:
+                turns[entry.turn] = []
+                order.append(entry.turn)
+            turns[entry.turn].append(entry)
+
+        messages: List[BaseMessage] = []
+        for turn in order:
+            group = turns[turn]
+            if VIEW_USER in self.views:
+                messages.extend(HumanMessage(content=e.content) for e in group if e.role == USER)
+            if VIEW_OWN in self.views:
+                messages.extend(AIMessage(content=e.content) for e in group
+                                if e.role == AGENT and e.author == self.agent_name)
+            if VIEW_DIGEST in self.views:
+                notes = [f"[{e.author}] {digest(e.content, self.digest_chars)}" for e in group
+                         if e.role == AGENT and e.author != self.agent_name]
+                if notes:
+                    messages.append(AIMessage(content="Notes from other agents:\n" + "\n".join(notes)))
+        return messages
+
+    def load_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        """Return the agent's view of the log"""
+        entries = self.log.snapshot()
+        if self.current_turn is not None:
+            # The pending user input is already part of the prompt
+            entries = [entry for entry in entries if entry.version != self.current_turn]
+        messages = self._render(entries)
+        if self.return_messages:
+            return {self.memory_key: messages}
+        return {self.memory_key: get_buffer_string(messages, human_prefix=self.human_prefix, ai_prefix=self.ai_prefix)}
+
+    def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
+        """Append this agent's output (and the user turn unless the panel recorded it)"""
+        input_str, output_str = self._get_input_output(inputs, outputs)
+        turn = self.current_turn
+        if turn is None:
+            turn = self.log.append(USER, str(input_str)).version
+        self.log.append(AGENT, output_str, author=self.agent_name, turn=turn)
@@ -0,0 +1,271 @@
+from array import array
+from collections.abc import Mapping, Sequence
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import AIMessage, BaseMessage, ChatMessage, HumanMessage, SystemMessage
+
+
+class Message(dict):
+    """An immutable {"role": ..., "content": ...} record
+
+    A read-only ``dict``, so it reads like the dicts the analyzers used to
+    store (``message["content"]``, equality with such a dict) and
+    ``json.dumps`` serializes it as one. It is only built when a message is
+    read from a MessageStore.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, role: str, content: str):
+        super().__init__(role=role, content=content)
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("Message is read-only")
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __reduce__(self):
+        return Message, (self["role"], self["content"])
+
+    def __repr__(self):
+        return f"Message(role={self['role']!r}, content={self['content']!r})"
+
+    @property
+    def role(self) -> str:
+        return self["role"]
+
+    @property
+    def content(self) -> str:
+        return self["content"]
+
+    def to_dict(self) -> Dict[str, str]:
+        return dict(self)
+
+
+class MessageStore:
+    """Append-only store of messages in columns over one text buffer
+
+    All message text is kept UTF-8 encoded in a single ``bytearray``; an
+    ``array`` of end offsets and an ``array`` of role ids locate each message.
+    A message therefore costs its encoded text plus 9 bytes, instead of a dict
+    and a string object. Entries are never modified or removed, so a view
+    taken at any point stays valid and unchanged; to start over, replace the
+    store.
+    """
+
+    def __init__(self, messages: Optional[Iterable] = None):
+        """Initialize the store
+
+        Args:
+            messages: Optional (role, content) pairs or {"role", "content"} mappings to add
+        """
+        self._buffer = bytearray()
+        self._ends = array("Q")
+        self._roles = array("B")
+        self._role_names: List[str] = []
+        self._role_ids: Dict[str, int] = {}
+        if messages is not None:
+            self.extend(messages)
+
+    def __len__(self):
+        return len(self._ends)
+
+    def append(self, role: str, content: str) -> int:
+        """Add a message and return its index"""
+        role_id = self._role_ids.get(role)
+        if role_id is None:
+            role_id = len(self._role_names)
+            if role_id > 255:
+                raise ValueError("A MessageStore supports at most 256 distinct roles")
+            self._role_names.append(role)
+            self._role_ids[role] = role_id
+        self._buffer += content.encode("utf-8")
+        # The role goes in before the end offset that makes the entry visible
+        self._roles.append(role_id)
+        self._ends.append(len(self._buffer))
+        return len(self._ends) - 1
+
+    def extend(self, messages: Iterable):
+        """Add (role, content) pairs or {"role", "content"} mappings"""
+        for message in messages:
+            if isinstance(message, Mapping):
+                self.append(message["role"], message["content"])
+            else:
+                role, content = message
+                self.append(role, content)
+
+    def role(self, index: int) -> str:
+        return self._role_names[self._roles[index]]
+
+    def content(self, index: int) -> str:
+        start = self._ends[index - 1] if index else 0
+        return self._buffer[start:self._ends[index]].decode("utf-8")
+
+    def view(self, start: int = 0, stop: Optional[int] = None,
+             factory: Callable[[str, str], object] = Message) -> "MessageView":
+        """A read-only view of the messages in [start, stop) as they are now
+
+        Args:
+            start: Index of the first message
+            stop: Index after the last message (defaults to the current length)
+            factory: Builds the item returned for a (role, content) pair
+        """
+        stop = len(self._ends) if stop is None else min(stop, len(self._ends))
+        return MessageView(self, start, max(start, stop), factory)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes used by the text buffer and the columns"""
+        return len(self._buffer) + self._ends.itemsize * len(self._ends) + self._roles.itemsize * len(self._roles)
+
+
+class MessageView(Sequence):
+    """An immutable window onto a MessageStore
+
+    Creating a view or slicing one is O(1) and copies nothing; items are
+    decoded only when accessed. Messages appended to the store after the view
+    was taken are not part of it. ``json.dumps`` does not know views; pass
+    ``default=json_default`` (or serialize ``view.to_dicts()``).
+    """
+
+    __slots__ = ("_store", "_start", "_stop", "_factory")
+
+    def __init__(self, store: MessageStore, start: int, stop: int, factory: Callable[[str, str], object] = Message):
+        self._store = store
+        self._start = start
+        self._stop = stop
+        self._factory = factory
+
+    def __len__(self):
+        return self._stop - self._start
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            return MessageView(self._store, self._start + start, self._start + max(start, stop), self._factory)
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("message index out of range")
+        position = self._start + index
+        return self._factory(self._store.role(position), self._store.content(position))
+
+    def __iter__(self) -> Iterator:
+        store, factory = self._store, self._factory
+        for position in range(self._start, self._stop):
+            yield factory(store.role(position), store.content(position))
+
+    def __eq__(self, other):
+        if isinstance(other, (MessageView, list, tuple)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self):
+        return f"MessageView({len(self)} messages)"
+
+    def to_dicts(self) -> List[Dict[str, str]]:
+        """The messages as plain {"role", "content"} dicts (e.g. for JSON)"""
+        store = self._store
+        return [{"role": store.role(i), "content": store.content(i)} for i in range(self._start, self._stop)]
+
+
+class ListView(Sequence):
+    """A read-only window onto a list owned by someone else
+
+    Creating a view or slicing one is O(1) and copies nothing. Unlike a
+    MessageView, a view with no ``stop`` follows the list as it grows, so it
+    stays current while the owner appends; it cannot be used to change the
+    list.
+    """
+
+    __slots__ = ("_items", "_start", "_stop")
+
+    def __init__(self, items: list, start: int = 0, stop: Optional[int] = None):
+        self._items = items
+        self._start = start
+        self._stop = stop
+
+    def __len__(self):
+        stop = len(self._items) if self._stop is None else min(self._stop, len(self._items))
+        return max(0, stop - self._start)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            return ListView(self._items, self._start + start, self._start + max(start, stop))
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("list index out of range")
+        return self._items[self._start + index]
+
+    def __iter__(self) -> Iterator:
+        items, start = self._items, self._start
+        for offset in range(len(self)):
+            yield items[start + offset]
+
+    def __eq__(self, other):
+        if isinstance(other, (ListView, list, tuple)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self):
+        return f"ListView({len(self)} items)"
+
+
+def json_default(obj):
+    """``default=`` hook for ``json.dumps`` serializing MessageViews
+
+    Example: ``json.dumps(analyzer.analyze_response(text), default=json_default)``
+    """
+    if isinstance(obj, MessageView):
+        return obj.to_dicts()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+# LangChain message classes by message type
+MESSAGE_TYPES = {"human": HumanMessage, "ai": AIMessage, "system": SystemMessage}
+
+
+def to_langchain_message(role: str, content: str) -> BaseMessage:
+    """Build a LangChain message from a stored (type, content) pair"""
+    message_class = MESSAGE_TYPES.get(role)
+    return message_class(content=content) if message_class else ChatMessage(role=role, content=content)
+
+
+class CompactChatMessageHistory(BaseChatMessageHistory):
+    """LangChain chat history kept in a MessageStore
+
+    Only the message type and text are stored (additional kwargs are
+    dropped). ``view()`` gives O(1) read-only access without building message
+    objects, but ``messages`` decodes and builds every message on each read.
+    Use it for histories that are kept far more often than read in full
+    (e.g. idle or archived sessions), not as the memory of an analyzer whose
+    every prompt reads the whole history; that is why LangChainAnalyzer's
+    default memory keeps a plain message list.
+    """
+
+    def __init__(self):
+        self.store = MessageStore()
+
+    @property
+    def messages(self) -> List[BaseMessage]:
+        return list(self.view())
+
+    def view(self) -> MessageView:
+        """A read-only view of the history as it is now"""
+        return self.store.view(factory=to_langchain_message)
+
+    def add_message(self, message: BaseMessage) -> None:
+        role = message.role if isinstance(message, ChatMessage) else message.type
+        self.store.append(role, str(message.content))
+
+    def clear(self) -> None:
+        # Views handed out earlier keep the old store
+        self.store = MessageStore()
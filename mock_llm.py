@@ -0,0 +1,126 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MockLLMServer:
+    """A local OpenAI-compatible chat completions server for offline testing
+
+    The server answers ``POST /v1/chat/completions`` with a canned completion, so
+    both the raw ``requests`` path in ``ResponseAnalyzer`` and the ``ChatOpenAI``
+    path in ``LangChainAnalyzer`` can be exercised without network access.
+    """
+
+    def __init__(self, reply="Mock analysis.\nFollow-up question: What is the budget?",
+                 latency=0.0, status=200, host="127.0.0.1", port=0, keep_requests=True):
+        """Initialize the mock server
+
+        Args:
+            reply: The completion text, or a callable taking the list of request
+                messages and returning the completion text
+            latency: Seconds to sleep before answering each request
+            status: HTTP status code to answer with (e.g. 500 to simulate an outage)
+            host: The interface to bind to
+            port: The port to bind to (0 picks a free port)
+            keep_requests: Keep every request body in ``requests`` (disable for
+                long load runs, where only the count is needed)
+        """
+        self.reply = reply
+        self.latency = latency
+        self.status = status
+        self.keep_requests = keep_requests
+        self.requests = []
+        self._count = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        """The OpenAI-style base URL of this server (ending in ``/v1``)"""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    @property
+    def request_count(self):
+        """Number of chat completion requests received so far"""
+        with self._lock:
+            return self._count
+
+    def start(self):
+        """Start serving in a background thread"""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the server and release its socket"""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _completion(self, body):
+        """Build an OpenAI chat completion payload for a request body"""
+        messages = body.get("messages", [])
+        text = self.reply(messages) if callable(self.reply) else self.reply
+        prompt_tokens = sum(len(str(m.get("content", ""))) // 4 for m in messages)
+        return {
+            "id": "chatcmpl-mock",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": text},
+                "finish_reason": "stop"
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(text) // 4,
+                "total_tokens": prompt_tokens + len(text) // 4
+            }
+        }
+
+    def _make_handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                with mock._lock:
+                    mock._count += 1
+                    if mock.keep_requests:
+                        mock.requests.append(body)
+                if mock.latency:
+                    time.sleep(mock.latency)
+
+                if mock.status != 200:
+                    payload = {"error": {"message": f"mock status {mock.status}", "type": "server_error"}}
+                elif not self.path.endswith("/chat/completions"):
+                    payload = {"error": {"message": f"unknown path {self.path}"}}
+                else:
+                    payload = mock._completion(body)
+                status = mock.status if self.path.endswith("/chat/completions") else 404
+
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                # Keep test output quiet
+                pass
+
+        return Handler
@@ -1,15 +1,45 @@
-from typing import List, Dict, Optional
+from typing import Iterable, List, Dict, Optional
 import os
 import json
 import requests
 from dotenv import load_dotenv
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.docstore.document import Document
+from backend_pool import BackendPool, get_default_pool
+from cassette import Cassette, CassetteMiss, get_default_cassette
+from scheduler import BATCH, RequestScheduler, SchedulerFull, get_default_scheduler, priority
+from document_index import DocumentIndex
+from chunk_store import ChunkStore, IngestReport, chunk_hash
+from chunk_dedup import DedupReport, MinHashDeduplicator, merge_chunks
+from stream_ingest import Source, iter_chunks
+from message_store import MessageStore, MessageView
 
 load_dotenv()
 
 class ResponseAnalyzer:
-    def __init__(self):
+    def __init__(self, backend_pool: Optional[BackendPool] = None,
+                 document_index: Optional[DocumentIndex] = None, top_k: int = 4,
+                 chunk_store: Optional[ChunkStore] = None, dedup_threshold: Optional[float] = 0.8,
+                 cassette: Optional[Cassette] = None, scheduler: Optional[RequestScheduler] = None,
+                 timeout: float = 60.0):
+        """Initialize the analyzer
+
+        Args:
+            backend_pool: Optional pool of OpenAI-compatible backends to balance
+                across (defaults to the shared pool from OPENAI_API_BASES, if any)
+            document_index: Optional DocumentIndex to retrieve relevant chunks from
+            top_k: Number of document chunks included with each analysis
+            chunk_store: Optional content-addressed cache of per-chunk summaries, so
+                re-submitted documents only summarize the chunks that changed
+            dedup_threshold: Estimated Jaccard similarity at which chunks count as
+                near-duplicates and are dropped before summarization (None disables)
+            cassette: Optional Cassette to record or replay API calls (defaults to
+                the shared cassette from LLM_CASSETTE, if any)
+            scheduler: Optional RequestScheduler every API call waits for (defaults
+                to the shared scheduler from LLM_MAX_CONCURRENCY, if any)
+            timeout: Seconds before an API request counts as failed (a hanging
+                backend then fails over instead of blocking the call)
+        """
         # Initialize text splitter for handling long responses
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=1000,
@@ -24,9 +54,30 @@ class ResponseAnalyzer:
             "Content-Type": "application/json",
             "Authorization": f"Bearer {self.api_key}"
         }
+        self.backend_pool = backend_pool if backend_pool is not None else get_default_pool()
+        
+        # Recorded API calls are replayed in front of the backend pool
+        self.cassette = cassette if cassette is not None else get_default_cassette()
+        self.session = requests.Session()
+        self.timeout = timeout
+        
+        # Priority-aware admission of API calls
+        self.scheduler = scheduler if scheduler is not None else get_default_scheduler()
+        
+        # Document retrieval
+        self.document_index = document_index
+        self.top_k = top_k
+        
+        # Per-chunk summary cache and the reuse report of the last summarization
+        self.chunk_store = chunk_store
+        self.last_chunk_report = IngestReport()
+        
+        # Near-duplicate chunk elimination and the report for the last document
+        self.deduplicator = MinHashDeduplicator(threshold=dedup_threshold) if dedup_threshold else None
+        self.last_dedup_report = DedupReport()
         
-        # Initialize conversation history
-        self.conversation_history = []
+        # Initialize conversation history (compact and append-only)
+        self._history = MessageStore()
         
         # System prompts
         self.analysis_prompt = """You are an AI assistant that analyzes user responses to extract useful information.
@@ -54,16 +105,90 @@ class ResponseAnalyzer:
         """Process long responses by splitting and summarizing if needed."""
         if len(text) > 2000:  # If text is too long
             # Split the text into chunks
-            texts = self.text_splitter.split_text(text)
+            all_texts = self.text_splitter.split_text(text)
+            
+            # Drop near-duplicate chunks before anything is sent to the model
+            texts = self._deduplicate(all_texts)
+            
+            # Summarize chunk by chunk so unchanged chunks reuse cached summaries
+            if self.chunk_store is not None:
+                return self._summarize_chunks(texts)
             
             # Convert chunks to documents
             docs = [Document(page_content=t) for t in texts]
             
             # Summarize the chunks
+            if self.last_dedup_report.dropped_chunks:
+                text = merge_chunks(text, all_texts, self.last_dedup_report.duplicates)
             summary = self._call_api([{"role": "user", "content": f"Please summarize this text: {text}"}])
             return summary
         return text
     
+    def _deduplicate(self, chunks: Iterable[str]) -> Iterable[str]:
+        """Filter out near-duplicate chunks, recording the savings in last_dedup_report."""
+        self.last_dedup_report = DedupReport()
+        if self.deduplicator is None:
+            return chunks
+        unique = self.deduplicator.iter_unique(chunks, self.last_dedup_report)
+        return list(unique) if isinstance(chunks, list) else unique
+    
+    def _summarize_chunks(self, chunks: Iterable[str], max_summary_length: int = 2000) -> str:
+        """Summarize a stream of chunks with a bounded rolling set of partial summaries.
+        
+        Each chunk is summarized on its own. Whenever the partial summaries grow
+        past max_summary_length they are combined into one, so memory use does
+        not depend on the number of chunks.
+        """
+        summaries = []
+        self.last_chunk_report = IngestReport()
+        for chunk in chunks:
+            summaries.append(self._summarize_chunk(chunk))
+            if sum(len(summary) for summary in summaries) > max_summary_length:
+                summaries = [self._combine_summaries(summaries)]
+        if len(summaries) > 1:
+            return self._combine_summaries(summaries)
+        return summaries[0] if summaries else ""
+    
+    def _summarize_chunk(self, chunk: str) -> str:
+        """Summarize one chunk, reusing the cached summary of identical content."""
+        key = chunk_hash(chunk) if self.chunk_store is not None else None
+        if key is not None:
+            cached = self.chunk_store.get_summary(key)
+            if cached is not None:
+                self.last_chunk_report.reused += 1
+                return cached
+        summary = self._call_api([{"role": "user", "content": f"Please summarize this text: {chunk}"}])
+        self.last_chunk_report.recomputed += 1
+        if key is not None and summary:
+            self.chunk_store.put_summary(key, summary)
+        return summary
+    
+    def _combine_summaries(self, summaries: List[str]) -> str:
+        """Merge partial summaries of consecutive parts of a document."""
+        joined = "\n\n".join(summaries)
+        # Identical partial summaries combine to the same result, so cache that too
+        key = chunk_hash(f"combine:{joined}") if self.chunk_store is not None else None
+        if key is not None and self.chunk_store.get_summary(key) is not None:
+            return self.chunk_store.get_summary(key)
+        combined = self._call_api([{"role": "user", "content": f"Combine these summaries of consecutive parts of one document into a single summary: {joined}"}])
+        if key is not None and combined:
+            self.chunk_store.put_summary(key, combined)
+        return combined
+    
+    def summarize_file(self, source: Source, block_size: int = 1 << 20) -> str:
+        """
+        Summarize a file or stream of any size at constant memory.
+        The input is memory-mapped or read incrementally and chunked with the analyzer's text splitter.
+        Its API calls are scheduled as batch work; if the scheduler rejects
+        one (SchedulerFull), the error is raised rather than dropping the chunk.
+        """
+        with priority(BATCH):
+            return self._summarize_chunks(self._deduplicate(iter_chunks(source, self.text_splitter, block_size)))
+    
+    def analyze_file(self, source: Source, block_size: int = 1 << 20) -> Dict:
+        """Analyze a file or stream of any size, such as a log or a specification."""
+        return self.analyze_response(self.summarize_file(source, block_size))
+    
     def _call_api(self, messages: List[Dict[str, str]]) -> str:
         """Make API call to OpenAI."""
         data = {
@@ -71,10 +196,29 @@ class ResponseAnalyzer:
             "messages": messages
         }
         
+        def post():
+            if self.backend_pool is not None:
+                # Balance across backends with failover
+                return self.backend_pool.execute(
+                    lambda backend: self.session.post(backend.chat_completions_url, headers=backend.headers(self.api_key),
+                                                      json=data, timeout=self.timeout)
+                )
+            return self.session.post(self.api_url, headers=self.headers, json=data, timeout=self.timeout)
+        
+        def call():
+            if self.cassette is not None:
+                return self.cassette.requests_call("POST", self.api_url, data, post)
+            return post()
+        
         try:
-            response = requests.post(self.api_url, headers=self.headers, json=data)
+            # Wait for a slot of the call's priority class
+            response = self.scheduler.run(call) if self.scheduler is not None else call()
             response.raise_for_status()  # Raise an exception for bad status codes
             return response.json()["choices"][0]["message"]["content"]
+        except (CassetteMiss, SchedulerFull):
+            # A replay that diverged from the recording, or a call the scheduler
+            # rejected, must reach the caller instead of becoming an empty answer
+            raise
         except Exception as e:
             print(f"Error in API call: {str(e)}")
             return ""
@@ -93,12 +237,17 @@ class ResponseAnalyzer:
             {"role": "user", "content": processed_response}
         ]
         
+        # Include only the document chunks relevant to this response
+        if self.document_index is not None and len(self.document_index):
+            context = self.document_index.format_context(user_response, self.top_k)
+            messages.insert(1, {"role": "system", "content": f"Relevant document excerpts:\n{context}"})
+        
         # Get analysis
         analysis_result = self._call_api(messages)
         
         # Update conversation history
-        self.conversation_history.append({"role": "user", "content": processed_response})
-        self.conversation_history.append({"role": "assistant", "content": analysis_result})
+        self._history.append("user", processed_response)
+        self._history.append("assistant", analysis_result)
         
         # Prepare messages for follow-up questions
         question_messages = [
@@ -112,13 +261,29 @@ class ResponseAnalyzer:
         return {
             "analysis": analysis_result,
             "follow_up_questions": questions,
-            "chat_history": self.conversation_history
+            "chat_history": self._history.view()
         }
     
+    @property
+    def conversation_history(self) -> MessageView:
+        """
+        Read-only view of the conversation history (O(1), no copy).
+        It used to be the live list of message dicts; append to it through
+        analyze_response, or assign a new history, e.g. to restore a session:
+        analyzer.conversation_history = [{"role": "user", "content": "..."}, ...]
+        """
+        return self._history.view()
+    
+    @conversation_history.setter
+    def conversation_history(self, messages: Iterable):
+        """Replace the history with (role, content) pairs or {"role", "content"} mappings."""
+        self._history = MessageStore(messages)
+    
     def reset_conversation(self):
         """Reset the conversation history."""
-        self.conversation_history = []
+        # Views returned earlier keep the old history
+        self._history = MessageStore()
     
-    def get_conversation_history(self) -> List:
+    def get_conversation_history(self) -> MessageView:
         """Get the current conversation history."""
-        return self.conversation_history 
\ No newline at end of file
+        return self._history.view() 
\ No newline at end of file
@@ -0,0 +1,99 @@
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from langchain.memory.chat_memory import BaseChatMemory
+from langchain.memory.utils import get_prompt_input_key
+from langchain_core.messages import BaseMessage, get_buffer_string
+from langchain_core.pydantic_v1 import PrivateAttr
+
+from document_index import HashingEmbedder
+
+
+class RetrievalConversationMemory(BaseChatMemory):
+    """Conversation memory that injects only recent and relevant turns
+
+    Every turn (a user message and the reply to it) is stored in the regular
+    ``chat_memory`` and embedded locally. When a prompt is built, the history
+    contains the ``recent_k`` most recent turns plus the ``relevant_m`` older
+    turns most similar to the current input, in chronological order. Prompt
+    size therefore stays bounded however long the session gets.
+
+    It can be used anywhere a ConversationBufferMemory is, including as the
+    shared memory of a MultiAgentAnalyzer.
+    """
+
+    memory_key: str = "history"
+    input_key: Optional[str] = "input"
+    return_messages: bool = True
+    human_prefix: str = "Human"
+    ai_prefix: str = "AI"
+    recent_k: int = 4
+    relevant_m: int = 3
+    min_score: float = 0.05
+    embedder: Any = None
+
+    _vectors: Any = PrivateAttr(default=None)
+    _num_vectors: int = PrivateAttr(default=0)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        if self.embedder is None:
+            self.embedder = HashingEmbedder()
+        self._vectors = np.zeros((16, self.embedder.dim), dtype=np.float32)
+
+    @property
+    def memory_variables(self) -> List[str]:
+        """:meta private:"""
+        return [self.memory_key]
+
+    def _turns(self) -> List[List[BaseMessage]]:
+        """Group stored messages into (user message, reply) turns"""
+        messages = self.chat_memory.messages
+        return [messages[i:i + 2] for i in range(0, len(messages), 2)]
+
+    def _sync_vectors(self, turns: List[List[BaseMessage]]):
+        """Embed any turns added since the last call"""
+        if self._num_vectors > len(turns):
+            # The underlying history was cleared or replaced
+            self._num_vectors = 0
+        new_turns = turns[self._num_vectors:]
+        if not new_turns:
+            return
+        needed = self._num_vectors + len(new_turns)
+        if needed > len(self._vectors):
+            # Grow geometrically so appends stay amortized O(1)
+            grown = np.zeros((max(needed, 2 * len(self._vectors)), self.embedder.dim), dtype=np.float32)
+            grown[:self._num_vectors] = self._vectors[:self._num_vectors]
+            self._vectors = grown
+        texts = [" ".join(str(m.content) for m in turn) for turn in new_turns]
+        self._vectors[self._num_vectors:needed] = self.embedder.embed_documents(texts)
+        self._num_vectors = needed
+
+    def select_turns(self, query: str) -> List[List[BaseMessage]]:
+        """The recent turns plus the older turns most relevant to the query"""
+        turns = self._turns()
+        self._sync_vectors(turns)
+        older = len(turns) - self.recent_k
+        if older <= 0 or self.relevant_m <= 0:
+            return turns
+
+        scores = self._vectors[:older] @ self.embedder.embed_query(query)
+        top = np.argsort(-scores, kind="stable")[:self.relevant_m]
+        relevant = sorted(int(i) for i in top if scores[i] >= self.min_score)
+        return [turns[i] for i in relevant] + turns[older:]
+
+    def load_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        """Return the selected history for the current input"""
+        if self.input_key is not None and self.input_key in inputs:
+            query = inputs[self.input_key]
+        else:
+            query = inputs[get_prompt_input_key(inputs, self.memory_variables)]
+        messages = [message for turn in self.select_turns(str(query)) for message in turn]
+        if self.return_messages:
+            return {self.memory_key: messages}
+        return {self.memory_key: get_buffer_string(messages, human_prefix=self.human_prefix, ai_prefix=self.ai_prefix)}
+
+    def clear(self) -> None:
+        """Clear memory contents"""
+        super().clear()
+        self._num_vectors = 0
@@ -0,0 +1,290 @@
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+import httpx
+
+# Priority classes, most urgent first
+INTERACTIVE = "interactive"
+MULTI_AGENT = "multi_agent"
+BATCH = "batch"
+BACKGROUND = "background"
+PRIORITIES = (INTERACTIVE, MULTI_AGENT, BATCH, BACKGROUND)
+
+# Share of capacity each class gets while all of them are waiting
+DEFAULT_WEIGHTS = {INTERACTIVE: 8, MULTI_AGENT: 4, BATCH: 2, BACKGROUND: 1}
+
+_current_priority = contextvars.ContextVar("llm_priority", default=INTERACTIVE)
+
+
+class SchedulerFull(RuntimeError):
+    """Raised when the scheduler's queue is full and nothing can be preempted"""
+
+
+@contextmanager
+def priority(priority_class: str):
+    """Run the LLM calls made in this block (in this thread) with a priority class"""
+    if priority_class not in PRIORITIES:
+        raise ValueError(f"Unknown priority class '{priority_class}', expected one of {PRIORITIES}")
+    token = _current_priority.set(priority_class)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+def current_priority() -> str:
+    """The priority class of LLM calls made from the current context"""
+    return _current_priority.get()
+
+
+def _percentile(values, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+class _Ticket:
+    """A call waiting for (or holding) a scheduler slot"""
+
+    __slots__ = ("priority", "finish", "enqueued", "admitted")
+
+    def __init__(self, priority_class: str, finish: float):
+        self.priority = priority_class
+        self.finish = finish
+        self.enqueued = time.monotonic()
+        self.admitted = False
+
+
+class RequestScheduler:
+    """Central admission control for LLM calls with priority classes
+
+    Calls run in the caller's thread once admitted; at most ``max_concurrent``
+    run at a time. Waiting calls are admitted by weighted fair queuing
+    (self-clocked: each call gets a virtual finish time advancing by
+    1/weight of its class), so interactive calls overtake a long batch while
+    batch work still gets its share of any spare capacity. The last
+    ``reserved_interactive`` slots only admit interactive calls, keeping their
+    latency flat under a full batch load. When ``max_queued`` calls are
+    waiting, a new call preempts the newest waiting call of a lower class; if
+    there is none, it is rejected with SchedulerFull. A preempted call is not
+    dropped: it is deferred (outside the ``max_queued`` limit) and requeued
+    once a slot frees and the queue has room, so its caller just waits longer.
+    """
+
+    def __init__(self, max_concurrent: int = 4, weights: Optional[Dict[str, float]] = None,
+                 max_queued: Optional[int] = None, reserved_interactive: int = 1, max_samples: int = 1000):
+        """Initialize the scheduler
+
+        Args:
+            max_concurrent: Maximum number of LLM calls in flight
+            weights: Weight per priority class (defaults to DEFAULT_WEIGHTS)
+            max_queued: Maximum number of waiting calls (None for no limit)
+            reserved_interactive: Slots only interactive calls may use
+            max_samples: Wait times kept per class for the percentiles
+        """
+        if not 0 <= reserved_interactive < max_concurrent:
+            raise ValueError("reserved_interactive must be at least 0 and less than max_concurrent")
+        self.max_concurrent = max_concurrent
+        self.weights = dict(DEFAULT_WEIGHTS)
+        self.weights.update(weights or {})
+        self.max_queued = max_queued
+        self.reserved_interactive = reserved_interactive
+
+        self._condition = threading.Condition()
+        self._queues = {name: deque() for name in PRIORITIES}
+        # Preempted calls waiting for room in the queue, oldest first
+        self._deferred = deque()
+        self._last_finish = {name: 0.0 for name in PRIORITIES}
+        self._virtual_time = 0.0
+        self._active = 0
+
+        # Metrics per class
+        self._running = {name: 0 for name in PRIORITIES}
+        self._completed = {name: 0 for name in PRIORITIES}
+        self._preempted = {name: 0 for name in PRIORITIES}
+        self._rejected = {name: 0 for name in PRIORITIES}
+        self._waits = {name: deque(maxlen=max_samples) for name in PRIORITIES}
+
+    @classmethod
+    def from_env(cls) -> Optional["RequestScheduler"]:
+        """Create a scheduler from LLM_MAX_CONCURRENCY / LLM_MAX_QUEUED
+
+        Returns:
+            A RequestScheduler, or None if LLM_MAX_CONCURRENCY is not set
+        """
+        concurrency = os.getenv("LLM_MAX_CONCURRENCY", "").strip()
+        if not concurrency:
+            return None
+        max_queued = os.getenv("LLM_MAX_QUEUED", "").strip()
+        max_concurrent = int(concurrency)
+        return cls(max_concurrent=max_concurrent, max_queued=int(max_queued) if max_queued else None,
+                   reserved_interactive=1 if max_concurrent > 1 else 0)
+
+    def _queued(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def _preempt_for(self, priority_class: str):
+        """Defer the newest waiting call of the lowest class below priority_class"""
+        weight = self.weights[priority_class]
+        for name in sorted(PRIORITIES, key=lambda name: self.weights[name]):
+            if self.weights[name] >= weight:
+                break
+            if self._queues[name]:
+                self._deferred.append(self._queues[name].pop())
+                self._preempted[name] += 1
+                return
+        self._rejected[priority_class] += 1
+        raise SchedulerFull(f"{self._queued()} LLM calls already waiting")
+
+    def _requeue_deferred(self):
+        """Move deferred calls back into their queues while there is room"""
+        while self._deferred and (self.max_queued is None or self._queued() < self.max_queued):
+            ticket = self._deferred.popleft()
+            # A fresh finish time, as if the call had just arrived
+            name = ticket.priority
+            ticket.finish = max(self._virtual_time, self._last_finish[name]) + 1.0 / self.weights[name]
+            self._last_finish[name] = ticket.finish
+            self._queues[ticket.priority].append(ticket)
+
+    def _dispatch(self):
+        """Admit waiting calls while slots are free, lowest virtual finish time first"""
+        while self._active < self.max_concurrent:
+            interactive_only = self._active >= self.max_concurrent - self.reserved_interactive
+            best = None
+            for name, queue in self._queues.items():
+                if not queue or (interactive_only and name != INTERACTIVE):
+                    continue
+                if best is None or queue[0].finish < best.finish:
+                    best = queue[0]
+            if best is None:
+                return
+            self._queues[best.priority].popleft()
+            best.admitted = True
+            self._virtual_time = best.finish
+            self._active += 1
+            self._running[best.priority] += 1
+            self._waits[best.priority].append(time.monotonic() - best.enqueued)
+            self._condition.notify_all()
+
+    def acquire(self, priority_class: Optional[str] = None) -> _Ticket:
+        """Wait for a slot
+
+        Args:
+            priority_class: The call's class (defaults to current_priority())
+
+        Raises:
+            SchedulerFull: If the queue is full and no lower-priority call can be preempted
+        """
+        priority_class = priority_class or current_priority()
+        if priority_class not in self.weights:
+            raise ValueError(f"Unknown priority class '{priority_class}', expected one of {PRIORITIES}")
+        with self._condition:
+            if self.max_queued is not None and self._queued() >= self.max_queued:
+                self._preempt_for(priority_class)
+            start = max(self._virtual_time, self._last_finish[priority_class])
+            ticket = _Ticket(priority_class, start + 1.0 / self.weights[priority_class])
+            self._last_finish[priority_class] = ticket.finish
+            self._queues[priority_class].append(ticket)
+            self._dispatch()
+            while not ticket.admitted:
+                self._condition.wait()
+            return ticket
+
+    def release(self, ticket: _Ticket):
+        """Free the slot held by an admitted call"""
+        with self._condition:
+            self._active -= 1
+            self._running[ticket.priority] -= 1
+            self._completed[ticket.priority] += 1
+            self._dispatch()
+            if self._deferred:
+                self._requeue_deferred()
+                self._dispatch()
+
+    @contextmanager
+    def slot(self, priority_class: Optional[str] = None):
+        """Hold a slot for the duration of the block"""
+        ticket = self.acquire(priority_class)
+        try:
+            yield
+        finally:
+            self.release(ticket)
+
+    def run(self, fn: Callable, priority_class: Optional[str] = None):
+        """Call fn() once admitted and return its result"""
+        with self.slot(priority_class):
+            return fn()
+
+    def httpx_transport(self, inner: Optional[httpx.BaseTransport] = None) -> "SchedulerTransport":
+        """An httpx transport sending every request through this scheduler"""
+        return SchedulerTransport(self, inner)
+
+    def stats(self) -> Dict[str, dict]:
+        """Queue depth, deferred and running calls and wait times per priority class"""
+        with self._condition:
+            return {
+                name: {
+                    "weight": self.weights[name],
+                    "queue_depth": len(self._queues[name]),
+                    "deferred": sum(1 for ticket in self._deferred if ticket.priority == name),
+                    "running": self._running[name],
+                    "completed": self._completed[name],
+                    "preempted": self._preempted[name],
+                    "rejected": self._rejected[name],
+                    "wait_p50_ms": _percentile(self._waits[name], 50) * 1000,
+                    "wait_p95_ms": _percentile(self._waits[name], 95) * 1000,
+                    "wait_max_ms": max(self._waits[name], default=0.0) * 1000,
+                }
+                for name in PRIORITIES
+            }
+
+
+class SchedulerTransport(httpx.BaseTransport):
+    """httpx transport that holds a scheduler slot for each request
+
+    Used in the ``http_client`` of ``ChatOpenAI`` so LangChain calls are
+    scheduled together with the raw ``requests`` calls of ``ResponseAnalyzer``.
+    """
+
+    def __init__(self, scheduler: RequestScheduler, inner: Optional[httpx.BaseTransport] = None):
+        self.scheduler = scheduler
+        self.inner = inner or httpx.HTTPTransport()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        with self.scheduler.slot():
+            response = self.inner.handle_request(request)
+            # Keep the slot until the body has arrived
+            response.read()
+            return response
+
+    def close(self):
+        self.inner.close()
+
+
+_default_scheduler = None
+_default_scheduler_loaded = False
+_default_scheduler_lock = threading.Lock()
+
+
+def get_default_scheduler() -> Optional[RequestScheduler]:
+    """The process-wide scheduler shared by all analyzers (configured from the environment)"""
+    global _default_scheduler, _default_scheduler_loaded
+    with _default_scheduler_lock:
+        if not _default_scheduler_loaded:
+            _default_scheduler = RequestScheduler.from_env()
+            _default_scheduler_loaded = True
+        return _default_scheduler
+
+
+def set_default_scheduler(scheduler: Optional[RequestScheduler]):
+    """Replace the process-wide scheduler shared by all analyzers"""
+    global _default_scheduler, _default_scheduler_loaded
+    with _default_scheduler_lock:
+        _default_scheduler = scheduler
+        _default_scheduler_loaded = True
@@ -0,0 +1,101 @@
+import codecs
+import mmap
+import os
+from typing import IO, Iterator, Optional, Union
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+# Default amount of raw input decoded and split at a time
+DEFAULT_BLOCK_SIZE = 1 << 20
+
+Source = Union[str, os.PathLike, IO]
+
+
+def iter_text_blocks(source: Source, block_size: int = DEFAULT_BLOCK_SIZE, encoding: str = "utf-8") -> Iterator[str]:
+    """Read a file or stream incrementally as decoded text blocks
+
+    Paths are memory-mapped, so only the pages being decoded are resident.
+    File objects are read ``block_size`` at a time; binary streams are decoded
+    incrementally so multi-byte characters split across reads stay intact.
+
+    Args:
+        source: A file path, or a text or binary file object
+        block_size: Bytes (or characters, for text streams) per block
+        encoding: Encoding used to decode bytes
+
+    Yields:
+        Consecutive blocks of text
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+                for offset in range(0, len(mapped), block_size):
+                    text = decoder.decode(mapped[offset:offset + block_size])
+                    if text:
+                        yield text
+                tail = decoder.decode(b"", final=True)
+                if tail:
+                    yield tail
+        return
+
+    decoder = None
+    while True:
+        block = source.read(block_size)
+        if not block:
+            break
+        if isinstance(block, bytes):
+            decoder = decoder or codecs.getincrementaldecoder(encoding)(errors="replace")
+            block = decoder.decode(block)
+        if block:
+            yield block
+    if decoder is not None:
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            yield tail
+
+
+def iter_chunks(source: Source, text_splitter: Optional[RecursiveCharacterTextSplitter] = None,
+                block_size: int = DEFAULT_BLOCK_SIZE, encoding: str = "utf-8") -> Iterator[str]:
+    """Split a file or stream into overlapping chunks at constant memory
+
+    Each block is split together with the last (possibly incomplete) chunk of
+    the previous block. That chunk is carried over instead of emitted, so
+    chunks never end at an arbitrary buffer boundary and the splitter's
+    overlap is preserved across blocks. At most one block plus one chunk is
+    held in memory at a time.
+
+    Args:
+        source: A file path, or a text or binary file object
+        text_splitter: The splitter to use (defaults to the ResponseAnalyzer
+            settings: 1000-character chunks with 200 characters of overlap)
+        block_size: Bytes (or characters, for text streams) read per block
+        encoding: Encoding used to decode bytes
+
+    Yields:
+        Chunks of text, in document order
+    """
+    text_splitter = text_splitter or RecursiveCharacterTextSplitter(
+        chunk_size=1000,
+        chunk_overlap=200,
+        length_function=len
+    )
+
+    carry = ""
+    for block in iter_text_blocks(source, block_size, encoding):
+        chunks = text_splitter.split_text(carry + block)
+        if not chunks:
+            carry = ""
+            continue
+        yield from chunks[:-1]
+
+        # Carry the raw tail (including whitespace the splitter strips) from
+        # the start of the last chunk
+        text = carry + block
+        start = text.rfind(chunks[-1])
+        carry = text[start:] if start >= 0 else chunks[-1]
+
+    if carry:
+        yield from text_splitter.split_text(carry)
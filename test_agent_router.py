@@ -0,0 +1,88 @@
+import logging
+import os
+from agent_router import AgentRouter
+from backend_pool import BackendPool
+from mock_llm import MockLLMServer
+
+ROLES = {
+    "project_analyst": "project analyst",
+    "technical_expert": "technical expert",
+    "business_consultant": "business consultant",
+}
+
+
+def test_scores_match_the_relevant_role():
+    router = AgentRouter(top_k=1)
+    selected, skipped = router.select(ROLES, "Should we use PostgreSQL or Firebase for the backend database?")
+    assert selected == ["technical_expert"]
+    assert set(skipped) == {"project_analyst", "business_consultant"}
+
+    selected, _ = router.select(ROLES, "Our budget is $50,000 and we expect subscription revenue in year two.")
+    assert selected == ["business_consultant"]
+
+
+def test_threshold_and_fallback():
+    router = AgentRouter(threshold=0.05)
+    selected, skipped = router.select(ROLES, "The launch timeline depends on the backend API and our budget.")
+    assert len(selected) == 3 and not skipped
+
+    # Nothing matches any role: every agent is invoked rather than none
+    selected, skipped = router.select(ROLES, "Hello there!")
+    assert selected == list(ROLES) and skipped == {}
+
+    # An impossible threshold still keeps the best match
+    selected, skipped = AgentRouter(threshold=0.99).select(ROLES, "What will the cloud infrastructure cost?")
+    assert len(selected) == 1 and len(skipped) == 2
+
+
+def test_custom_role_keywords():
+    roles = dict(ROLES, security="security specialist")
+    router = AgentRouter(top_k=1, keywords={"security specialist": "encryption authentication vulnerability gdpr"})
+    assert router.select(roles, "Is the user data encryption GDPR compliant?")[0] == ["security"]
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+def test_multi_agent_routing_skips_and_logs():
+    os.environ.setdefault("OPENAI_API_KEY", "test-key")
+    from langchain_analyzer import LangChainAnalyzer, MultiAgentAnalyzer
+
+    with MockLLMServer() as server:
+        pool = BackendPool.from_urls([server.base_url])
+        multi_agent = MultiAgentAnalyzer(backend_pool=pool, routing_top_k=1)
+        multi_agent.add_agent(
+            "data_scientist",
+            LangChainAnalyzer(memory=multi_agent.memory_for("data_scientist"), backend_pool=pool, agent_role="data scientist"),
+            keywords="churn prediction training dataset feature accuracy"
+        )
+        logger = logging.getLogger("langchain_analyzer")
+        handler = ListHandler()
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        try:
+            results = multi_agent.analyze_with_all_agents("How do we improve churn prediction accuracy?")
+        finally:
+            logger.removeHandler(handler)
+        assert list(results) == ["data_scientist"]
+        assert server.request_count == 1
+        assert len(multi_agent.last_skipped_agents) == 3
+        assert any("Skipping agent 'technical_expert'" in message for message in handler.messages)
+
+        # Routing is off by default
+        unrouted = MultiAgentAnalyzer(backend_pool=pool)
+        assert len(unrouted.analyze_with_all_agents("How do we improve churn prediction accuracy?")) == 3
+
+
+if __name__ == "__main__":
+    test_scores_match_the_relevant_role()
+    test_threshold_and_fallback()
+    test_custom_role_keywords()
+    test_multi_agent_routing_skips_and_logs()
+    print("All agent router tests passed")
@@ -0,0 +1,124 @@
+import asyncio
+import aiohttp
+from aiohttp import web
+from analyzer_service import AnalyzerService, create_app
+from backend_pool import BackendPool
+from langchain_analyzer import create_llm
+from mock_llm import MockLLMServer
+from scheduler import RequestScheduler
+
+
+async def start_service(server, scheduler=None, **options):
+    """Run the service on a free localhost port against a stub LLM"""
+    llm = create_llm(api_key="test-key", backend_pool=BackendPool.from_urls([server.base_url]), scheduler=scheduler)
+    service = AnalyzerService(llm=llm, **options)
+    runner = web.AppRunner(create_app(service))
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return service, runner, f"http://127.0.0.1:{port}"
+
+
+def test_endpoints():
+    async def scenario():
+        with MockLLMServer() as server:
+            service, runner, url = await start_service(server)
+            try:
+                async with aiohttp.ClientSession() as client:
+                    async with client.post(f"{url}/analyze", json={"session_id": "a", "input": "A fitness app."}) as r:
+                        assert r.status == 200
+                        assert (await r.json())["follow_up_questions"] == "What is the budget?"
+
+                    async with client.post(f"{url}/multi-agent/analyze", json={"session_id": "a", "input": "Budget is $50k."}) as r:
+                        assert set(await r.json()) == {"project_analyst", "technical_expert", "business_consultant"}
+
+                    async with client.post(f"{url}/multi-agent/analyze", json={"session_id": "a", "input": "x", "agent": "nobody"}) as r:
+                        assert r.status == 400
+                        assert "nobody" in (await r.json())["error"]
+
+                    async with client.post(f"{url}/summary", json={"session_id": "a"}) as r:
+                        assert (await r.json())["follow_up_questions"] == ""
+
+                    async with client.get(f"{url}/history", params={"session_id": "a"}) as r:
+                        history = await r.json()
+                        assert [m["role"] for m in history["analyzer"]] == ["human", "ai", "human", "ai"]
+                        assert [m["role"] for m in history["multi_agent"]] == ["human", "ai", "ai", "ai"]
+
+                    async with client.get(f"{url}/history", params={"session_id": "b"}) as r:
+                        assert (await r.json())["analyzer"] == []
+                    # Reading history never creates (or evicts) sessions
+                    assert "b" not in service.sessions
+
+                    async with client.post(f"{url}/analyze", json={"session_id": "a"}) as r:
+                        assert r.status == 400
+            finally:
+                await runner.cleanup()
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_sessions_are_batched():
+    async def scenario():
+        with MockLLMServer(latency=0.02) as server:
+            service, runner, url = await start_service(server, max_batch=8, max_batches=4, workers=32)
+            try:
+                async with aiohttp.ClientSession() as client:
+                    async def call(i):
+                        async with client.post(f"{url}/analyze", json={"session_id": f"user{i}", "input": f"Project {i}"}) as r:
+                            return r.status
+                    statuses = await asyncio.gather(*[call(i) for i in range(32)])
+                assert statuses == [200] * 32
+                # Requests were grouped rather than dispatched one by one
+                assert service.stats()["batches"] < 32
+                assert server.request_count == 32
+                # Finished group tasks are no longer referenced
+                await asyncio.sleep(0.1)
+                assert not service.batcher._tasks
+            finally:
+                await runner.cleanup()
+
+    asyncio.run(scenario())
+
+
+def test_overload_returns_503():
+    async def scenario():
+        with MockLLMServer(latency=0.2) as server:
+            service, runner, url = await start_service(server, max_queue=2, max_batch=1, max_batches=1, workers=1)
+            try:
+                async with aiohttp.ClientSession() as client:
+                    async def call(i):
+                        async with client.post(f"{url}/analyze", json={"session_id": f"user{i}", "input": "hi"}) as r:
+                            return r.status
+                    statuses = await asyncio.gather(*[call(i) for i in range(10)])
+                assert 503 in statuses and 200 in statuses
+                assert service.stats()["rejected"] == statuses.count(503)
+            finally:
+                await runner.cleanup()
+
+    asyncio.run(scenario())
+
+
+def test_scheduler_rejection_returns_503():
+    async def scenario():
+        with MockLLMServer() as server:
+            # No queue room: the scheduler rejects every LLM call
+            scheduler = RequestScheduler(max_concurrent=1, reserved_interactive=0, max_queued=0)
+            service, runner, url = await start_service(server, scheduler=scheduler)
+            try:
+                async with aiohttp.ClientSession() as client:
+                    async with client.post(f"{url}/analyze", json={"session_id": "a", "input": "hi"}) as r:
+                        assert r.status == 503 and r.headers["Retry-After"] == "1"
+                assert server.request_count == 0
+            finally:
+                await runner.cleanup()
+
+    asyncio.run(scenario())
+
+
+if __name__ == "__main__":
+    test_endpoints()
+    test_concurrent_sessions_are_batched()
+    test_overload_returns_503()
+    test_scheduler_rejection_returns_503()
+    print("All analyzer service tests passed")
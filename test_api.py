@@ -1,6 +1,7 @@
 import os
 from dotenv import load_dotenv
 from openai import OpenAI
+from cassette import get_default_cassette
 
 # Load environment variables
 load_dotenv()
@@ -9,8 +10,9 @@ load_dotenv()
 api_key = os.getenv('OPENAI_API_KEY')
 print("API Key loaded (first 20 chars):", api_key[:20] if api_key else "None")
 
-# Initialize the OpenAI client
-client = OpenAI(api_key=api_key)
+# Initialize the OpenAI client (recording or replaying through LLM_CASSETTE, if set)
+cassette = get_default_cassette()
+client = OpenAI(api_key=api_key, http_client=cassette.httpx_client() if cassette else None)
 
 try:
     # Try a simple API call
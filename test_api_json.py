@@ -2,6 +2,7 @@ import os
 import json
 import requests
 from dotenv import load_dotenv
+from cassette import get_default_cassette
 
 # Load environment variables
 load_dotenv()
@@ -27,9 +28,13 @@ data = {
     ]
 }
 
+# Record or replay through LLM_CASSETTE, if set
+cassette = get_default_cassette()
+http = cassette.requests_session() if cassette else requests
+
 try:
     print("\nAttempting API call...")
-    response = requests.post(url, headers=headers, json=data)
+    response = http.post(url, headers=headers, json=data)
     
     # Print response status and headers
     print(f"\nStatus Code: {response.status_code}")
@@ -0,0 +1,112 @@
+import os
+from backend_pool import Backend, BackendPool, NoHealthyBackendError, OPEN, EWMA_LATENCY
+from mock_llm import MockLLMServer
+from response_analyzer import ResponseAnalyzer
+
+
+def test_least_outstanding_spreads_load():
+    with MockLLMServer(reply="a") as first, MockLLMServer(reply="b") as second:
+        pool = BackendPool.from_urls([first.base_url, second.base_url], api_key="test-key")
+        analyzer = ResponseAnalyzer(backend_pool=pool)
+        for _ in range(20):
+            assert analyzer._call_api([{"role": "user", "content": "Hello!"}]) in ("a", "b")
+        # Sequential requests tie on outstanding count, so both backends get traffic
+        assert first.request_count > 0 and second.request_count > 0
+        assert first.request_count + second.request_count == 20
+
+
+def test_failover_and_circuit_breaking():
+    with MockLLMServer(status=500) as broken, MockLLMServer(reply="ok") as healthy:
+        pool = BackendPool.from_urls([broken.base_url, healthy.base_url], api_key="test-key",
+                                     failure_threshold=2, recovery_timeout=60)
+        analyzer = ResponseAnalyzer(backend_pool=pool)
+        for _ in range(10):
+            # Every call succeeds thanks to failover
+            assert analyzer._call_api([{"role": "user", "content": "Hello!"}]) == "ok"
+        # The broken backend's circuit opened and it stopped receiving traffic
+        assert pool.backends[0].state == OPEN
+        assert broken.request_count == 2
+
+
+def test_half_open_recovery():
+    with MockLLMServer(status=500) as server:
+        pool = BackendPool.from_urls([server.base_url], failure_threshold=1, recovery_timeout=0)
+        pool.execute(lambda backend: type("Response", (), {"status_code": 500})())
+        assert pool.backends[0].state == OPEN
+
+        # After the recovery timeout a trial request goes through and closes the circuit
+        response = pool.execute(lambda backend: type("Response", (), {"status_code": 200})())
+        assert response.status_code == 200
+        assert pool.stats()[0]["state"] == "closed"
+
+
+def test_no_healthy_backend():
+    pool = BackendPool([Backend("http://127.0.0.1:9/v1")], failure_threshold=1, recovery_timeout=60)
+
+    def refuse(backend):
+        raise ConnectionError("refused")
+
+    try:
+        pool.execute(refuse)
+    except ConnectionError:
+        pass
+    try:
+        pool.execute(refuse)
+        assert False, "expected NoHealthyBackendError"
+    except NoHealthyBackendError:
+        pass
+
+
+def test_ewma_prefers_faster_backend():
+    with MockLLMServer(reply="slow", latency=0.05) as slow, MockLLMServer(reply="fast") as fast:
+        pool = BackendPool.from_urls([slow.base_url, fast.base_url], api_key="test-key", strategy=EWMA_LATENCY)
+        analyzer = ResponseAnalyzer(backend_pool=pool)
+        for _ in range(20):
+            analyzer._call_api([{"role": "user", "content": "Hello!"}])
+        assert fast.request_count > slow.request_count
+
+
+def test_hanging_backend_times_out_and_fails_over():
+    with MockLLMServer(reply="hang", latency=2.0) as hanging, MockLLMServer(reply="ok") as healthy:
+        pool = BackendPool.from_urls([hanging.base_url, healthy.base_url], api_key="test-key",
+                                     failure_threshold=1, recovery_timeout=60)
+        analyzer = ResponseAnalyzer(backend_pool=pool, timeout=0.2)
+        for _ in range(4):
+            assert analyzer._call_api([{"role": "user", "content": "Hello!"}]) == "ok"
+        assert pool.backends[0].state == OPEN and hanging.request_count <= 1
+
+
+def test_ewma_penalizes_failures():
+    pool = BackendPool([Backend("http://a/v1"), Backend("http://b/v1")], strategy=EWMA_LATENCY, failure_threshold=10)
+    a, b = pool.backends
+    for backend in (a, b):
+        pool.release(pool.acquire(exclude=[other for other in pool.backends if other is not backend]), 0.05, True)
+    # A fast failure must not make the failing backend look faster
+    pool.release(pool.acquire(exclude=[a]), 0.001, False)
+    assert b.ewma_latency > a.ewma_latency
+    assert all(pool.acquire() is a for _ in range(3))
+
+
+def test_langchain_analyzer_uses_pool():
+    os.environ.setdefault("OPENAI_API_KEY", "test-key")
+    from langchain_analyzer import LangChainAnalyzer
+
+    with MockLLMServer(status=500) as broken, MockLLMServer() as healthy:
+        pool = BackendPool.from_urls([broken.base_url, healthy.base_url])
+        analyzer = LangChainAnalyzer(backend_pool=pool)
+        for _ in range(3):
+            result = analyzer.analyze_response("We are building a fitness app.")
+            assert result["follow_up_questions"] == "What is the budget?"
+        assert healthy.request_count == 3
+
+
+if __name__ == "__main__":
+    test_least_outstanding_spreads_load()
+    test_failover_and_circuit_breaking()
+    test_half_open_recovery()
+    test_no_healthy_backend()
+    test_ewma_prefers_faster_backend()
+    test_hanging_backend_times_out_and_fails_over()
+    test_ewma_penalizes_failures()
+    test_langchain_analyzer_uses_pool()
+    print("All backend pool tests passed")
@@ -0,0 +1,117 @@
+import itertools
+import json
+import os
+import time
+from backend_pool import BackendPool
+from cassette import ONCE, RECORD, RECORDED, REPLAY, Cassette, CassetteMiss, request_key
+from mock_llm import MockLLMServer
+from response_analyzer import ResponseAnalyzer
+
+
+def test_request_key_normalization():
+    body = json.dumps({"model": "m", "messages": [{"role": "user", "content": "hi"}]}).encode()
+    reordered = json.dumps({"messages": [{"content": "hi", "role": "user"}], "model": "m"}, indent=2).encode()
+    key = request_key("POST", "https://api.openai.com/v1/chat/completions", body)
+    assert key == request_key("post", "http://127.0.0.1:9999/v1/chat/completions", reordered)
+    assert key != request_key("POST", "https://api.openai.com/v1/chat/completions", body.replace(b"hi", b"hey"))
+
+
+def test_response_analyzer_records_then_replays_offline(tmp_path):
+    path = str(tmp_path / "analyzer.json")
+    with MockLLMServer(latency=0.05) as server, Cassette(path, mode=RECORD) as cassette:
+        analyzer = ResponseAnalyzer(backend_pool=BackendPool.from_urls([server.base_url]), cassette=cassette)
+        recorded = analyzer.analyze_response("We are building a fitness app.")
+        assert server.request_count == 2
+        # Nothing is written until the cassette is closed
+        assert not os.path.exists(path)
+    assert recorded["follow_up_questions"]
+
+    # No server and no pool: requests addressed to api.openai.com are answered from the file
+    cassette = Cassette(path, mode=REPLAY)
+    assert len(cassette) == 2
+    analyzer = ResponseAnalyzer(cassette=cassette)
+    start = time.monotonic()
+    assert analyzer.analyze_response("We are building a fitness app.") == recorded
+    assert time.monotonic() - start < 0.05
+    assert cassette.stats()["hits"] == 2
+
+    # Recorded latency is reproduced on request
+    analyzer = ResponseAnalyzer(cassette=Cassette(path, mode=REPLAY, latency=RECORDED))
+    start = time.monotonic()
+    analyzer.analyze_response("We are building a fitness app.")
+    assert time.monotonic() - start >= 0.1
+
+
+def test_replay_miss_raises():
+    session = Cassette(mode=REPLAY).requests_session()
+    try:
+        session.post("https://api.openai.com/v1/chat/completions", json={"model": "m", "messages": []})
+    except CassetteMiss:
+        pass
+    else:
+        raise AssertionError("expected CassetteMiss")
+
+
+def test_replay_miss_does_not_trip_backend_pool(tmp_path):
+    path = str(tmp_path / "analyzer.json")
+    with MockLLMServer() as server, Cassette(path, mode=RECORD) as cassette:
+        ResponseAnalyzer(backend_pool=BackendPool.from_urls([server.base_url]),
+                         cassette=cassette).analyze_response("A fitness app.")
+
+    # The pool points at a dead backend; only the cassette can answer
+    pool = BackendPool.from_urls(["http://127.0.0.1:9/v1"])
+    analyzer = ResponseAnalyzer(backend_pool=pool, cassette=Cassette(path, mode=REPLAY))
+    for _ in range(4):
+        try:
+            analyzer.analyze_response("Something never recorded.")
+        except CassetteMiss:
+            pass
+        else:
+            raise AssertionError("expected CassetteMiss")
+    assert pool.stats()[0]["total_failures"] == 0
+    assert analyzer.analyze_response("A fitness app.")["follow_up_questions"]
+
+
+def test_repeated_requests_replay_in_order():
+    counter = itertools.count(1)
+    cassette = Cassette(mode=ONCE)
+    with MockLLMServer(reply=lambda messages: f"answer {next(counter)}") as server:
+        session = cassette.requests_session()
+        url = f"{server.base_url}/chat/completions"
+        body = {"model": "m", "messages": [{"role": "user", "content": "hi"}]}
+        cassette.mode = RECORD
+        first = [session.post(url, json=body).json()["choices"][0]["message"]["content"] for _ in range(2)]
+        cassette.mode = ONCE
+        replayed = [session.post(url, json=body).json()["choices"][0]["message"]["content"] for _ in range(3)]
+        assert server.request_count == 2
+    assert first == ["answer 1", "answer 2"]
+    assert replayed == ["answer 1", "answer 2", "answer 2"]
+
+
+def test_langchain_analyzer_records_then_replays_offline(tmp_path):
+    os.environ.setdefault("OPENAI_API_KEY", "test-key")
+    from langchain_analyzer import LangChainAnalyzer
+
+    path = str(tmp_path / "langchain.json")
+    with MockLLMServer() as server, Cassette(path, mode=ONCE) as cassette:
+        analyzer = LangChainAnalyzer(backend_pool=BackendPool.from_urls([server.base_url]), cassette=cassette)
+        recorded = [analyzer.analyze_response("A fitness app."), analyzer.analyze_response("Budget is $50k.")]
+
+    cassette = Cassette(path, mode=REPLAY, latency=0.01)
+    analyzer = LangChainAnalyzer(cassette=cassette)
+    replayed = [analyzer.analyze_response("A fitness app."), analyzer.analyze_response("Budget is $50k.")]
+    assert replayed == recorded
+    assert cassette.stats()["hits"] == 2 and cassette.stats()["recorded"] == 0
+
+
+if __name__ == "__main__":
+    import tempfile
+    import pathlib
+    test_request_key_normalization()
+    with tempfile.TemporaryDirectory() as directory:
+        test_response_analyzer_records_then_replays_offline(pathlib.Path(directory))
+        test_langchain_analyzer_records_then_replays_offline(pathlib.Path(directory))
+        test_replay_miss_does_not_trip_backend_pool(pathlib.Path(directory))
+    test_replay_miss_raises()
+    test_repeated_requests_replay_in_order()
+    print("All cassette tests passed")
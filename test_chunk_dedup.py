@@ -0,0 +1,110 @@
+import random
+import tracemalloc
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from chunk_dedup import MinHashDeduplicator, merge_chunks
+from backend_pool import BackendPool
+from mock_llm import MockLLMServer
+from response_analyzer import ResponseAnalyzer
+
+WORDS = ["deploy", "cluster", "budget", "latency", "review", "customer", "invoice", "model", "retry", "queue",
+         "schema", "release", "vendor", "metric", "alert", "backlog", "sprint", "cache", "token", "region"]
+
+
+def paragraph(seed, words=150):
+    rng = random.Random(seed)
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def split(text):
+    return RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200, length_function=len).split_text(text)
+
+
+def test_repeated_passages_are_dropped():
+    p = [paragraph(i) for i in range(4)]
+    text = "\n\n".join([p[0], p[1], p[2], p[1], p[3], p[1]])
+    chunks = split(text)
+    kept, report = MinHashDeduplicator(threshold=0.8).deduplicate(chunks)
+    # Each paragraph spans two chunks; both repeats of p[1] are dropped
+    assert report.dropped_chunks == 4
+    assert set(report.duplicates.values()) == {2, 3}
+    assert report.tokens_saved > 0 and report.tokens_after < report.tokens_before
+    assert kept == [chunks[i] for i in range(len(chunks)) if i not in report.duplicates]
+    assert merge_chunks(text, chunks, report.duplicates) == "\n\n".join(p)
+
+
+def test_near_duplicates_respect_threshold():
+    original = paragraph(7)
+    words = original.split()
+    # Change roughly 3% of the words
+    edited = " ".join("changed" if i % 30 == 0 else w for i, w in enumerate(words))
+    chunks = [original, edited]
+    _, strict = MinHashDeduplicator(threshold=0.95).deduplicate(chunks)
+    _, loose = MinHashDeduplicator(threshold=0.6).deduplicate(chunks)
+    assert strict.dropped_chunks == 0
+    assert loose.dropped_chunks == 1
+
+
+def test_splitter_overlap_is_not_a_duplicate():
+    text = "\n\n".join(paragraph(i, words=400) for i in range(5))
+    chunks = split(text)
+    _, report = MinHashDeduplicator().deduplicate(chunks)
+    assert len(chunks) > 5
+    assert report.dropped_chunks == 0
+    assert merge_chunks(text, chunks, []) == text
+
+
+def test_estimates_track_true_jaccard():
+    # Log lines look alike, but neighbouring chunks only share their overlap
+    text = "".join(f"2024-01-01T00:00:{i % 60:02d} INFO request {i} handled by worker-{i % 8} in {i % 97} ms\n"
+                   for i in range(500))
+    chunks = split(text)
+    deduplicator = MinHashDeduplicator()
+    for first, second in zip(chunks, chunks[1:]):
+        a, b = (set(deduplicator._shingles(chunk).tolist()) for chunk in (first, second))
+        estimate = deduplicator.similarity(deduplicator.signature(first), deduplicator.signature(second))
+        # 128 hash functions: the estimate is within a few standard errors of the truth
+        assert abs(estimate - len(a & b) / len(a | b)) < 0.15
+    assert deduplicator.deduplicate(chunks)[1].dropped_chunks == 0
+
+
+def test_streaming_memory_is_bounded_by_window():
+    def peak(count):
+        chunks = (" ".join(f"word{i}x{j}" for j in range(150)) for i in range(count))
+        tracemalloc.start()
+        try:
+            for _ in MinHashDeduplicator(window=200).iter_unique(chunks):
+                pass
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    # Four times the input, about the same peak memory
+    assert peak(1600) < 1.3 * peak(400)
+
+
+def test_analyzer_sends_fewer_tokens():
+    p = [paragraph(i) for i in range(3)]
+    # An email thread quoting the same message over and over
+    thread = "\n\n".join([p[0]] + [p[1]] * 8 + [p[2]])
+    with MockLLMServer(reply="summary") as server:
+        pool = BackendPool.from_urls([server.base_url])
+        analyzer = ResponseAnalyzer(backend_pool=pool)
+        analyzer._process_long_response(thread)
+        deduplicated = len(server.requests[-1]["messages"][0]["content"])
+        report = analyzer.last_dedup_report
+        assert report.dropped_chunks >= 6
+        assert report.tokens_saved > report.tokens_after
+
+        baseline = ResponseAnalyzer(backend_pool=pool, dedup_threshold=None)
+        baseline._process_long_response(thread)
+        assert deduplicated < len(server.requests[-1]["messages"][0]["content"]) / 2
+
+
+if __name__ == "__main__":
+    test_repeated_passages_are_dropped()
+    test_near_duplicates_respect_threshold()
+    test_splitter_overlap_is_not_a_duplicate()
+    test_estimates_track_true_jaccard()
+    test_streaming_memory_is_bounded_by_window()
+    test_analyzer_sends_fewer_tokens()
+    print("All dedup tests passed")
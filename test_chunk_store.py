@@ -0,0 +1,84 @@
+import os
+import tempfile
+import numpy as np
+from chunk_store import ChunkStore, chunk_hash
+from document_index import DocumentIndex
+from backend_pool import BackendPool
+from mock_llm import MockLLMServer
+from response_analyzer import ResponseAnalyzer
+
+
+def make_document(version):
+    """A multi-chunk document whose third section changes between versions"""
+    sections = [f"Section {i}. " + f"The ingestion pipeline stage {i} validates records. " * 30 for i in range(6)]
+    sections[2] = f"Section 2 (revision {version}). " + "Latency budgets were renegotiated with the vendor. " * 30
+    return "\n\n".join(sections)
+
+
+def test_reingest_only_recomputes_changed_chunks():
+    index = DocumentIndex()
+    first = index.ingest({"spec": make_document(1), "notes": "Short design notes."})
+    assert first.reused == 0 and first.recomputed == len(index)
+
+    unchanged = index.ingest({"spec": make_document(1)})
+    assert unchanged.unchanged_documents == 1 and unchanged.recomputed == 0
+
+    edited = index.ingest({"spec": make_document(2)})
+    assert 0 < edited.recomputed < edited.reused
+    assert edited.removed > 0
+    # The old revision is gone and the new one is searchable
+    texts = [doc.page_content for doc in index.chunks]
+    assert not any("revision 1" in text for text in texts)
+    assert index.search("renegotiated latency budgets", k=1)[0].metadata["doc_id"] == "spec"
+    assert sum(doc.metadata.get("doc_id") == "notes" for doc in index.chunks) == 1
+
+
+def test_process_pool_matches_inline():
+    documents = {f"doc{i}": make_document(i) for i in range(8)}
+    inline, pooled = DocumentIndex(), DocumentIndex()
+    inline.ingest(documents, workers=1)
+    report = pooled.ingest(documents, workers=2)
+    assert report.total == len(pooled) == len(inline)
+    assert [d.page_content for d in pooled.chunks] == [d.page_content for d in inline.chunks]
+    assert np.allclose(pooled.index.vectors, inline.index.vectors)
+
+
+def test_store_persistence():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "chunks.npz")
+        index = DocumentIndex(chunk_store=ChunkStore(path))
+        index.ingest({"spec": make_document(1)})
+        index.chunk_store.put_summary(chunk_hash("x"), "summary of x")
+        index.chunk_store.save()
+
+        # A fresh process reuses every embedding from disk
+        restored = DocumentIndex(chunk_store=ChunkStore(path))
+        report = restored.ingest({"spec": make_document(1)})
+        assert report.recomputed == 0 and report.reused == len(restored)
+        assert restored.chunk_store.get_summary(chunk_hash("x")) == "summary of x"
+
+
+def test_cached_chunk_summaries():
+    with MockLLMServer(reply="Chunk summary.") as server:
+        analyzer = ResponseAnalyzer(backend_pool=BackendPool.from_urls([server.base_url]), chunk_store=ChunkStore())
+        analyzer._process_long_response(make_document(1))
+        first_calls = server.request_count
+        assert analyzer.last_chunk_report.reused == 0
+
+        analyzer._process_long_response(make_document(2))
+        report = analyzer.last_chunk_report
+        assert 0 < report.recomputed < report.reused
+        assert server.request_count - first_calls < first_calls
+
+        # Re-submitting an unchanged document makes no API calls at all
+        calls = server.request_count
+        analyzer._process_long_response(make_document(2))
+        assert server.request_count == calls
+
+
+if __name__ == "__main__":
+    test_reingest_only_recomputes_changed_chunks()
+    test_process_pool_matches_inline()
+    test_store_persistence()
+    test_cached_chunk_summaries()
+    print("All chunk store tests passed")
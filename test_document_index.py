@@ -0,0 +1,104 @@
+import os
+import numpy as np
+from document_index import DocumentIndex, HashingEmbedder, IVFIndex, FlatIndex
+from mock_llm import MockLLMServer
+from backend_pool import BackendPool
+from response_analyzer import ResponseAnalyzer
+
+TOPICS = [
+    "The payment service retries failed credit card charges three times before alerting billing.",
+    "Kubernetes deployments use rolling updates with a maximum surge of one pod.",
+    "The mobile app caches workout history offline and syncs when connectivity returns.",
+    "Quarterly budget reviews compare marketing spend against customer acquisition cost.",
+]
+
+
+def make_corpus(copies):
+    """Synthetic corpus: each topic sentence padded with numbered filler"""
+    return [f"{topic} Section {i} of the operations manual." for i in range(copies) for topic in TOPICS]
+
+
+def test_search_returns_relevant_chunks():
+    index = DocumentIndex()
+    for i, text in enumerate(make_corpus(5)):
+        index.add_document(text, metadata={"source": f"doc{i}"})
+    results = index.search("How are credit card charges retried?", k=3)
+    assert len(results) == 3
+    assert all("credit card" in doc.page_content for doc in results)
+    assert results[0].metadata["score"] >= results[-1].metadata["score"]
+
+
+def test_long_documents_are_chunked_with_existing_splitter():
+    index = DocumentIndex()
+    chunks = index.add_document(" ".join(TOPICS * 20), metadata={"source": "manual"})
+    assert len(chunks) > 1
+    assert all(len(doc.page_content) <= 1000 for doc in chunks)
+    assert [doc.metadata["chunk"] for doc in chunks] == list(range(len(chunks)))
+
+
+def test_ivf_matches_flat_search():
+    embedder = HashingEmbedder(dim=128)
+    vectors = embedder.embed_documents(make_corpus(100))
+    flat, ivf = FlatIndex(128), IVFIndex(128, nlist=16, nprobe=4)
+    flat.add(vectors)
+    ivf.add(vectors)
+    assert ivf.is_trained
+
+    query = embedder.embed_query("rolling updates for kubernetes pods")
+    flat_scores, _ = flat.search(query, 5)
+    ivf_scores, ivf_ids = ivf.search(query, 5)
+    assert len(ivf_ids) == 5
+    assert np.allclose(flat_scores, ivf_scores)
+
+    # Streaming one vector at a time gives the same index and grows the buffer geometrically
+    streamed = IVFIndex(128, nlist=16, nprobe=4)
+    buffers = set()
+    for vector in vectors:
+        streamed.add(vector[None, :])
+        buffers.add(id(streamed._vectors))
+    assert len(streamed) == len(vectors) and np.array_equal(streamed.vectors, ivf.vectors)
+    assert streamed.is_trained and len(streamed.assignments) == len(vectors)
+    assert len(buffers) <= 3
+
+
+def test_prompt_size_constant_as_corpus_grows():
+    prompt_sizes = []
+    with MockLLMServer(reply="ok") as server:
+        for copies in (5, 50):
+            index = DocumentIndex(index_type="ivf", nlist=8)
+            for text in make_corpus(copies):
+                index.add_document(text)
+            analyzer = ResponseAnalyzer(backend_pool=BackendPool.from_urls([server.base_url]), document_index=index, top_k=2)
+            analyzer.analyze_response("What is our budget review process?")
+            # First request of each round is the analysis call
+            messages = server.requests[-2]["messages"]
+            assert "budget" in messages[1]["content"]
+            prompt_sizes.append(sum(len(m["content"]) for m in messages))
+    assert abs(prompt_sizes[0] - prompt_sizes[1]) < 100
+
+
+def test_langchain_analyzer_receives_top_k_chunks():
+    os.environ.setdefault("OPENAI_API_KEY", "test-key")
+    from langchain_analyzer import LangChainAnalyzer
+
+    index = DocumentIndex()
+    for text in make_corpus(3):
+        index.add_document(text)
+    with MockLLMServer() as server:
+        analyzer = LangChainAnalyzer(backend_pool=BackendPool.from_urls([server.base_url]), document_index=index, top_k=1)
+        analyzer.analyze_response("Tell me about offline workout sync")
+        analyzer.analyze_response("Tell me about offline workout sync", is_final_summary=True)
+        system_prompt = server.requests[0]["messages"][0]["content"]
+        assert "workout history offline" in system_prompt
+        assert "Kubernetes" not in system_prompt
+        # Retrieved excerpts are not stored in the conversation memory
+        assert all("Relevant document excerpts" not in m.content for m in analyzer.get_conversation_history())
+
+
+if __name__ == "__main__":
+    test_search_returns_relevant_chunks()
+    test_long_documents_are_chunked_with_existing_splitter()
+    test_ivf_matches_flat_search()
+    test_prompt_size_constant_as_corpus_grows()
+    test_langchain_analyzer_receives_top_k_chunks()
+    print("All document index tests passed")
@@ -0,0 +1,110 @@
+import os
+from backend_pool import BackendPool
+from fact_memory import GENERAL, FactMemory, FactStore, LLMFactExtractor, RuleBasedFactExtractor
+from mock_llm import MockLLMServer
+from scheduler import BACKGROUND, INTERACTIVE, RequestScheduler
+
+ANSWERS = [
+    "The budget is about $50,000 and we want to launch within six months.",
+    "We plan to use React Native with a Python backend on PostgreSQL.",
+    "The team is three engineers and a part-time designer.",
+    "We will charge a monthly subscription with a free tier.",
+    "User data must be GDPR compliant and encrypted at rest.",
+]
+
+
+def test_rule_based_extraction():
+    extractor = RuleBasedFactExtractor()
+    delta = extractor.extract(
+        "Initial summary: A meal planning app for busy parents.\n"
+        "Q: What is the budget?\n"
+        "A: The budget is about $50,000 and we want to launch within six months.\n"
+        "IMPORTANT: Generate exactly ONE focused follow-up question. Do not include any numbering or multiple questions."
+    )
+    assert delta == {
+        GENERAL: ["A meal planning app for busy parents."],
+        "budget": ["The budget is about $50,000"],
+        "timeline": ["we want to launch within six months."],
+    }
+    assert extractor.classify("We plan to use React Native with a Python backend.") == "stack"
+    # Only the scripts' own instructions are dropped, not user sentences that look like them
+    assert extractor.extract("Please note the budget is $50k.") == {"budget": ["Please note the budget is $50k."]}
+    assert extractor.extract("Note: the deadline is May 1.") == {"timeline": ["the deadline is May 1."]}
+    assert extractor.extract("Important: it must work offline.") == {GENERAL: ["it must work offline."]}
+
+
+def test_fact_store_merges_deltas():
+    store = FactStore(max_statements=2)
+    assert store.update({"budget": ["$50k."]}) == ["budget"]
+    assert store.update({"budget": "$50k."}) == []
+    store.update({"budget": ["10% contingency.", "Funded by a grant."]})
+    assert store.facts["budget"] == ["10% contingency.", "Funded by a grant."]
+    assert store.format() == "Known facts:\n- budget: 10% contingency. Funded by a grant."
+    # General statements have a larger cap of their own
+    for n in range(12):
+        store.update({GENERAL: f"Statement {n}."})
+    assert store.facts[GENERAL] == [f"Statement {n}." for n in range(2, 12)]
+    version = store.version
+    store.clear()
+    assert len(store) == 0 and store.version > version
+
+
+def test_llm_extractor_parses_json_delta():
+    os.environ.setdefault("OPENAI_API_KEY", "test-key")
+    from langchain_analyzer import create_llm
+
+    with MockLLMServer(reply='Here you go:\n```json\n{"budget": "$50k", "team": ""}\n```') as server:
+        extractor = LLMFactExtractor(create_llm(api_key="test-key", backend_pool=BackendPool.from_urls([server.base_url])))
+        assert extractor.extract("The budget is $50k.", {"stack": ["Python"]}) == {"budget": ["$50k"]}
+        prompt = server.requests[0]["messages"][0]["content"]
+        assert '"stack": "Python"' in prompt and "The budget is $50k." in prompt
+
+        # Extraction keeps the caller's priority unless told otherwise
+        scheduler = RequestScheduler(max_concurrent=2)
+        llm = create_llm(api_key="test-key", backend_pool=BackendPool.from_urls([server.base_url]), scheduler=scheduler)
+        LLMFactExtractor(llm).extract("The budget is $50k.")
+        LLMFactExtractor(llm, priority_class=BACKGROUND).extract("The budget is $50k.")
+        stats = scheduler.stats()
+        assert stats[INTERACTIVE]["completed"] == 1 and stats[BACKGROUND]["completed"] == 1
+
+
+def test_summary_prompt_bounded_by_facts():
+    os.environ.setdefault("OPENAI_API_KEY", "test-key")
+    from langchain.memory import ConversationBufferMemory
+    from langchain_analyzer import LangChainAnalyzer
+
+    verbose_reply = "Key information restated: " + " ".join(ANSWERS) * 3 + "\nFollow-up question: Anything else?"
+
+    def summary_prompt_size(memory, turns):
+        with MockLLMServer(reply=verbose_reply) as server:
+            analyzer = LangChainAnalyzer(memory=memory, backend_pool=BackendPool.from_urls([server.base_url]))
+            analyzer.analysis_chain.verbose = analyzer.summary_chain.verbose = False
+            for turn in range(turns):
+                analyzer.analyze_response(ANSWERS[turn % len(ANSWERS)])
+            analyzer.analyze_response("Summary please", is_final_summary=True)
+            return sum(len(m["content"]) for m in server.requests[-1]["messages"])
+
+    buffer_short = summary_prompt_size(ConversationBufferMemory(memory_key="history", return_messages=True), 5)
+    buffer_long = summary_prompt_size(ConversationBufferMemory(memory_key="history", return_messages=True), 30)
+    facts_short = summary_prompt_size(FactMemory(), 5)
+    memory = FactMemory()
+    facts_long = summary_prompt_size(memory, 30)
+
+    assert buffer_long > 4 * buffer_short
+    # Repeating the same facts does not grow the prompt
+    assert facts_long <= 1.1 * facts_short
+    assert facts_long < buffer_long / 5
+    assert set(memory.facts.facts) >= {"budget", "timeline", "stack", "team", "pricing", "security"}
+    # The full transcript is still available
+    assert len(memory.chat_memory.messages) == 2 * 31
+
+    memory.clear()
+    assert len(memory.facts) == 0 and memory.load_memory_variables({})["history"] == []
+
+
+if __name__ == "__main__":
+    test_rule_based_extraction()
+    test_fact_store_merges_deltas()
+    test_llm_extractor_parses_json_delta()
+    test_summary_prompt_bounded_by_facts()
+    print("All fact memory tests passed")
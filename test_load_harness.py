@@ -0,0 +1,38 @@
+from load_harness import LANGCHAIN, RESPONSE_ANALYZER, TURNS_PER_SESSION, percentile, run_load
+
+
+def test_percentile():
+    values = [float(i) for i in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 99) == 99.0
+    assert percentile(values, 100) == 100.0
+    assert percentile([], 50) == 0.0
+
+
+def test_response_analyzer_flow():
+    report = run_load(users=3, sessions=4, flow=RESPONSE_ANALYZER)
+    assert report["turns"] == 3 * 4 * TURNS_PER_SESSION
+    # Every turn makes an analysis call and a follow-up question call
+    assert report["llm_requests"] == 2 * report["turns"]
+    assert report["errors"] == 0
+    latency = report["latency_ms"]
+    assert 0 < latency["p50"] <= latency["p95"] <= latency["p99"] <= latency["max"]
+    # Without a reset the history keeps every turn
+    assert report["history_messages_per_user"] == 4 * TURNS_PER_SESSION * 2
+    assert report["memory"]["growth_bytes"] > 0
+    assert len(report["memory"]["top_allocations"]) == 5
+
+
+def test_langchain_flow_with_reset():
+    report = run_load(users=2, sessions=3, flow=LANGCHAIN, reset_between_sessions=True, trace_memory=False)
+    assert report["turns"] == report["llm_requests"] == 2 * 3 * TURNS_PER_SESSION
+    assert report["errors"] == 0
+    assert report["history_messages_per_user"] == 0
+    assert report["memory"] == {}
+
+
+if __name__ == "__main__":
+    test_percentile()
+    test_response_analyzer_flow()
+    test_langchain_flow_with_reset()
+    print("All load harness tests passed")
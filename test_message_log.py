@@ -0,0 +1,159 @@
+import os
+import threading
+from backend_pool import BackendPool
+from message_log import AGENT, USER, VIEW_FULL, MessageLog, MessageLogMemory, digest
+from mock_llm import MockLLMServer
+
+
+def test_concurrent_appends_keep_every_entry():
+    log = MessageLog()
+
+    def writer(name):
+        for i in range(500):
+            log.append(AGENT, f"{name} {i}", author=name)
+
+    threads = [threading.Thread(target=writer, args=(f"agent{n}",)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    entries = log.snapshot()
+    assert len(entries) == 8 * 500
+    versions = [entry.version for entry in entries]
+    assert versions == sorted(set(versions))
+    # Each writer's entries keep their order
+    own = [entry.content for entry in entries if entry.author == "agent3"]
+    assert own == [f"agent3 {i}" for i in range(500)]
+    assert log.snapshot(since=versions[-10]) == entries[-9:]
+
+
+def answer_as_panel(log, memories, user_input, reply):
+    """Record one user turn and save every agent's reply under it, as MultiAgentAnalyzer does"""
+    turn = log.append(USER, user_input).version
+    for name, memory in memories.items():
+        memory.current_turn = turn
+        memory.save_context({"input": user_input}, {"text": reply.format(name=name)})
+        memory.current_turn = None
+
+
+def test_user_turn_recorded_once_per_panel():
+    log = MessageLog()
+    memories = {name: MessageLogMemory(log=log, agent_name=name) for name in ("a", "b", "c")}
+    answer_as_panel(log, memories, "We are building a fitness app.", "{name} thinks it is fine. More.")
+    entries = log.snapshot()
+    assert [entry.role for entry in entries] == [USER, AGENT, AGENT, AGENT]
+    assert all(entry.turn == entries[0].version for entry in entries)
+
+
+def test_repeated_user_input_is_a_new_turn():
+    log = MessageLog()
+    memory = MessageLogMemory(log=log, agent_name="a")
+    memory.save_context({"input": "yes"}, {"text": "Noted."})
+    memory.save_context({"input": "yes"}, {"text": "Noted again."})
+    entries = log.snapshot()
+    assert [(entry.role, entry.content) for entry in entries] == [
+        (USER, "yes"), (AGENT, "Noted."), (USER, "yes"), (AGENT, "Noted again.")
+    ]
+    assert entries[3].turn == entries[2].version
+
+
+def test_views():
+    log = MessageLog()
+    memories = {name: MessageLogMemory(log=log, agent_name=name) for name in ("a", "b")}
+    for turn in range(2):
+        answer_as_panel(log, memories, f"turn {turn}", "{name} answer %d. Details follow here." % turn)
+
+    history = memories["a"].load_memory_variables({"input": "next"})["history"]
+    assert [m.content for m in history] == [
+        "turn 0", "a answer 0. Details follow here.", "Notes from other agents:\n[b] b answer 0.",
+        "turn 1", "a answer 1. Details follow here.", "Notes from other agents:\n[b] b answer 1.",
+    ]
+
+    user_only = MessageLogMemory(log=log, agent_name="a", views=("user",))
+    assert [m.content for m in user_only.load_memory_variables({})["history"]] == ["turn 0", "turn 1"]
+
+    full = MessageLogMemory(log=log, views=(VIEW_FULL,))
+    assert len(full.load_memory_variables({})["history"]) == 6
+    assert full.chat_memory.messages[0].content == "turn 0"
+
+    full.clear()
+    assert len(log) == 0 and memories["a"].load_memory_variables({})["history"] == []
+
+
+def test_digest():
+    assert digest("First sentence. Second one.") == "First sentence."
+    assert digest("word " * 100, max_chars=20).endswith("...")
+    assert len(digest("word " * 100, max_chars=20)) <= 20
+
+
+def test_prompt_size_independent_of_agent_count():
+    os.environ.setdefault("OPENAI_API_KEY", "test-key")
+    from langchain.memory import ConversationBufferMemory
+    from langchain_analyzer import LangChainAnalyzer
+
+    long_reply = "Mock analysis of the project. " + "Detail. " * 200 + "\nFollow-up question: What is the budget?"
+
+    def last_prompt_size(memory_for, agents, log=None):
+        with MockLLMServer(reply=long_reply) as server:
+            pool = BackendPool.from_urls([server.base_url])
+            panel = [LangChainAnalyzer(memory=memory_for(f"agent{n}"), backend_pool=pool) for n in range(agents)]
+            for turn in range(3):
+                if log is not None:
+                    current = log.append(USER, f"User turn {turn}").version
+                for agent in panel:
+                    if log is not None:
+                        agent.memory.current_turn = current
+                    agent.analyze_response(f"User turn {turn}")
+            return sum(len(m["content"]) for m in server.requests[-1]["messages"])
+
+    def shared_sizes(agents):
+        shared = ConversationBufferMemory(memory_key="history", return_messages=True)
+        return last_prompt_size(lambda name: shared, agents)
+
+    shared_small, shared_large = shared_sizes(2), shared_sizes(6)
+    assert shared_large > 2.5 * shared_small
+
+    def view_sizes(agents):
+        log = MessageLog()
+        return last_prompt_size(lambda name: MessageLogMemory(log=log, agent_name=name), agents, log)
+
+    view_small, view_large = view_sizes(2), view_sizes(6)
+    # Only one digest line per extra agent is added
+    assert view_large < 1.2 * view_small
+    assert view_large < shared_large / 3
+
+
+def test_multi_agent_analyzer_uses_log():
+    os.environ.setdefault("OPENAI_API_KEY", "test-key")
+    from langchain_analyzer import LangChainAnalyzer, MultiAgentAnalyzer
+
+    with MockLLMServer() as server:
+        pool = BackendPool.from_urls([server.base_url])
+        multi_agent = MultiAgentAnalyzer(backend_pool=pool)
+        multi_agent.add_agent("security", LangChainAnalyzer(memory=multi_agent.memory_for("security"),
+                                                            backend_pool=pool, agent_role="security specialist"))
+        multi_agent.analyze_with_all_agents("yes")
+        multi_agent.analyze_with_all_agents("yes")
+        entries = multi_agent.message_log.snapshot()
+        assert [entry.author for entry in entries] == [
+            None, "project_analyst", "technical_expert", "business_consultant", "security"
+        ] * 2
+        assert entries[6].turn == entries[5].version
+        # The pending user input is not repeated in the agents' history
+        prompt = " ".join(m["content"] for m in server.requests[-1]["messages"])
+        assert prompt.count("HumanMessage(content='yes')") == 1
+        assert len(multi_agent.get_conversation_history()) == 10
+        multi_agent.reset_conversation()
+        assert multi_agent.get_conversation_history() == []
+
+
+if __name__ == "__main__":
+    test_concurrent_appends_keep_every_entry()
+    test_user_turn_recorded_once_per_panel()
+    test_repeated_user_input_is_a_new_turn()
+    test_views()
+    test_digest()
+    test_prompt_size_independent_of_agent_count()
+    test_multi_agent_analyzer_uses_log()
+    print("All message log tests passed")
@@ -0,0 +1,146 @@
+import json
+import os
+import tracemalloc
+from backend_pool import BackendPool
+from message_store import CompactChatMessageHistory, ListView, Message, MessageStore, MessageView, json_default
+from mock_llm import MockLLMServer
+from response_analyzer import ResponseAnalyzer
+
+
+def test_message_reads_like_a_dict():
+    message = Message("user", "Hello")
+    assert message["role"] == "user" and message["content"] == "Hello"
+    assert message == {"role": "user", "content": "Hello"}
+    assert dict(message) == message.to_dict()
+    assert message.content == "Hello" and json.loads(json.dumps(message)) == message
+    try:
+        message.content = "changed"
+    except AttributeError:
+        pass
+    else:
+        raise AssertionError("Message should be read-only")
+    try:
+        message["content"] = "changed"
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("Message should be read-only")
+
+
+def test_views_are_immutable_snapshots():
+    store = MessageStore([("user", "Budget is 50k €"), {"role": "assistant", "content": "Noted."}])
+    view = store.view()
+    store.append("user", "Launch in May")
+    assert len(view) == 2 and len(store) == 3
+    assert view[-1] == {"role": "assistant", "content": "Noted."}
+    assert view[0]["content"] == "Budget is 50k €"
+
+    tail = store.view()[1:]
+    assert isinstance(tail, MessageView) and len(tail) == 2
+    assert [m["content"] for m in tail] == ["Noted.", "Launch in May"]
+    assert tail[1:][0]["role"] == "user"
+    assert [m["role"] for m in store.view()[::2]] == ["user", "user"]
+    assert store.view().to_dicts()[2] == {"role": "user", "content": "Launch in May"}
+    assert store.view() == [Message("user", "Budget is 50k €"), Message("assistant", "Noted."),
+                            Message("user", "Launch in May")]
+    try:
+        view[2]
+    except IndexError:
+        pass
+    else:
+        raise AssertionError("expected IndexError")
+
+
+def test_store_uses_a_fraction_of_the_memory():
+    def contents():
+        return (f"Turn {i}: the team discussed the budget and launch date." for i in range(20000))
+
+    def traced(build):
+        tracemalloc.start()
+        try:
+            before = tracemalloc.get_traced_memory()[0]
+            kept = build()
+            return tracemalloc.get_traced_memory()[0] - before, kept
+        finally:
+            tracemalloc.stop()
+
+    dict_bytes, _ = traced(lambda: [{"role": "user", "content": c} for c in contents()])
+    store_bytes, store = traced(lambda: MessageStore(("user", c) for c in contents()))
+    assert store_bytes < 0.4 * dict_bytes
+    assert store.nbytes < store_bytes * 1.5
+
+
+def test_response_analyzer_history_views():
+    with MockLLMServer() as server:
+        analyzer = ResponseAnalyzer(backend_pool=BackendPool.from_urls([server.base_url]))
+        first = analyzer.analyze_response("A fitness app.")
+        second = analyzer.analyze_response("Budget is $50k.")
+    # Each result holds the history as of its own turn
+    assert len(first["chat_history"]) == 2 and len(second["chat_history"]) == 4
+    assert second["chat_history"][2] == {"role": "user", "content": "Budget is $50k."}
+    history = analyzer.get_conversation_history()
+    assert history[-1]["role"] == "assistant" and len(analyzer.conversation_history) == 4
+
+    # Results are no longer plain JSON: views need the json_default hook
+    try:
+        json.dumps(second)
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("expected TypeError")
+    assert json.loads(json.dumps(second, default=json_default))["chat_history"] == history.to_dicts()
+
+    analyzer.reset_conversation()
+    assert len(analyzer.get_conversation_history()) == 0 and len(history) == 4
+
+    # The history can still be replaced, e.g. to restore a session
+    analyzer.conversation_history = history[:2]
+    assert analyzer.conversation_history == history[:2]
+
+
+def test_langchain_analyzer_history_view():
+    os.environ.setdefault("OPENAI_API_KEY", "test-key")
+    from langchain.memory import ConversationBufferMemory
+    from langchain_analyzer import LangChainAnalyzer
+
+    with MockLLMServer() as server:
+        pool = BackendPool.from_urls([server.base_url])
+        # The default memory feeds every prompt, so its messages are not rebuilt on each read
+        default = LangChainAnalyzer(backend_pool=pool)
+        default.analyze_response("A fitness app.")
+        assert default.memory.chat_memory.messages is default.memory.chat_memory.messages
+        # Its history is handed out as a read-only view over that list, not the list itself
+        view = default.get_conversation_history()
+        assert isinstance(view, ListView) and view == default.memory.chat_memory.messages
+        assert not hasattr(view, "append") and view[-2:] == default.memory.chat_memory.messages[-2:]
+        try:
+            view[0] = None
+        except TypeError:
+            pass
+        else:
+            raise AssertionError("expected TypeError")
+        default.analyze_response("Budget is $50k.")
+        assert len(view) == 4
+
+        memory = ConversationBufferMemory(chat_memory=CompactChatMessageHistory(), memory_key="history",
+                                          return_messages=True)
+        analyzer = LangChainAnalyzer(memory=memory, backend_pool=pool)
+        analyzer.analyze_response("A fitness app.")
+        analyzer.analyze_response("Budget is $50k.")
+        # The compact history still feeds the prompt
+        assert "A fitness app." in server.requests[-1]["messages"][0]["content"]
+    history = analyzer.get_conversation_history()
+    assert isinstance(history, MessageView)
+    assert [m.type for m in history] == ["human", "ai", "human", "ai"]
+    assert history[2].content == "Budget is $50k."
+    analyzer.reset_conversation()
+    assert len(analyzer.get_conversation_history()) == 0 and len(history) == 4
+
+
+if __name__ == "__main__":
+    test_message_reads_like_a_dict()
+    test_views_are_immutable_snapshots()
+    test_store_uses_a_fraction_of_the_memory()
+    test_response_analyzer_history_views()
+    test_langchain_analyzer_history_view()
+    print("All message store tests passed")
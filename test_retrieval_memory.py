@@ -0,0 +1,62 @@
+import os
+from retrieval_memory import RetrievalConversationMemory
+from benchmark_memory import run_benchmark
+from backend_pool import BackendPool
+from mock_llm import MockLLMServer
+
+
+def test_recent_and_relevant_turns_selected():
+    memory = RetrievalConversationMemory(recent_k=2, relevant_m=1)
+    memory.save_context({"input": "Our budget is $50,000."}, {"text": "Noted the budget."})
+    for i in range(10):
+        memory.save_context({"input": f"The team has {i} designers."}, {"text": "Noted the team size."})
+
+    history = memory.load_memory_variables({"input": "Can the budget cover hiring?"})["history"]
+    # One relevant older turn plus the two most recent turns, in order
+    assert len(history) == 6
+    assert history[0].content == "Our budget is $50,000."
+    assert history[-2].content == "The team has 9 designers."
+    # The full transcript is still kept
+    assert len(memory.chat_memory.messages) == 22
+
+
+def test_clear_resets_index():
+    memory = RetrievalConversationMemory(recent_k=1, relevant_m=1)
+    for i in range(5):
+        memory.save_context({"input": f"turn {i}"}, {"text": "ok"})
+    memory.load_memory_variables({"input": "turn 2"})
+    memory.clear()
+    memory.save_context({"input": "fresh start"}, {"text": "ok"})
+    history = memory.load_memory_variables({"input": "turn 2"})["history"]
+    assert [m.content for m in history] == ["fresh start", "ok"]
+
+
+def test_shared_memory_in_multi_agent_analyzer():
+    os.environ.setdefault("OPENAI_API_KEY", "test-key")
+    from langchain_analyzer import MultiAgentAnalyzer
+
+    memory = RetrievalConversationMemory(recent_k=1, relevant_m=1)
+    with MockLLMServer() as server:
+        multi_agent = MultiAgentAnalyzer(backend_pool=BackendPool.from_urls([server.base_url]), memory=memory)
+        for i in range(4):
+            multi_agent.analyze_with_agent("technical_expert", f"We deploy on Kubernetes cluster {i}.")
+        results = multi_agent.analyze_with_all_agents("What does Kubernetes cost us?")
+        assert set(results) == {"project_analyst", "technical_expert", "business_consultant"}
+        # Each prompt carries at most recent_k + relevant_m turns of history
+        for request in server.requests:
+            assert len(request["messages"]) <= 2 * 2 + 2
+    assert multi_agent.get_conversation_history() == memory.chat_memory.messages
+
+
+def test_benchmark_reduces_prompt_tokens():
+    result = run_benchmark(turns=200)
+    assert result["reduction"] > 0.8
+    assert result["relevant_topic_hit_rate"] > 0.9
+
+
+if __name__ == "__main__":
+    test_recent_and_relevant_turns_selected()
+    test_clear_resets_index()
+    test_shared_memory_in_multi_agent_analyzer()
+    test_benchmark_reduces_prompt_tokens()
+    print("All retrieval memory tests passed")
@@ -0,0 +1,166 @@
+import os
+import threading
+import time
+from backend_pool import BackendPool
+from mock_llm import MockLLMServer
+from response_analyzer import ResponseAnalyzer
+from scheduler import BACKGROUND, BATCH, INTERACTIVE, MULTI_AGENT, RequestScheduler, SchedulerFull, priority
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def queue_call(scheduler, priority_class, order, errors):
+    """Start a thread making one scheduled call and wait until it is queued"""
+    depth = scheduler.stats()[priority_class]["queue_depth"]
+
+    def call():
+        try:
+            scheduler.run(lambda: order.append(priority_class), priority_class)
+        except SchedulerFull as e:
+            errors.append((priority_class, e))
+
+    thread = threading.Thread(target=call)
+    thread.start()
+    wait_for(lambda: scheduler.stats()[priority_class]["queue_depth"] > depth or errors)
+    return thread
+
+
+def test_weighted_fair_queuing_prefers_interactive():
+    scheduler = RequestScheduler(max_concurrent=1, reserved_interactive=0)
+    order, errors = [], []
+    blocker = scheduler.acquire(INTERACTIVE)
+    threads = [queue_call(scheduler, BATCH, order, errors) for _ in range(4)]
+    threads += [queue_call(scheduler, INTERACTIVE, order, errors) for _ in range(2)]
+    threads += [queue_call(scheduler, BACKGROUND, order, errors)]
+    scheduler.release(blocker)
+    for thread in threads:
+        thread.join()
+    assert not errors
+    # Interactive calls queued last still run first; batch keeps its share ahead of background
+    assert order == [INTERACTIVE, INTERACTIVE, BATCH, BATCH, BACKGROUND, BATCH, BATCH]
+    stats = scheduler.stats()
+    assert stats[BATCH]["completed"] == 4 and stats[BATCH]["queue_depth"] == 0
+    assert stats[BATCH]["wait_max_ms"] >= stats[INTERACTIVE]["wait_p50_ms"]
+
+
+def test_reserved_slot_only_admits_interactive():
+    scheduler = RequestScheduler(max_concurrent=2, reserved_interactive=1)
+    order, errors = [], []
+    running = scheduler.acquire(BATCH)
+    waiting = queue_call(scheduler, BATCH, order, errors)
+    assert scheduler.stats()[BATCH]["queue_depth"] == 1
+    # The free slot is reserved, so the interactive call runs right away
+    scheduler.run(lambda: order.append(INTERACTIVE), INTERACTIVE)
+    assert order == [INTERACTIVE]
+    scheduler.release(running)
+    waiting.join()
+    assert order == [INTERACTIVE, BATCH]
+
+
+def test_preempted_work_is_deferred_not_dropped():
+    scheduler = RequestScheduler(max_concurrent=1, reserved_interactive=0, max_queued=2)
+    order, errors = [], []
+    blocker = scheduler.acquire(BATCH)
+    threads = [queue_call(scheduler, BATCH, order, errors) for _ in range(2)]
+    threads.append(queue_call(scheduler, INTERACTIVE, order, errors))
+    stats = scheduler.stats()
+    assert stats[BATCH]["preempted"] == 1 and stats[BATCH]["deferred"] == 1 and stats[BATCH]["queue_depth"] == 1
+
+    # Nothing below batch is waiting, so another batch call is rejected
+    try:
+        scheduler.acquire(BATCH)
+    except SchedulerFull:
+        pass
+    else:
+        raise AssertionError("expected SchedulerFull")
+
+    scheduler.release(blocker)
+    for thread in threads:
+        thread.join()
+    # The preempted batch call still runs once capacity frees
+    assert not errors
+    assert order == [INTERACTIVE, BATCH, BATCH]
+    stats = scheduler.stats()
+    assert stats[BATCH]["completed"] == 3 and stats[BATCH]["deferred"] == 0 and stats[BATCH]["rejected"] == 1
+
+
+def test_summarize_file_surfaces_rejections(tmp_path):
+    document = tmp_path / "spec.txt"
+    document.write_text("".join(f"Section {i}: requirement {i} for module {i}.\n" * 12 for i in range(10)))
+    # A scheduler without queue room rejects every call
+    scheduler = RequestScheduler(max_concurrent=1, reserved_interactive=0, max_queued=0)
+    with MockLLMServer() as server:
+        analyzer = ResponseAnalyzer(backend_pool=BackendPool.from_urls([server.base_url]), scheduler=scheduler,
+                                    dedup_threshold=None)
+        try:
+            analyzer.summarize_file(str(document))
+        except SchedulerFull:
+            pass
+        else:
+            raise AssertionError("expected SchedulerFull")
+    assert server.request_count == 0
+
+
+def test_interactive_latency_under_batch_load(tmp_path):
+    document = tmp_path / "spec.txt"
+    document.write_text("".join(f"Section {i}: requirement {i * 7919 % 1000} for module {i}.\n" * 12 for i in range(60)))
+    scheduler = RequestScheduler(max_concurrent=2)
+    with MockLLMServer(latency=0.02) as server:
+        pool = BackendPool.from_urls([server.base_url])
+        batch_threads = [
+            threading.Thread(target=ResponseAnalyzer(backend_pool=pool, scheduler=scheduler, dedup_threshold=None).summarize_file,
+                             args=(str(document),))
+            for _ in range(3)
+        ]
+        for thread in batch_threads:
+            thread.start()
+        wait_for(lambda: scheduler.stats()[BATCH]["queue_depth"] > 0)
+
+        interactive = ResponseAnalyzer(backend_pool=pool, scheduler=scheduler)
+        for i in range(5):
+            assert interactive.analyze_response(f"Answer {i}")["analysis"]
+        for thread in batch_threads:
+            thread.join()
+
+    stats = scheduler.stats()
+    assert stats[INTERACTIVE]["completed"] == 10
+    assert stats[BATCH]["completed"] > 10
+    # Interactive calls never wait behind the batch backlog: their waits are a
+    # fraction of the batch calls' (compared relatively to stay robust on slow machines)
+    assert stats[INTERACTIVE]["wait_p50_ms"] < stats[BATCH]["wait_p50_ms"] / 2
+    assert stats[INTERACTIVE]["wait_p95_ms"] < stats[BATCH]["wait_p95_ms"]
+
+
+def test_langchain_calls_are_scheduled_by_class():
+    os.environ.setdefault("OPENAI_API_KEY", "test-key")
+    from langchain_analyzer import LangChainAnalyzer, MultiAgentAnalyzer
+
+    scheduler = RequestScheduler(max_concurrent=2)
+    with MockLLMServer() as server:
+        pool = BackendPool.from_urls([server.base_url])
+        LangChainAnalyzer(backend_pool=pool, scheduler=scheduler).analyze_response("A fitness app.")
+        MultiAgentAnalyzer(backend_pool=pool, scheduler=scheduler).analyze_with_all_agents("A fitness app.")
+        with priority(BACKGROUND):
+            LangChainAnalyzer(backend_pool=pool, scheduler=scheduler).analyze_response("Compact this.")
+    stats = scheduler.stats()
+    assert stats[INTERACTIVE]["completed"] == 1
+    assert stats[MULTI_AGENT]["completed"] == 3
+    assert stats[BACKGROUND]["completed"] == 1
+
+
+if __name__ == "__main__":
+    import tempfile
+    import pathlib
+    test_weighted_fair_queuing_prefers_interactive()
+    test_reserved_slot_only_admits_interactive()
+    test_preempted_work_is_deferred_not_dropped()
+    with tempfile.TemporaryDirectory() as directory:
+        test_summarize_file_surfaces_rejections(pathlib.Path(directory))
+        test_interactive_latency_under_batch_load(pathlib.Path(directory))
+    test_langchain_calls_are_scheduled_by_class()
+    print("All scheduler tests passed")
@@ -0,0 +1,84 @@
+import io
+import os
+import tempfile
+import tracemalloc
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from stream_ingest import iter_chunks, iter_text_blocks
+from document_index import DocumentIndex
+from backend_pool import BackendPool
+from mock_llm import MockLLMServer
+from response_analyzer import ResponseAnalyzer
+
+
+def write_log(path, lines):
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(lines):
+            f.write(f"2024-01-01T00:00:{i % 60:02d} INFO request {i} handled by wörker-{i % 8} in {i % 97} ms\n")
+
+
+def test_chunks_cover_input_with_overlap():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "app.log")
+        write_log(path, 2000)
+        # A small block size forces many buffer boundaries, including inside multi-byte characters
+        chunks = list(iter_chunks(path, block_size=4099))
+
+        assert all(len(chunk) <= 1000 for chunk in chunks)
+        joined = "\n".join(chunks)
+        for i in range(2000):
+            assert f"request {i} handled" in joined
+        # Consecutive chunks share text, including across block boundaries
+        for previous, current in zip(chunks, chunks[1:]):
+            assert current.split("\n")[0] in previous
+        assert "�" not in joined
+
+
+def test_matches_in_memory_split_for_small_input():
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200, length_function=len)
+    text = "Paragraph about the churn model.\n\n" * 100
+    assert list(iter_chunks(io.StringIO(text), splitter)) == splitter.split_text(text)
+
+
+def test_binary_stream_decoding():
+    data = "naïve café ünïcödé ".encode("utf-8") * 50
+    assert "".join(iter_text_blocks(io.BytesIO(data), block_size=3)) == data.decode("utf-8")
+
+
+def test_constant_memory_on_large_file():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "big.log")
+        write_log(path, 200000)  # ~15 MB
+        tracemalloc.start()
+        count = sum(1 for _ in iter_chunks(path, block_size=1 << 18))
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        assert count > 10000
+        assert peak < 4 * (1 << 20)
+
+
+def test_summarize_and_index_file():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "app.log")
+        write_log(path, 500)
+
+        index = DocumentIndex()
+        count = index.add_file(path, batch_size=16)
+        assert count == len(index) > 1
+        assert index.search("request 250 handled", k=1)[0].metadata["source"] == path
+
+        with MockLLMServer(reply="Requests were handled normally.") as server:
+            analyzer = ResponseAnalyzer(backend_pool=BackendPool.from_urls([server.base_url]))
+            assert analyzer.summarize_file(path) == "Requests were handled normally."
+            # Log chunks look alike but are not near-duplicates; none is dropped
+            assert analyzer.last_dedup_report.dropped_chunks == 0
+            # One call per chunk plus the calls combining partial summaries
+            assert server.request_count > count
+
+
+if __name__ == "__main__":
+    test_chunks_cover_input_with_overlap()
+    test_matches_in_memory_split_for_small_input()
+    test_binary_stream_decoding()
+    test_constant_memory_on_large_file()
+    test_summarize_and_index_file()
+    print("All stream ingestion tests passed")
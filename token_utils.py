@@ -0,0 +1,13 @@
+import math
+
+# Average characters per token for English text with OpenAI tokenizers
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens in a text without loading a tokenizer
+
+    Uses the common ~4 characters per token rule of thumb, which is close
+    enough for comparing prompt sizes and reporting savings.
+    """
+    return math.ceil(len(text) / CHARS_PER_TOKEN)